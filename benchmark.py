@@ -0,0 +1,2234 @@
+#!/usr/bin/env python3
+"""
+benchmark.py - Mesures de performance du nœud blockchain
+
+Usage:
+    python benchmark.py nonce [--blocks N] [--txs N]
+    python benchmark.py history [--txs N]
+    python benchmark.py mempool [--txs N]
+    python benchmark.py assembly [--txs N] [--rounds N]
+    python benchmark.py txhash [--txs N]
+    python benchmark.py merkle [--rounds N]
+    python benchmark.py restart [--blocks N] [--txs N] [--snapshot-interval N] [--state-backend memory|sqlite]
+    python benchmark.py state [--accounts N]
+    python benchmark.py validation [--blocks N] [--txs N] [--rounds N]
+    python benchmark.py status [--blocks N] [--txs N] [--requests N]
+    python benchmark.py blocks [--blocks N] [--txs N]
+    python benchmark.py sync [--blocks N] [--txs N]
+    python benchmark.py catchup [--blocks N] [--txs N] [--peers N] [--latency MS]
+    python benchmark.py gossip [--txs N] [--peers N] [--slow N] [--delay MS]
+    python benchmark.py inventory [--txs N] [--nodes N]
+    python benchmark.py relay [--txs N] [--batch N]
+    python benchmark.py sendbatch [--txs N] [--batch N]
+    python benchmark.py peers [--blocks N] [--txs N] [--peers N] [--slow N] [--delay MS]
+    python benchmark.py load [--blocks N] [--duration S] [--concurrency 1,4,16,64] [--write-ratio R] [--threads N] [--processes N]
+    python benchmark.py import [--blocks N] [--txs N]
+    python benchmark.py verify [--txs N] [--workers 1,2,4,8] [--rounds N]
+    python benchmark.py overlay [--blocks N]
+    python benchmark.py stress [--wallets N] [--requests N] [--clients N] [--readers N] [--threads N]
+    python benchmark.py signature [--messages N] [--wallets N] [--rounds N] [--block-size N]
+    python benchmark.py sigcache [--txs N] [--wallets N]
+
+Chaque commande construit une blockchain en mémoire (aucun réseau requis),
+vérifie que le chemin optimisé donne les mêmes résultats que l'ancien
+algorithme, puis affiche les temps mesurés.
+"""
+
+import argparse
+import copy
+import glob
+import hashlib
+import itertools
+import json
+import logging
+import multiprocessing
+import threading
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from flask import Response, request
+from werkzeug.serving import make_server
+
+import blockchain_node
+from blockchain_node import (
+    Block, ChainStore, MemoryState, Node, QuantumAddress, SQLiteState, SimplePoSBlockchain, Transaction, TransactionHistory,
+    BLOCK_VERSION, DEFAULT_TREASURY_ADDRESS, LEGACY_BLOCK_VERSION, TRANSACTION_MAX_AGE, verify_merkle_proof
+)
+
+def print_header(title: str):
+    print(f"\n{'='*70}")
+    print(title)
+    print(f"{'='*70}")
+
+def build_chain(num_blocks: int, txs_per_block: int, num_wallets: int = 20,
+                store: ChainStore = None) -> Tuple[SimplePoSBlockchain, List[QuantumAddress]]:
+    """Construit une blockchain avec des transferts aléatoires entre wallets"""
+    blockchain = SimplePoSBlockchain(store=store)
+    wallets = fund_wallets(blockchain, num_wallets)
+    fill_blocks(blockchain, wallets, num_blocks, txs_per_block)
+    return blockchain, wallets
+
+def legacy_wallet() -> QuantumAddress:
+    """Wallet à l'ancienne adresse (signature vérifiée sur son seul format): pour
+    les mesures qui portent sur la pool et non sur les signatures, avec des
+    milliers d'expéditeurs dont les clés hash-based coûteraient chacune un arbre.
+    Ces signatures sont alors acceptées quelle que soit leur date"""
+    blockchain_node.LEGACY_SIGNATURES_CUTOFF = float('inf')
+    return QuantumAddress(os.urandom(64).hex())
+
+def fund_wallets(blockchain: SimplePoSBlockchain, num_wallets: int) -> List[QuantumAddress]:
+    """Crée des wallets approvisionnés; le premier devient validateur"""
+    wallets = [QuantumAddress() for _ in range(num_wallets)]
+    for wallet in wallets:
+        blockchain.balances[wallet.address] = 1_000_000
+    blockchain.register_validator(wallets[0].address, 1000)
+    return wallets
+
+def fill_blocks(blockchain: SimplePoSBlockchain, wallets: List[QuantumAddress],
+                num_blocks: int, txs_per_block: int):
+    """Ajoute des blocs de transferts aléatoires entre wallets"""
+    # Nombre de transactions limité par la protection anti-spam
+    blockchain.max_pending_per_address = max(blockchain.max_pending_per_address, txs_per_block)
+
+    for _ in range(num_blocks):
+        for _ in range(txs_per_block):
+            sender = random.choice(wallets)
+            recipient = random.choice(wallets)
+            tx = Transaction(
+                sender.address,
+                recipient.address,
+                round(random.uniform(1, 10), 2),
+                round(random.uniform(0.01, 1), 2),
+                blockchain.get_next_expected_nonce(sender.address)
+            )
+            tx.sign(sender)
+            blockchain.add_transaction(tx)
+        blockchain.create_block()
+
+# ============================================================================
+# NONCES
+# ============================================================================
+
+def scan_next_expected_nonce(blockchain: SimplePoSBlockchain, address: str) -> int:
+    """Ancien algorithme: parcours complet de la chaîne et de la pool"""
+    expected_nonce = 0
+    for block in blockchain.chain:
+        for tx in block.transactions:
+            if tx.sender == address and tx.sender not in ["SYSTEM"]:
+                expected_nonce = max(expected_nonce, tx.nonce + 1)
+    for tx in blockchain.pending_transactions:
+        if tx.sender == address and tx.sender not in ["SYSTEM"]:
+            expected_nonce = max(expected_nonce, tx.nonce + 1)
+    return expected_nonce
+
+def bench_nonce(args) -> bool:
+    print_header("INDEX DES NONCES")
+    blockchain, wallets = build_chain(args.blocks, args.txs)
+
+    # Laisser quelques transactions en attente pour couvrir la pool
+    for wallet in wallets[:5]:
+        tx = Transaction(wallet.address, wallets[-1].address, 1, 0.01,
+                         blockchain.get_next_expected_nonce(wallet.address))
+        tx.sign(wallet)
+        blockchain.add_transaction(tx)
+
+    # Reconstruction depuis la sérialisation (chemin /sync)
+    restored = SimplePoSBlockchain.from_dict(blockchain.to_dict())
+
+    addresses = [w.address for w in wallets] + ["SYSTEM", "Qinconnu"]
+    ok = True
+    for chain in (blockchain, restored):
+        for address in addresses:
+            if chain.get_next_expected_nonce(address) != scan_next_expected_nonce(chain, address):
+                print(f"✗ Divergence pour {address[:20]}...")
+                ok = False
+
+    start = time.perf_counter()
+    for address in addresses:
+        scan_next_expected_nonce(blockchain, address)
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for address in addresses:
+        blockchain.get_next_expected_nonce(address)
+    index_time = time.perf_counter() - start
+
+    print(f"Blocs: {len(blockchain.chain)} | Transactions en attente: {len(blockchain.pending_transactions)}")
+    print(f"Résultats identiques (index vs parcours, y compris après from_dict): {'oui' if ok else 'NON'}")
+    print(f"Parcours complet: {scan_time / len(addresses) * 1e6:10.1f} µs/appel")
+    print(f"Index:            {index_time / len(addresses) * 1e6:10.1f} µs/appel")
+    return ok
+
+# ============================================================================
+# HISTORIQUE DES TRANSACTIONS
+# ============================================================================
+
+def bench_history(args) -> bool:
+    print_header("HISTORIQUE DES TRANSACTIONS (PROTECTION 6)")
+    now = time.time()
+    # Transactions réparties sur 10 fenêtres d'expiration
+    span = TRANSACTION_MAX_AGE * 10
+    entries = [(f"{i:064x}", now - span + span * i / args.txs) for i in range(args.txs)]
+
+    history_list: List[str] = []
+    history = TransactionHistory()
+    for tx_hash, timestamp in entries:
+        history_list.append(tx_hash)
+        history.add(tx_hash, timestamp)
+
+    probes = [tx_hash for tx_hash, _ in random.sample(entries, 200)]
+
+    start = time.perf_counter()
+    for tx_hash in probes:
+        tx_hash in history_list
+    list_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for tx_hash in probes:
+        tx_hash in history
+    set_time = time.perf_counter() - start
+
+    # Les entrées encore rejouables doivent toutes être présentes
+    cutoff = time.time() - TRANSACTION_MAX_AGE
+    ok = all(tx_hash in history for tx_hash, timestamp in entries if timestamp >= cutoff)
+
+    print(f"Transactions traitées: {len(history_list)}")
+    print(f"Entrées conservées (fenêtre de {TRANSACTION_MAX_AGE}s): {len(history)}")
+    print(f"Transactions non expirées toutes présentes: {'oui' if ok else 'NON'}")
+    print(f"Liste:        {list_time / len(probes) * 1e6:10.1f} µs/recherche")
+    print(f"Dictionnaire: {set_time / len(probes) * 1e6:10.1f} µs/recherche")
+    return ok
+
+# ============================================================================
+# MEMPOOL
+# ============================================================================
+
+def bench_mempool(args) -> bool:
+    print_header("MEMPOOL INDEXÉE")
+    blockchain = SimplePoSBlockchain()
+    per_sender = blockchain.max_pending_per_address
+    wallets = [legacy_wallet() for _ in range(args.txs // per_sender + 1)]
+    for wallet in wallets:
+        blockchain.balances[wallet.address] = 1_000_000
+
+    transactions = []
+    for wallet in wallets:
+        for nonce in range(per_sender):
+            tx = Transaction(wallet.address, wallets[0].address, 1, 0.01, nonce)
+            tx.sign(wallet)
+            transactions.append(tx)
+    transactions = transactions[:args.txs]
+
+    # Temps d'insertion mesuré par tranche: il doit rester stable quand la pool grossit
+    slice_size = max(1, len(transactions) // 5)
+    ok = True
+    for start_index in range(0, len(transactions), slice_size):
+        chunk = transactions[start_index:start_index + slice_size]
+        start = time.perf_counter()
+        for tx in chunk:
+            ok &= blockchain.add_transaction(tx)
+        elapsed = time.perf_counter() - start
+        print(f"Pool {start_index:6d} → {start_index + len(chunk):6d}: {elapsed / len(chunk) * 1e6:8.1f} µs/soumission")
+
+    # Les doublons doivent être rejetés
+    ok &= not blockchain.add_transaction(transactions[0])
+    expected_fees = sum(tx.fee for tx in transactions)
+    ok &= abs(blockchain.transaction_fees_pool - expected_fees) < 1e-6
+
+    start = time.perf_counter()
+    blockchain.pending_transactions.remove_many(tx.get_hash() for tx in transactions[:blockchain.max_block_size])
+    remove_time = time.perf_counter() - start
+
+    print(f"Transactions en attente: {len(blockchain.pending_transactions)}")
+    print(f"Retrait d'un bloc de {blockchain.max_block_size} transactions: {remove_time * 1e3:.2f} ms")
+    print(f"Doublons rejetés et frais cohérents: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# ASSEMBLAGE DES BLOCS
+# ============================================================================
+
+def fifo_selection(blockchain: SimplePoSBlockchain) -> List[Transaction]:
+    """Ancien algorithme: les max_block_size premières transactions arrivées"""
+    selected = []
+    for tx in itertools.islice(blockchain.pending_transactions, blockchain.max_block_size):
+        if tx.is_valid() and blockchain.get_balance(tx.sender) >= tx.amount + tx.fee:
+            selected.append(tx)
+    return selected
+
+def priority_selection(blockchain: SimplePoSBlockchain) -> List[Transaction]:
+    """Sélection par frais (même surcouche des comptes que create_block)"""
+    overlay = blockchain.new_block_overlay()
+
+    def can_include(tx: Transaction) -> bool:
+        return tx.is_valid() and overlay.stage(tx) is None
+
+    return blockchain.pending_transactions.select(blockchain.max_block_size, can_include)
+
+def bench_assembly(args) -> bool:
+    print_header("ASSEMBLAGE DES BLOCS: PRIORITÉ AUX FRAIS VS FIFO")
+    blockchain = SimplePoSBlockchain()
+    per_sender = blockchain.max_pending_per_address
+    wallets = [legacy_wallet() for _ in range(args.txs // per_sender + 1)]
+    for wallet in wallets:
+        blockchain.balances[wallet.address] = 1_000_000
+
+    # Le spam à frais minimes arrive en premier, le trafic mieux rémunéré ensuite
+    count = 0
+    for index, wallet in enumerate(wallets):
+        fee = 0.01 if index < len(wallets) // 2 else round(random.uniform(0.1, 5), 2)
+        for nonce in range(per_sender):
+            if count >= args.txs:
+                break
+            tx = Transaction(wallet.address, wallets[0].address, 1, fee, nonce)
+            tx.sign(wallet)
+            blockchain.add_transaction(tx)
+            count += 1
+
+    results = {}
+    for name, selector in (("FIFO", fifo_selection), ("Priorité", priority_selection)):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            selected = selector(blockchain)
+        elapsed = (time.perf_counter() - start) / args.rounds
+        results[name] = (selected, elapsed)
+
+    # L'ordre des nonces de chaque expéditeur doit être respecté
+    selected = results["Priorité"][0]
+    last_nonce: Dict[str, int] = {}
+    ok = True
+    for tx in selected:
+        if tx.nonce != last_nonce.get(tx.sender, -1) + 1:
+            ok = False
+        last_nonce[tx.sender] = tx.nonce
+
+    print(f"Transactions en attente: {len(blockchain.pending_transactions)} | Taille de bloc: {blockchain.max_block_size}")
+    for name, (selected, elapsed) in results.items():
+        revenue = sum(tx.fee for tx in selected)
+        print(f"{name:10s} {len(selected):4d} transactions | frais: {revenue:10.2f} | assemblage: {elapsed * 1e3:7.3f} ms")
+    print(f"Ordre des nonces respecté: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# HASH DES TRANSACTIONS
+# ============================================================================
+
+def legacy_transaction_hash(tx: Transaction) -> str:
+    """Ancien calcul de Transaction.get_hash(), refait à chaque appel"""
+    data = f"{tx.sender}{tx.recipient}{tx.amount}{tx.fee}{tx.nonce}{tx.timestamp}"
+    return hashlib.sha3_256(data.encode()).hexdigest()
+
+def bench_txhash(args) -> bool:
+    print_header("HASH DES TRANSACTIONS EN CACHE")
+    wallet = QuantumAddress()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    transactions = [
+        Transaction(wallet.address, wallet.address, random.uniform(1, 100), random.uniform(0, 1), nonce)
+        for nonce in range(args.txs)
+    ]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    memory = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+
+    # Les hash doivent rester identiques à l'ancien calcul, y compris après modification
+    ok = all(tx.get_hash() == legacy_transaction_hash(tx) for tx in transactions)
+    sample = random.sample(transactions, min(100, len(transactions)))
+    for tx in sample:
+        tx.fee += 1
+        tx.timestamp += 1
+    ok &= all(tx.get_hash() == legacy_transaction_hash(tx) for tx in sample)
+
+    repeats = 5
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for tx in transactions:
+            legacy_transaction_hash(tx)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for tx in transactions:
+            tx.get_hash()
+    cached_time = time.perf_counter() - start
+
+    calls = repeats * len(transactions)
+    print(f"Transactions: {len(transactions)} | Mémoire: {memory / len(transactions):.0f} octets/transaction")
+    print(f"Hash identiques à l'ancien calcul (y compris après modification): {'oui' if ok else 'NON'}")
+    print(f"Recalcul à chaque appel: {legacy_time / calls * 1e6:8.2f} µs/appel")
+    print(f"Hash en cache:           {cached_time / calls * 1e6:8.2f} µs/appel")
+    return ok
+
+# ============================================================================
+# RACINE DE MERKLE
+# ============================================================================
+
+def bench_merkle(args) -> bool:
+    print_header("HASH D'EN-TÊTE ET RACINE DE MERKLE")
+    wallet = QuantumAddress()
+    ok = True
+    for size in (10, 100, 1000):
+        transactions = []
+        for nonce in range(size):
+            tx = Transaction(wallet.address, wallet.address, 1, 0.01, nonce)
+            tx.sign(wallet)
+            transactions.append(tx)
+        legacy = Block(1, transactions, "0" * 64, wallet.address, 100, LEGACY_BLOCK_VERSION)
+        block = Block(1, transactions, "0" * 64, wallet.address, 100, BLOCK_VERSION)
+
+        # Les blocs des deux formats doivent survivre à la sérialisation
+        for original in (legacy, block):
+            restored = Block.from_dict(original.to_dict())
+            ok &= restored.hash == restored.calculate_hash() and restored.has_valid_merkle_root()
+
+        # Toute transaction doit avoir une preuve d'inclusion valide
+        ok &= all(verify_merkle_proof(tx.get_leaf_hash(), block.get_merkle_proof(tx.get_hash()), block.merkle_root)
+                  for tx in transactions)
+
+        # Une transaction modifiée doit invalider la racine
+        tampered_data = block.to_dict()
+        tampered_data['transactions'][0]['amount'] = 1000
+        tampered = Block.from_dict(tampered_data)
+        ok &= tampered.hash == tampered.calculate_hash() and not tampered.has_valid_merkle_root()
+
+        timings = []
+        for candidate in (legacy, block):
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                candidate.calculate_hash()
+            timings.append((time.perf_counter() - start) / args.rounds)
+
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            Block.from_dict(block.to_dict()).has_valid_merkle_root()
+        verify_time = (time.perf_counter() - start) / args.rounds
+
+        print(f"{size:5d} transactions | hash legacy: {timings[0] * 1e3:8.3f} ms | "
+              f"hash d'en-tête: {timings[1] * 1e3:6.3f} ms | décodage + racine: {verify_time * 1e3:8.3f} ms")
+
+    print(f"Formats 1 et 2 valides, preuves correctes, falsification détectée: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# REDÉMARRAGE DEPUIS LE STOCKAGE PERSISTANT
+# ============================================================================
+
+def bench_restart(args) -> bool:
+    print_header("REDÉMARRAGE DEPUIS LE DISQUE")
+    ok = True
+    with tempfile.TemporaryDirectory() as directory:
+        def open_state():
+            if args.state_backend == 'sqlite':
+                return SQLiteState(os.path.join(directory, 'state.sqlite3'))
+            return None
+
+        store = ChainStore(directory, snapshot_interval=args.snapshot_interval)
+        blockchain = SimplePoSBlockchain(store=store, state=open_state())
+        wallets = fund_wallets(blockchain, 20)
+        # État initial (soldes hors chaîne) pour mesurer un rejeu complet
+        initial_state = copy.deepcopy(blockchain.snapshot_state())
+
+        start = time.perf_counter()
+        fill_blocks(blockchain, wallets, args.blocks, args.txs)
+        build_time = time.perf_counter() - start
+        blockchain.save_snapshot()
+        expected_balances = dict(blockchain.balances)
+        expected_tip = blockchain.get_latest_block().hash
+        store.close()
+        if blockchain.state.persistent:
+            blockchain.state.close()
+
+        def restart() -> Tuple[bool, float]:
+            """Redémarre depuis le disque; retourne (état identique, durée)"""
+            start = time.perf_counter()
+            restored = SimplePoSBlockchain(store=ChainStore(directory), state=open_state())
+            elapsed = time.perf_counter() - start
+            same = (restored.get_latest_block().hash == expected_tip
+                    and len(restored.chain) == args.blocks + 1
+                    and all(abs(restored.get_balance(a) - b) < 1e-6 for a, b in expected_balances.items()))
+            restored.store.close()
+            if restored.state.persistent:
+                restored.state.close()
+            return same, elapsed
+
+        # 1. Snapshot à la hauteur courante: aucun bloc à rejouer
+        same, snapshot_time = restart()
+        ok &= same
+
+        # 2. Seul le snapshot initial est disponible: rejeu de toute la chaîne
+        #    (avec SQLite, les comptes restent à jour dans la base: seul l'historique est rejoué)
+        saved = {}
+        for path in glob.glob(os.path.join(directory, 'snapshot-*.json')):
+            with open(path, 'rb') as f:
+                saved[path] = f.read()
+            os.remove(path)
+        initial_store = ChainStore(directory)
+        initial_store.save_snapshot(initial_state)
+        initial_store.close()
+        same, replay_time = restart()
+        ok &= same
+        for path in glob.glob(os.path.join(directory, 'snapshot-*.json')):
+            os.remove(path)
+        for path, content in saved.items():
+            with open(path, 'wb') as f:
+                f.write(content)
+
+        # 3. Écriture interrompue: le bloc incomplet est écarté au redémarrage
+        segment = sorted(glob.glob(os.path.join(directory, 'blocks-*.log')))[-1]
+        with open(segment, 'ab') as f:
+            f.write(b'{"index": ')
+        same, _ = restart()
+        ok &= same
+
+    print(f"Blocs: {args.blocks} x {args.txs} transactions | construction: {build_time:.2f} s")
+    print(f"Redémarrage avec snapshot récent: {snapshot_time * 1e3:8.1f} ms")
+    print(f"Redémarrage par rejeu complet:    {replay_time * 1e3:8.1f} ms")
+    print(f"État restauré identique (y compris après écriture interrompue): {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# ÉTAT DES COMPTES: MÉMOIRE VS SQLITE
+# ============================================================================
+
+def bench_state(args) -> bool:
+    print_header("ÉTAT DES COMPTES: MÉMOIRE VS SQLITE")
+    now = time.time()
+    ok = True
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, state in (("Mémoire", MemoryState()),
+                            ("SQLite", SQLiteState(os.path.join(directory, 'state.sqlite3')))):
+            tracemalloc.start()
+            start = time.perf_counter()
+            with state.batch():
+                for i in range(args.accounts):
+                    address = f"Q{i:046x}"
+                    state.balances[address] = float(i % 100000)
+                    state.last_activity[address] = now - (i % 90) * 24 * 3600
+                    if i % 1000 == 0:
+                        state.validators[address] = float(i)
+            load_time = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            top = state.top_balances(10)
+            validators = state.validators_by_stake(10)
+            inactive = state.inactive_accounts(now - 30 * 24 * 3600, 100)
+            query_time = time.perf_counter() - start
+            results[name] = (top, validators, inactive)
+            print(f"{name:8s} chargement: {load_time:6.2f} s | mémoire Python: {peak / 1e6:8.1f} Mo | "
+                  f"3 requêtes de classement: {query_time * 1e3:8.2f} ms")
+            if state.persistent:
+                state.close()
+
+    # Les deux backends doivent donner les mêmes classements (aux égalités près)
+    memory_top, sqlite_top = results["Mémoire"][0], results["SQLite"][0]
+    ok &= [b for _, b in memory_top] == [b for _, b in sqlite_top]
+    ok &= results["Mémoire"][1] == results["SQLite"][1]
+    ok &= len(results["Mémoire"][2]) == len(results["SQLite"][2])
+    print(f"Comptes: {args.accounts} | Résultats identiques: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# VALIDATION INCRÉMENTALE VS AUDIT COMPLET
+# ============================================================================
+
+def fund_wallets_on_chain(blockchain: SimplePoSBlockchain, num_wallets: int) -> List[QuantumAddress]:
+    """Approvisionne les wallets par un bloc de MINT (balances cohérentes avec la chaîne)"""
+    validator = QuantumAddress()
+    blockchain.balances[validator.address] = 1000
+    blockchain.register_validator(validator.address, 1000)  # Solde 0, comme le recalcule la chaîne
+
+    wallets = [QuantumAddress() for _ in range(num_wallets)]
+    mints = [Transaction("SYSTEM", wallet.address, 1_000_000, tx_type="MINT") for wallet in wallets]
+    latest = blockchain.get_latest_block()
+    blockchain.apply_block(Block(latest.index + 1, mints, latest.hash, "SYSTEM", 0))
+    return wallets
+
+def bench_validation(args) -> bool:
+    print_header("VALIDATION INCRÉMENTALE VS AUDIT COMPLET")
+    blockchain = SimplePoSBlockchain()
+    wallets = fund_wallets_on_chain(blockchain, 20)
+    fill_blocks(blockchain, wallets, args.blocks, args.txs)
+
+    start = time.perf_counter()
+    ok = blockchain.is_valid(deep=True)
+    deep_time = time.perf_counter() - start
+    start = time.perf_counter()
+    ok &= blockchain.is_valid()
+    first_time = time.perf_counter() - start
+
+    incremental_time = 0.0
+    for _ in range(args.rounds):
+        fill_blocks(blockchain, wallets, 1, args.txs)
+        start = time.perf_counter()
+        incremental = blockchain.is_valid()
+        incremental_time += time.perf_counter() - start
+        ok &= incremental == blockchain.is_valid(deep=True) == True
+
+    # Un solde modifié hors chaîne doit être détecté par les deux modes
+    blockchain.register_validator(wallets[1].address, 1000)
+    ok &= blockchain.is_valid() == blockchain.is_valid(deep=True) == False
+
+    print(f"Blocs: {len(blockchain.chain)} | {args.txs} tx/bloc")
+    print(f"Audit complet:              {deep_time * 1e3:8.2f} ms")
+    print(f"Premier contrôle (complet): {first_time * 1e3:8.2f} ms")
+    print(f"Contrôle après 1 bloc:      {incremental_time / args.rounds * 1e3:8.2f} ms")
+    print(f"Empreinte: {blockchain.state_digest[:16]}... (hauteur {blockchain.verified_height})")
+
+    # État SQLite: soldes recalculés dans des tables temporaires, comparés en SQL
+    with tempfile.TemporaryDirectory() as directory:
+        state = SQLiteState(os.path.join(directory, 'state.sqlite3'))
+        persistent = SimplePoSBlockchain(state=state)
+        persistent.chain = blockchain.chain
+        with state.batch():
+            state.balances.update(blockchain.balances)
+            state.validators.update(blockchain.validators)
+        # Annule le staking hors chaîne fait plus haut: l'état redevient cohérent
+        stake = state.validators.pop(wallets[1].address)
+        state.balances[wallets[1].address] += stake
+        tracemalloc.start()
+        start = time.perf_counter()
+        consistent = persistent.verify_balance_consistency() and persistent.check_balance_consistency()
+        sqlite_time = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        state.balances[wallets[2].address] += 1
+        persistent._full_comparison = True
+        detected = not persistent.check_balance_consistency() and not persistent.verify_balance_consistency()
+        ok &= consistent and detected
+        state.close()
+    print(f"SQLite (audit + premier contrôle): {sqlite_time * 1e3:8.2f} ms | "
+          f"mémoire Python: {peak / 1e6:.1f} Mo | écart détecté: {'oui' if detected else 'NON'}")
+    print(f"Résultats identiques: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# STATUT EN CACHE (ETAG)
+# ============================================================================
+
+def bench_status(args) -> bool:
+    print_header("STATUT EN CACHE VS RECALCUL À CHAQUE REQUÊTE")
+    node = Node(0)
+    node.blockchain, wallets = build_chain(args.blocks, args.txs)
+    node.rate_limit_max_requests = 3 * args.requests  # Le client de test est une seule IP
+    client = node.app.test_client()
+
+    # Ancien comportement: cohérence des balances et validation complètes à chaque requête
+    start = time.perf_counter()
+    for _ in range(max(1, args.requests // 100)):
+        node.blockchain.verify_balance_consistency()
+        node.blockchain.is_valid(deep=True)
+    full_time = (time.perf_counter() - start) / max(1, args.requests // 100)
+
+    response = client.get('/blockchain/status')
+    etag = response.headers['ETag']
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        client.get('/blockchain/status')
+    cached_time = (time.perf_counter() - start) / args.requests
+
+    start = time.perf_counter()
+    not_modified = 0
+    for _ in range(args.requests):
+        not_modified += client.get('/blockchain/status', headers={'If-None-Match': etag}).status_code == 304
+    conditional_time = (time.perf_counter() - start) / args.requests
+
+    # Après un nouveau bloc, le statut servi doit être celui recalculé
+    fill_blocks(node.blockchain, wallets, 1, args.txs)
+    response = client.get('/blockchain/status', headers={'If-None-Match': etag})
+    ok = not_modified == args.requests
+    ok &= response.status_code == 200 and response.get_json() == node.build_status()
+    ok &= response.get_json()['blocks'] == len(node.blockchain.chain)
+
+    print(f"Blocs: {len(node.blockchain.chain)} | {args.txs} tx/bloc | {args.requests} requêtes")
+    print(f"Recalcul complet (ancien): {full_time * 1e3:8.2f} ms/requête")
+    print(f"Statut en cache:           {cached_time * 1e3:8.2f} ms/requête")
+    print(f"If-None-Match (304):       {conditional_time * 1e3:8.2f} ms/requête")
+    print(f"Résultats identiques: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# RÉCUPÉRATION DES BLOCS: CHAÎNE COMPLÈTE VS PAGES
+# ============================================================================
+
+def measure_request(client, url: str) -> Tuple[float, int, int]:
+    """Temps (s), pic mémoire Python (octets) et taille du corps d'une requête GET
+
+    Le corps est lu morceau par morceau, comme un client qui traite le flux au fil de l'eau.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(url, buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+def bench_blocks(args) -> bool:
+    print_header("RÉCUPÉRATION DES BLOCS: CHAÎNE COMPLÈTE VS PAGES")
+    ok = True
+    for num_blocks in (args.blocks // 4, args.blocks):
+        node = Node(0)
+        node.blockchain, _ = build_chain(num_blocks, args.txs)
+        client = node.app.test_client()
+        chain = node.blockchain.chain
+
+        full_time, full_peak, _ = measure_request(client, '/blockchain')
+        page_time, page_peak, _ = measure_request(client, '/blocks?from=-5')
+        stream_time, stream_peak, _ = measure_request(client, '/blocks?format=ndjson')
+
+        # Mêmes blocs que l'ancien /blockchain, quel que soit le format
+        full_chain = client.get('/blockchain').get_json()['chain']
+        ok &= client.get('/blocks?from=-5').get_json()['blocks'] == full_chain[-5:]
+        stream = client.get('/blocks?format=ndjson').get_data(as_text=True)
+        ok &= [json.loads(line) for line in stream.splitlines()] == full_chain
+        block = chain[len(chain) // 2]
+        ok &= client.get(f'/block/{block.hash}').get_json() == full_chain[block.index]
+
+        print(f"Blocs: {len(chain):5d} | /blockchain: {full_time * 1e3:8.2f} ms, {full_peak / 1e6:6.1f} Mo | "
+              f"/blocks?from=-5: {page_time * 1e3:6.2f} ms, {page_peak / 1e6:5.2f} Mo | "
+              f"NDJSON complet: {stream_time * 1e3:8.2f} ms, {stream_peak / 1e6:5.2f} Mo")
+    print(f"Résultats identiques: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# SYNCHRONISATION PAR EN-TÊTES VS CHAÎNE COMPLÈTE
+# ============================================================================
+
+def serve_node(node: Node) -> Tuple[str, object]:
+    """Sert un nœud en HTTP sur un port libre (thread de fond); retourne (url, serveur)"""
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    node.rate_limit_max_requests = 10 ** 9  # Tous les nœuds de test partagent 127.0.0.1
+    server = make_server('127.0.0.1', 0, node.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+def follower_node(source: SimplePoSBlockchain, height: int) -> Node:
+    """Nœud qui possède les height premiers blocs de source (même genesis)
+
+    Les validateurs de source y sont enregistrés: les blocs synchronisés
+    d'un validateur inconnu sont refusés.
+    """
+    node = Node(0)
+    node.blockchain.rollback(0)
+    node.blockchain.validators.update(source.validators)
+    for index in range(height):
+        error = node.blockchain.apply_synced_block(source.chain[index])
+        assert error is None, error
+    return node
+
+def bench_sync(args) -> bool:
+    print_header("SYNCHRONISATION PAR EN-TÊTES VS CHAÎNE COMPLÈTE")
+    source = Node(0)
+    source.blockchain, wallets = build_chain(args.blocks, args.txs)
+    source.blockchain.treasury_address = DEFAULT_TREASURY_ADDRESS
+    url, server = serve_node(source)
+    chain = source.blockchain.chain
+    ok = True
+
+    # Ancien /sync: toute la chaîne téléchargée, reconstruite et revalidée
+    start = time.perf_counter()
+    data = requests.get(f"{url}/blockchain", timeout=60).json()
+    rebuilt = SimplePoSBlockchain()
+    rebuilt.chain = [Block.from_dict(block) for block in data['chain']]
+    rebuilt.is_valid(deep=True)
+    full_time = time.perf_counter() - start
+    print(f"Blocs: {len(chain)} | {args.txs} tx/bloc")
+    print(f"Ancien /sync (chaîne complète):      {full_time * 1e3:9.2f} ms")
+
+    # Retards plus courts que la chaîne seulement (le suiveur garde au moins le genesis)
+    for behind in [behind for behind in (10, 100) if behind < len(chain) - 1] + [len(chain) - 1]:
+        follower = follower_node(source.blockchain, len(chain) - behind)
+        start = time.perf_counter()
+        result, status_code = follower.sync_with_peer(url)
+        elapsed = time.perf_counter() - start
+        ok &= status_code == 200 and result['applied'] == behind
+        ok &= [block.hash for block in follower.blockchain.chain] == [block.hash for block in chain]
+        print(f"En-têtes puis blocs, {behind:5d} blocs de retard: {elapsed * 1e3:9.2f} ms")
+
+    # Fork: le suiveur a produit son propre bloc, la branche du peer est plus longue
+    follower = follower_node(source.blockchain, len(chain) - 20)
+    mint = Transaction("SYSTEM", wallets[1].address, 5, tx_type="MINT")
+    latest = follower.blockchain.get_latest_block()
+    follower.blockchain.apply_block(Block(latest.index + 1, [mint], latest.hash, "SYSTEM", 0))
+    start = time.perf_counter()
+    result, status_code = follower.sync_with_peer(url)
+    elapsed = time.perf_counter() - start
+    ok &= status_code == 200 and result['reorganized']
+    ok &= follower.blockchain.get_latest_block().hash == chain[-1].hash
+    print(f"Fork de 20 blocs (réorganisation):   {elapsed * 1e3:9.2f} ms")
+
+    # Branche invalide: refusée avant la réorganisation, la chaîne locale reste intacte
+    rejected = follower_node(source.blockchain, len(chain) - 20)
+    kept = [block.hash for block in rejected.blockchain.chain]
+    branch = chain[len(chain) - 21:]
+    branch[-1] = Block.from_dict({**chain[-1].to_dict(), 'stake': chain[-1].stake * 2})
+    count, error = rejected.apply_synced_blocks(branch, len(chain) - 21)
+    ok &= count == 0 and error is not None
+    ok &= [block.hash for block in rejected.blockchain.chain] == kept
+    print(f"Branche invalide refusée, chaîne locale intacte: {'oui' if error and count == 0 else 'NON'}")
+
+    # Branche valide mais pas plus longue que la chaîne locale: conservée, quelle que
+    # soit la hauteur annoncée par le peer
+    longer = follower_node(source.blockchain, len(chain))
+    latest = longer.blockchain.get_latest_block()
+    staker = wallets[2].address
+    funding = Transaction("SYSTEM", staker, 1000, tx_type="MINT")
+    longer.blockchain.apply_block(Block(latest.index + 1, [mint, funding], latest.hash, "SYSTEM", 0))
+    kept = [block.hash for block in longer.blockchain.chain]
+    count, error = longer.apply_synced_blocks(chain[len(chain) - 5:], len(chain) - 5)
+    shorter_refused = count == 0 and error is not None and [block.hash for block in longer.blockchain.chain] == kept
+    ok &= shorter_refused
+    print(f"Branche plus courte refusée: {'oui' if shorter_refused else 'NON'}")
+
+    # Réorganisation: les stakes enregistrés hors chaîne restent déduits des soldes rejoués
+    ok &= longer.blockchain.register_validator(staker, longer.blockchain.min_stake)
+    balance = longer.blockchain.get_balance(staker)
+    longer.blockchain.rollback(len(longer.blockchain.chain))
+    restaked = longer.blockchain.get_balance(staker) == balance
+    ok &= restaked
+    print(f"Stakes conservés après réorganisation: {'oui' if restaked else 'NON'}")
+
+    # Un nœud à jour n'applique rien
+    result, status_code = follower.sync_with_peer(url)
+    ok &= status_code == 200 and result['applied'] == 0
+    server.shutdown()
+    print(f"Chaînes identiques après synchronisation: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# RATTRAPAGE PARALLÈLE DEPUIS PLUSIEURS PEERS
+# ============================================================================
+
+def throttle_blocks(node: Node, latency: float):
+    """Simule la bande passante d'un peer: une requête /blocks à la fois, latency s chacune"""
+    lock = threading.Lock()
+
+    @node.app.before_request
+    def limit_bandwidth():
+        if request.path == '/blocks':
+            with lock:
+                time.sleep(latency)
+
+def bench_catchup(args) -> bool:
+    print_header("RATTRAPAGE PARALLÈLE DEPUIS PLUSIEURS PEERS")
+    blockchain, _ = build_chain(args.blocks, args.txs)
+    blockchain.treasury_address = DEFAULT_TREASURY_ADDRESS
+
+    # Plusieurs nœuds Flask dans le processus, qui servent la même chaîne
+    servers, urls = [], []
+    for _ in range(args.peers):
+        node = Node(0)
+        node.blockchain = blockchain
+        throttle_blocks(node, args.latency / 1000)
+        url, server = serve_node(node)
+        servers.append(server)
+        urls.append(url)
+
+    ok = True
+    print(f"Blocs: {len(blockchain.chain)} | {args.txs} tx/bloc | "
+          f"{args.latency} ms par lot de {blockchain_node.BLOCKS_PAGE_SIZE} blocs et par peer")
+    baseline = None
+    peer_counts = sorted({1, 2, args.peers} | ({4} if args.peers >= 4 else set()))
+    for count in peer_counts:
+        follower = follower_node(blockchain, 1)
+        follower.peers = urls[:count]
+        start = time.perf_counter()
+        result, status_code = follower.catch_up()
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        ok &= status_code == 200 and follower.blockchain.get_latest_block().hash == blockchain.chain[-1].hash
+        print(f"{count:2d} peer(s): {elapsed * 1e3:9.2f} ms (x{baseline / elapsed:4.2f})")
+
+    # Un peer injoignable: ses lots sont redemandés aux autres
+    follower = follower_node(blockchain, 1)
+    follower.peers = urls[:2] + ["http://127.0.0.1:9"]
+    start = time.perf_counter()
+    result, status_code = follower.sync_with_peer(urls[0])
+    elapsed = time.perf_counter() - start
+    ok &= status_code == 200 and follower.blockchain.get_latest_block().hash == blockchain.chain[-1].hash
+    print(f"2 peers + 1 injoignable: {elapsed * 1e3:9.2f} ms")
+
+    for server in servers:
+        server.shutdown()
+    print(f"Chaînes identiques après rattrapage: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# DIFFUSION: ENVOIS SÉQUENTIELS VS GOSSIP ASYNCHRONE
+# ============================================================================
+
+def sequential_broadcast(node: Node, path: str, payload: Dict):
+    """Ancienne diffusion: un peer après l'autre, dans la requête HTTP"""
+    for peer in node.peers:
+        try:
+            requests.post(f"{peer}{path}", json=payload, timeout=2)
+        except requests.RequestException:
+            pass
+
+def bench_gossip(args) -> bool:
+    print_header("DIFFUSION: ENVOIS SÉQUENTIELS VS GOSSIP ASYNCHRONE")
+    sender, recipient = QuantumAddress(), QuantumAddress()
+
+    def funded_node() -> Node:
+        node = Node(0)
+        node.blockchain.balances[sender.address] = 1_000_000
+        node.blockchain.max_pending_per_address = 10 ** 6
+        return node
+
+    live = [funded_node() for _ in range(args.peers)]
+    slow = [funded_node() for _ in range(args.slow)]
+    for node in slow:
+        @node.app.before_request
+        def delay():
+            time.sleep(args.delay / 1000)
+    served = [serve_node(node) for node in live + slow]
+
+    source = funded_node()
+    source.rate_limit_max_requests = 10 ** 9
+    source.peers = [url for url, _ in served]
+    client = source.app.test_client()
+    asynchronous = source.broadcast_transaction
+    ok = True
+    print(f"Peers: {args.peers} réactifs + {args.slow} lents ({args.delay} ms par requête) | {args.txs} transactions")
+
+    for name in ("séquentielle (ancienne)", "asynchrone"):
+        if name == "asynchrone":
+            source.broadcast_transaction = asynchronous
+        else:
+            source.broadcast_transaction = lambda tx: sequential_broadcast(source, '/transaction/receive', tx.to_dict())
+        start = time.perf_counter()
+        for _ in range(args.txs):
+            response = client.post('/transaction/send', json={
+                'sender': sender.address, 'recipient': recipient.address,
+                'amount': 1, 'private_key': sender.private_key
+            })
+            ok &= response.get_json()['success']
+        elapsed = time.perf_counter() - start
+        source.gossip.wait_idle()
+        propagated = time.perf_counter() - start
+        print(f"Diffusion {name:24s}: /transaction/send {elapsed / args.txs * 1e3:8.2f} ms/requête | "
+              f"propagation terminée en {propagated:6.2f} s")
+
+    # Chaque peer a reçu toutes les transactions de la source
+    expected = {tx.get_hash() for tx in source.blockchain.pending_transactions}
+    for node in live + slow:
+        ok &= {tx.get_hash() for tx in node.blockchain.pending_transactions} == expected
+    print(f"Statistiques gossip: {source.gossip.stats}")
+
+    # Un peer qui répond à /inv par autre chose qu'un objet JSON: envoi compté en
+    # échec, et le peer peut recevoir les annonces suivantes
+    broken = Node(0)
+
+    @broken.app.before_request
+    def malformed():
+        if request.path == '/inv':
+            return Response('[]', mimetype='application/json')
+    url, server = serve_node(broken)
+    served.append((url, server))
+    failed = source.gossip.stats['failed']
+    for attempt in range(2):
+        source.gossip.announce(url, 'tx', f'{attempt:064x}')
+        source.gossip.wait_idle()
+    recovered = source.gossip.stats['failed'] == failed + 2 and url not in source.gossip.active
+    ok &= recovered
+    broken.gossip.close()
+    print(f"Réponse /inv malformée: envoi en échec, peer toujours desservi: {'oui' if recovered else 'NON'}")
+
+    source.gossip.close()
+    for _, server in served:
+        server.shutdown()
+    print(f"Transactions propagées à tous les peers: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# INVENTAIRE: ANNONCES DE HASH VS ENVOI DES CORPS À CHAQUE PEER
+# ============================================================================
+
+def count_traffic(node: Node, traffic: Dict[str, int]):
+    """Compte les octets reçus par route de diffusion (corps seuls ou par lots confondus)"""
+    lock = threading.Lock()
+
+    @node.app.before_request
+    def count():
+        if request.path not in ('/inv', '/transaction/receive', '/transactions/receive_batch'):
+            return
+        key = '/inv' if request.path == '/inv' else '/transaction/receive'
+        if request.path == '/transactions/receive_batch':
+            bodies = len(request.get_json()['transactions'])
+        else:
+            bodies = 1
+        with lock:
+            traffic[key] = traffic.get(key, 0) + (request.content_length or 0)
+            traffic[key + ' (requêtes)'] = traffic.get(key + ' (requêtes)', 0) + (bodies if key != '/inv' else 1)
+
+def push_flood(node: Node):
+    """Ancienne diffusion étendue au relais: le corps est poussé à chaque peer"""
+    def broadcast_transaction(tx: Transaction):
+        for peer in node.peers:
+            node.gossip.send(peer, '/transaction/receive', tx.to_dict())
+    node.broadcast_transaction = broadcast_transaction
+
+def bench_inventory(args) -> bool:
+    print_header("INVENTAIRE: ANNONCES DE HASH VS ENVOI DES CORPS À CHAQUE PEER")
+    sender, recipient = QuantumAddress(), QuantumAddress()
+    ok = True
+    results = {}
+    for mode in ("corps poussés", "inventaire"):
+        # Réseau complètement maillé: chaque nœud relaie ce qu'il accepte
+        nodes, servers, traffic = [], [], {}
+        for _ in range(args.nodes):
+            node = Node(0)
+            node.blockchain.balances[sender.address] = 1_000_000
+            node.blockchain.max_pending_per_address = 10 ** 6
+            count_traffic(node, traffic)
+            url, server = serve_node(node)
+            node.public_url = node.gossip.origin = url
+            if mode == "corps poussés":
+                push_flood(node)
+            nodes.append(node)
+            servers.append(server)
+        for node in nodes:
+            node.peers = [other.public_url for other in nodes if other is not node]
+
+        client = nodes[0].app.test_client()
+        nodes[0].rate_limit_max_requests = 10 ** 9
+        start = time.perf_counter()
+        for _ in range(args.txs):
+            response = client.post('/transaction/send', json={
+                'sender': sender.address, 'recipient': recipient.address,
+                'amount': 1, 'private_key': sender.private_key
+            })
+            ok &= response.get_json()['success']
+        # Propagation terminée quand chaque nœud a toutes les transactions
+        expected = {tx.get_hash() for tx in nodes[0].blockchain.pending_transactions}
+        deadline = time.time() + 60
+        while time.time() < deadline and not all(
+                {tx.get_hash() for tx in node.blockchain.pending_transactions} == expected for node in nodes):
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        # Puis fin des relais (annonces restantes) avant de compter le trafic
+        while not all([node.gossip.wait_idle(1) for node in nodes]):
+            pass
+        time.sleep(0.2)
+
+        ok &= len(expected) == args.txs
+        for node in nodes[1:]:
+            ok &= {tx.get_hash() for tx in node.blockchain.pending_transactions} == expected
+        results[mode] = traffic
+        print(f"{mode:14s}: corps reçus {traffic.get('/transaction/receive (requêtes)', 0):5d} "
+              f"({traffic.get('/transaction/receive', 0) / 1e3:8.1f} ko) | "
+              f"annonces {traffic.get('/inv (requêtes)', 0):5d} ({traffic.get('/inv', 0) / 1e3:7.1f} ko) | "
+              f"propagation {elapsed:5.2f} s")
+        for node in nodes:
+            node.gossip.close()
+        for server in servers:
+            server.shutdown()
+
+    pushed = results["corps poussés"].get('/transaction/receive (requêtes)', 0)
+    fetched = results["inventaire"].get('/transaction/receive (requêtes)', 0)
+    ok &= fetched == args.txs * (args.nodes - 1)
+    print(f"Nœuds: {args.nodes} (maillage complet) | {args.txs} transactions | "
+          f"corps envoyés divisés par {pushed / max(fetched, 1):.1f}")
+    print(f"Transactions reçues par tous les nœuds, un seul corps chacun: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# RELAIS DE TRANSACTIONS: UNE REQUÊTE PAR TRANSACTION VS LOTS
+# ============================================================================
+
+def signed_transfers(count: int) -> Tuple[QuantumAddress, List[Transaction]]:
+    """Transferts signés d'un même expéditeur, nonces consécutifs"""
+    sender, recipient = QuantumAddress(), QuantumAddress()
+    transactions = []
+    for nonce in range(count):
+        tx = Transaction(sender.address, recipient.address, 1, 0.01, nonce)
+        tx.sign(sender)
+        transactions.append(tx)
+    return sender, transactions
+
+def bench_relay(args) -> bool:
+    print_header("RELAIS DE TRANSACTIONS: UNE REQUÊTE PAR TRANSACTION VS LOTS")
+    sender, transactions = signed_transfers(args.txs)
+    payloads = [tx.to_dict() for tx in transactions]
+    expected = {tx.get_hash() for tx in transactions}
+    ok = True
+    rates = {}
+    print(f"Transactions relayées vers un peer local: {args.txs} | lots de {args.batch}")
+
+    for mode in ("une par requête", "lots", "gossip (inventaire)"):
+        peer = Node(0)
+        peer.blockchain.balances[sender.address] = 1_000_000
+        peer.blockchain.max_pending_per_address = 10 ** 6
+        url, server = serve_node(peer)
+        session = requests.Session()
+        start = time.perf_counter()
+        if mode == "une par requête":
+            for payload in payloads:
+                ok &= session.post(f"{url}/transaction/receive", json=payload).json()['success']
+        elif mode == "lots":
+            for offset in range(0, len(payloads), args.batch):
+                results = session.post(f"{url}/transactions/receive_batch", json={
+                    'transactions': payloads[offset:offset + args.batch]
+                }).json()['results']
+                ok &= all(result['success'] for result in results)
+        else:
+            # Relais sortant de bout en bout: annonces regroupées puis corps en lot
+            source = Node(0)
+            source.blockchain.balances[sender.address] = 1_000_000
+            source.blockchain.max_pending_per_address = 10 ** 6
+            source.peers = [url]
+            source.gossip.queue_size = args.txs  # Rafale entière sans éviction
+            for tx in transactions:
+                ok &= source.blockchain.add_transaction(tx)
+                source.broadcast_transaction(tx)
+            source.gossip.wait_idle(60)
+            source.gossip.close()
+        elapsed = time.perf_counter() - start
+        ok &= {tx.get_hash() for tx in peer.blockchain.pending_transactions} == expected
+        rates[mode] = args.txs / elapsed
+        print(f"Relais {mode:20s}: {elapsed:6.2f} s | {rates[mode]:8.0f} tx/s")
+        peer.gossip.close()
+        server.shutdown()
+
+    # Un lot mélangé: chaque transaction reçoit son propre verdict
+    peer = Node(0)
+    peer.blockchain.balances[sender.address] = 1_000_000
+    invalid = dict(payloads[0], signature='00')
+    results = peer.app.test_client().post('/transactions/receive_batch', json={
+        'transactions': [payloads[0], invalid, payloads[0]]
+    }).get_json()['results']
+    ok &= [result['success'] for result in results] == [True, False, True]
+    # Un lot plus grand qu'une annonce /inv est refusé d'emblée
+    response = peer.app.test_client().post('/transactions/receive_batch', json={
+        'transactions': [payloads[0]] * (blockchain_node.INV_BATCH_SIZE + 1)
+    })
+    ok &= response.status_code == 400
+    peer.gossip.close()
+
+    print(f"Débit multiplié par {rates['lots'] / rates['une par requête']:.1f} (lots) et "
+          f"{rates['gossip (inventaire)'] / rates['une par requête']:.1f} (gossip)")
+    print(f"Toutes les transactions acceptées, verdict par transaction: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# SOUMISSION PAR LOTS: /transaction/send EN BOUCLE VS /transactions/send_batch
+# ============================================================================
+
+def mixed_batch(blockchain: SimplePoSBlockchain) -> List[Transaction]:
+    """Lot couvrant chaque cas de rejet: nonce réutilisé, doublon, solde, limite anti-spam"""
+    rich, poor, recipient = QuantumAddress(), QuantumAddress(), QuantumAddress()
+    blockchain.balances[rich.address] = 1000
+    blockchain.balances[poor.address] = 5
+    blockchain.max_pending_per_address = 6
+    transactions = []
+    for nonce in (0, 1, 1, 2, 3, 4, 5, 6, 7):
+        tx = Transaction(rich.address, recipient.address, 10, 0.01, nonce)
+        tx.sign(rich)
+        transactions.append(tx)
+    transactions.append(transactions[0])
+    for amount in (1, 10, 2):
+        tx = Transaction(poor.address, recipient.address, amount, 0.01,
+                         sum(1 for other in transactions if other.sender == poor.address))
+        tx.sign(poor)
+        transactions.append(tx)
+    unsigned = Transaction(poor.address, recipient.address, 1, 0.01, 9)
+    transactions.append(unsigned)
+    return transactions
+
+def bench_sendbatch(args) -> bool:
+    print_header("SOUMISSION PAR LOTS: /transaction/send EN BOUCLE VS /transactions/send_batch")
+    ok = True
+
+    # Différentiel: mêmes verdicts que add_transaction appelé en boucle
+    single, batched = SimplePoSBlockchain(), SimplePoSBlockchain()
+    transactions = mixed_batch(single)
+    batched.balances.update(single.balances)
+    batched.max_pending_per_address = single.max_pending_per_address
+    expected = [single.add_transaction(tx) for tx in transactions]
+    errors = batched.add_transactions(transactions)
+    ok &= expected == [error is None for error in errors]
+    ok &= [tx.get_hash() for tx in single.pending_transactions] == [tx.get_hash() for tx in batched.pending_transactions]
+    print(f"Verdicts identiques à add_transaction ({len(transactions)} cas, {sum(expected)} acceptés): "
+          f"{'oui' if ok else 'NON'}")
+
+    sender, recipient = QuantumAddress(), QuantumAddress()
+    rates = {}
+    for mode in ("/transaction/send", "/transactions/send_batch"):
+        node = Node(0)
+        node.blockchain.balances[sender.address] = 1_000_000
+        node.blockchain.max_pending_per_address = 10 ** 6
+        url, server = serve_node(node)
+        session = requests.Session()
+        if mode == "/transaction/send":
+            start = time.perf_counter()
+            for _ in range(args.txs):
+                ok &= session.post(f"{url}/transaction/send", json={
+                    'sender': sender.address, 'recipient': recipient.address,
+                    'amount': 1, 'private_key': sender.private_key
+                }).json()['success']
+            elapsed = time.perf_counter() - start
+            signing = 0.0
+        else:
+            # Transactions signées côté client (temps de signature affiché à part)
+            start = time.perf_counter()
+            payloads = []
+            for nonce in range(args.txs):
+                tx = Transaction(sender.address, recipient.address, 1, 0.01, nonce)
+                tx.sign(sender)
+                payloads.append(tx.to_dict())
+            signing = time.perf_counter() - start
+            start = time.perf_counter()
+            for offset in range(0, len(payloads), args.batch):
+                response = session.post(f"{url}/transactions/send_batch", json={
+                    'transactions': payloads[offset:offset + args.batch]
+                }).json()
+                ok &= response['accepted'] == len(payloads[offset:offset + args.batch])
+            elapsed = time.perf_counter() - start
+        ok &= len(node.blockchain.pending_transactions) == args.txs
+        rates[mode] = args.txs / elapsed
+        print(f"{mode:26s}: {elapsed:6.2f} s | {rates[mode]:8.0f} tx/s"
+              + (f" (signature client: {signing:.2f} s)" if signing else ""))
+        node.gossip.close()
+        server.shutdown()
+
+    # Rapport seulement: le gain dépend de la machine, la réussite porte sur les transactions acceptées
+    speedup = rates["/transactions/send_batch"] / rates["/transaction/send"]
+    print(f"Transactions: {args.txs} | lots de {args.batch} | débit multiplié par {speedup:.1f}")
+    return ok
+
+# ============================================================================
+# SURVEILLANCE DES PEERS: SONDES EN ARRIÈRE-PLAN VS VÉRIFICATION EN LIGNE
+# ============================================================================
+
+def legacy_is_peer_malicious(peer_url: str) -> bool:
+    """Ancienne vérification, bloquante, faite dans /peers/add"""
+    try:
+        response = requests.get(f"{peer_url}/blockchain/status", timeout=5)
+        if response.status_code == 200:
+            peer_treasury = response.json().get('treasury')
+            if peer_treasury is None or peer_treasury != DEFAULT_TREASURY_ADDRESS:
+                return True
+        return False
+    except requests.RequestException:
+        return True
+
+def bench_peers(args) -> bool:
+    print_header("SURVEILLANCE DES PEERS: SONDES EN ARRIÈRE-PLAN VS VÉRIFICATION EN LIGNE")
+    chain, _ = build_chain(args.blocks, args.txs)
+    chain.treasury_address = DEFAULT_TREASURY_ADDRESS
+    ok = True
+
+    # Peers sains (même chaîne), des peers lents, un dont le /health peut être coupé, un malveillant
+    nodes, peers, servers, outage = [], [], [], {'down': False}
+    for number in range(args.peers + args.slow + 2):
+        node = Node(0)
+        nodes.append(node)
+        node.blockchain = copy.deepcopy(chain)
+        if args.peers <= number < args.peers + args.slow:
+            @node.app.before_request
+            def slow():
+                time.sleep(args.delay / 1000)
+        elif number == args.peers + args.slow:
+            @node.app.before_request
+            def flaky():
+                if outage['down']:
+                    return 'indisponible', 503
+        elif number == args.peers + args.slow + 1:
+            node.blockchain.treasury_address = QuantumAddress().address
+        url, server = serve_node(node)
+        peers.append(url)
+        servers.append(server)
+    slow_peers = peers[args.peers:args.peers + args.slow]
+    flaky_peer, malicious_peer = peers[-2:]
+
+    # Ajout: ancienne vérification (/blockchain/status, rejeu de la chaîne du peer) vs sonde /health
+    start = time.perf_counter()
+    legacy = [legacy_is_peer_malicious(peer) for peer in peers]
+    legacy_time = time.perf_counter() - start
+    node = Node(0)
+    node.rate_limit_max_requests = 10 ** 9
+    client = node.app.test_client()
+    start = time.perf_counter()
+    codes = [client.post('/peers/add', json={'peer': peer}).status_code for peer in peers]
+    add_time = time.perf_counter() - start
+    ok &= legacy == [peer == malicious_peer for peer in peers]
+    ok &= codes == [403 if peer == malicious_peer else 200 for peer in peers]
+    ok &= malicious_peer in node.malicious_peers and malicious_peer not in node.peers
+    print(f"Ajout de {len(peers)} peers ({args.blocks} blocs): vérification en ligne {legacy_time * 1e3:8.1f} ms | "
+          f"sonde /health {add_time * 1e3:8.1f} ms")
+
+    # Sondes périodiques: simultanées vs une par une
+    start = time.perf_counter()
+    for peer in node.peers:
+        node.peer_manager.probe(peer)
+    sequential = time.perf_counter() - start
+    start = time.perf_counter()
+    node.peer_manager.probe_all()
+    concurrent = time.perf_counter() - start
+    print(f"Tour de sondes ({len(node.peers)} peers, dont {args.slow} à {args.delay} ms): "
+          f"une par une {sequential * 1e3:7.1f} ms | simultanées {concurrent * 1e3:7.1f} ms")
+
+    # Classement: les peers lents passent après les peers rapides
+    ranking = node.peer_manager.ranked(node.peers)
+    ok &= set(ranking[-args.slow:]) == set(slow_peers)
+
+    # Mise à l'écart après PEER_MAX_FAILURES échecs, réintégration à la sonde suivante
+    outage['down'] = True
+    for _ in range(blockchain_node.PEER_MAX_FAILURES):
+        node.peer_manager.probe_all()
+    demoted = node.peer_manager.snapshot()[flaky_peer]['state']
+    ok &= demoted == 'down' and flaky_peer not in node.peer_manager.ranked(node.peers)
+    outage['down'] = False
+    node.peer_manager.probe_all()
+    promoted = node.peer_manager.snapshot()[flaky_peer]['state']
+    ok &= promoted == 'healthy'
+    print(f"Peer coupé: {demoted} après {blockchain_node.PEER_MAX_FAILURES} sondes ratées, "
+          f"{promoted} dès la sonde suivante")
+
+    # Un peer qui change de trésor après son ajout est exclu par les sondes
+    nodes[0].blockchain.treasury_address = QuantumAddress().address
+    node.peer_manager.probe_all()
+    ok &= peers[0] in node.malicious_peers and peers[0] not in node.peers
+    print("Scores: " + ", ".join(f"{peer.rsplit(':', 1)[1]}={info['state']}/{info['score']}"
+                                  for peer, info in node.peer_manager.snapshot().items()))
+
+    node.peer_manager.stop()
+    for peer_node in nodes + [node]:
+        peer_node.gossip.close()
+    for server in servers:
+        server.shutdown()
+    print(f"Peers classés, mis à l'écart et réintégrés comme attendu: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# CHARGE HTTP: REQUÊTES PAR SECONDE SELON LA CONCURRENCE
+# ============================================================================
+
+def load_worker(url: str, wallet: QuantumAddress, recipient: str, deadline: float,
+                write_ratio: float, results: List[Tuple[float, bool]]):
+    """Boucle de requêtes mêlant lectures et envois de transactions signées (nonces consécutifs)"""
+    session = requests.Session()
+    rng = random.Random(wallet.address)
+    nonce = 0
+    reads = [f"{url}/blockchain/status", f"{url}/wallet/balance/{wallet.address}",
+             f"{url}/blocks?from=-5", f"{url}/headers?from=-50", f"{url}/health"]
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                tx = Transaction(wallet.address, recipient, 1, 0.01, nonce)
+                tx.sign(wallet)
+                response = session.post(f"{url}/transaction/receive", json=tx.to_dict())
+                nonce += 1
+            else:
+                response = session.get(rng.choice(reads))
+            success = response.status_code == 200
+        except requests.RequestException:
+            success = False
+        results.append((time.perf_counter() - start, success))
+
+def load_client_process(url: str, wallets: List[QuantumAddress], recipient: str, duration: float,
+                        write_ratio: float) -> List[Tuple[float, bool]]:
+    """Processus client: un thread par wallet (hors du GIL du serveur mesuré)"""
+    results: List[Tuple[float, bool]] = []
+    deadline = time.time() + duration
+    workers = [threading.Thread(target=load_worker, args=(url, wallet, recipient, deadline, write_ratio, results))
+               for wallet in wallets]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+def bench_load(args) -> bool:
+    print_header("CHARGE HTTP: REQUÊTES PAR SECONDE SELON LA CONCURRENCE")
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    logging.getLogger('waitress').setLevel(logging.ERROR)
+    backend = "waitress" if blockchain_node.waitress is not None else "werkzeug multi-thread"
+    levels = [int(level) for level in args.concurrency.split(',')]
+    print(f"Chaîne: {args.blocks} blocs | {args.duration} s par palier | "
+          f"{args.write_ratio:.0%} d'écritures | production: {backend}, {args.threads} threads | "
+          f"clients répartis sur {args.processes} processus")
+    ok = True
+    pool = ProcessPoolExecutor(max_workers=args.processes, mp_context=multiprocessing.get_context('spawn'))
+    list(pool.map(time.sleep, [0] * args.processes))  # Démarrage des processus clients
+
+    for mode in ("development", "production"):
+        # Wallets approvisionnés sur la chaîne: un client par wallet et par palier
+        node = Node(0)
+        blockchain = node.blockchain
+        wallets = fund_wallets_on_chain(blockchain, 20 + sum(levels))
+        fill_blocks(blockchain, wallets[:20], args.blocks, args.txs)
+        blockchain.max_pending_per_address = 10 ** 6
+        node.rate_limit_max_requests = 10 ** 9
+        clients = iter(wallets[20:])
+        if mode == "production":
+            server = node.create_server('127.0.0.1', 0, threads=args.threads)
+        else:
+            server = make_server('127.0.0.1', 0, node.app, threaded=True)  # Serveur de app.run()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}"
+        recipient = QuantumAddress().address
+
+        def mine(deadline: float):
+            """Création de blocs pendant la charge: écritures concurrentes des envois"""
+            session = requests.Session()
+            while time.time() < deadline:
+                session.post(f"{url}/block/mine")
+                time.sleep(args.mine_interval / 1000)
+
+        print(f"\nServeur {mode}:")
+        for level in levels:
+            level_wallets = [next(clients) for _ in range(level)]
+            groups = [level_wallets[number::args.processes] for number in range(min(level, args.processes))]
+            futures = [pool.submit(load_client_process, url, group, recipient, args.duration, args.write_ratio)
+                       for group in groups]
+            mine(time.time() + args.duration)
+            results = [result for future in futures for result in future.result()]
+            elapsed = args.duration
+            latencies = sorted(latency for latency, _ in results)
+            errors = sum(1 for _, success in results if not success)
+            ok &= errors == 0
+            print(f"  {level:3d} clients: {len(results) / elapsed:8.0f} req/s | "
+                  f"p50 {latencies[len(latencies) // 2] * 1e3:6.1f} ms | "
+                  f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:6.1f} ms | erreurs {errors}")
+
+        # Les écritures concurrentes n'ont pas désynchronisé les soldes
+        consistent = node.engine.execute(blockchain.verify_balance_consistency)
+        ok &= consistent and node.engine.writer.stats['failed'] == 0
+        print(f"  Commandes d'écriture: {node.engine.writer.stats['commands']} | blocs: {len(blockchain.chain)} | "
+              f"balances cohérentes: {'oui' if consistent else 'NON'}")
+        server.shutdown()
+        node.gossip.close()
+        node.engine.close()
+
+    pool.shutdown()
+    print(f"\nAucune erreur, état cohérent: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# IMPORT DES BLOCS REÇUS PAR ÉTAPES
+# ============================================================================
+
+def legacy_import_block(blockchain: SimplePoSBlockchain, block_data: Dict) -> Optional[str]:
+    """Ancien /block/receive: contrôles et soldes transaction par transaction sur l'état
+    courant (les dépenses précédentes du bloc ne comptent pas), tout sur le fil d'écriture"""
+    block = Block.from_dict(block_data)
+    if block.hash != block.calculate_hash() or not block.has_valid_merkle_root():
+        return 'Hash du bloc invalide'
+    if block.index != len(blockchain.chain) or block.previous_hash != blockchain.get_latest_block().hash:
+        return 'Position incorrecte'
+    for tx in block.transactions:
+        if not tx.is_valid():
+            return 'Transaction invalide'
+        if tx.get_hash() in blockchain.transaction_history:
+            return 'Rejeu'
+        if tx.sender not in ["SYSTEM"]:
+            if tx.nonce < blockchain.get_next_expected_nonce(tx.sender):
+                return 'Nonce invalide'
+            if blockchain.get_balance(tx.sender) < tx.amount + tx.fee:
+                return 'Solde insuffisant'
+    if block.validator not in ["SYSTEM"] and blockchain.validators.get(block.validator) != block.stake:
+        return 'Validator'
+    if len(block.transactions) > blockchain.max_block_size:
+        return 'Bloc trop grand'
+    blockchain.apply_block(block)
+    return None
+
+def account_state(blockchain: SimplePoSBlockchain) -> tuple:
+    """Empreinte de l'état modifiable par un import de bloc"""
+    return (len(blockchain.chain), dict(blockchain.balances), dict(blockchain.nonces_used),
+            len(blockchain.transaction_history))
+
+def bench_import(args) -> bool:
+    print_header("IMPORT DES BLOCS REÇUS PAR ÉTAPES")
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    source = SimplePoSBlockchain()
+    wallets = fund_wallets_on_chain(source, 20)
+    fill_blocks(source, wallets, args.blocks, args.txs)
+    height = 3  # Genesis, approvisionnement et un bloc du validateur (stake connu du suiveur)
+    ok = True
+
+    # Ancien handler: tout l'import occupe le fil d'écriture
+    legacy = follower_node(source, height).blockchain
+    legacy_times = []
+    for block in source.chain[height:]:
+        block_data = block.to_dict()
+        start = time.perf_counter()
+        ok &= legacy_import_block(legacy, block_data) is None
+        legacy_times.append((time.perf_counter() - start) * 1e3)
+
+    # Nouveau handler, en HTTP: seules les étapes avec état passent par le fil d'écriture
+    follower = follower_node(source, height)
+    url, server = serve_node(follower)
+    session = requests.Session()
+    for block in source.chain[height:]:
+        ok &= session.post(f"{url}/block/receive", json=block.to_dict()).status_code == 200
+    stats = session.get(f"{url}/blockchain/import_stats").json()
+    server.shutdown()
+    ok &= [block.hash for block in follower.blockchain.chain] == [block.hash for block in source.chain]
+    ok &= follower.blockchain.balances == legacy.balances == source.balances
+    stages = stats['stages_ms']
+    writer_time = stages['queue']['mean'] + stages['state']['mean'] + stages['commit']['mean']
+    print(f"Blocs reçus: {stats['accepted']} | {args.txs} tx/bloc")
+    print(f"Ancien import (fil d'écriture):   {sum(legacy_times) / len(legacy_times):7.3f} ms/bloc")
+    print(f"Import par étapes (HTTP):         total p50 {stages['total']['p50']:.3f} ms, "
+          f"p99 {stages['total']['p99']:.3f} ms")
+    for stage in ('decode', 'contents', 'queue', 'state', 'commit'):
+        print(f"  {stage:9s} moyenne {stages[stage]['mean']:7.3f} ms | max {stages[stage]['max']:7.3f} ms")
+    print(f"Fil d'écriture occupé: {writer_time:.3f} ms/bloc (décodage et contrôles sans état hors du fil)")
+
+    # Blocs partiellement invalides: rien ne doit être appliqué
+    follower = follower_node(source, len(source.chain))
+    blockchain = follower.blockchain
+    client = follower.app.test_client()
+    validator = source.chain[-1].validator
+    sender, recipient = QuantumAddress(), wallets[1]
+    latest = blockchain.get_latest_block()
+    blockchain.apply_block(Block(latest.index + 1, [Transaction("SYSTEM", sender.address, 100, tx_type="MINT")],
+                                 latest.hash, "SYSTEM", 0))
+
+    def transfer(amount: float, nonce: int) -> Transaction:
+        tx = Transaction(sender.address, recipient.address, amount, 1, nonce)
+        tx.sign(sender)
+        return tx
+
+    def make_block(transactions: List[Transaction]) -> Block:
+        latest = blockchain.get_latest_block()
+        return Block(latest.index + 1, transactions, latest.hash, validator, blockchain.validators[validator])
+
+    bad_signature = transfer(10, 1)
+    bad_signature.signature = 'zz' * 64
+    first = transfer(60, 0)
+    cases = [
+        ("Dépenses cumulées > solde", [first, transfer(60, 1)]),
+        ("Transaction en double", [first, first]),
+        ("Nonce répété", [first, transfer(10, 0)]),
+        ("Signature invalide au milieu", [first, bad_signature, transfer(10, 2)]),
+    ]
+    print("\nBlocs refusés sans effet (ancien handler: accepté ?):")
+    for name, transactions in cases:
+        block = make_block(transactions)
+        before = account_state(blockchain)
+        legacy_copy = copy.deepcopy(blockchain)
+        legacy_accepts = legacy_import_block(legacy_copy, block.to_dict()) is None
+        response = client.post('/block/receive', json=block.to_dict())
+        unchanged = account_state(blockchain) == before
+        ok &= response.status_code == 400 and unchanged
+        print(f"  {name:30s} refusé: {'oui' if response.status_code == 400 else 'NON'} | "
+              f"état inchangé: {'oui' if unchanged else 'NON'} | ancien: {'accepté' if legacy_accepts else 'refusé'}")
+
+    # Champs mal typés: refus propre (400) plutôt qu'une erreur serveur
+    malformed = make_block([transfer(10, 0)]).to_dict()
+    malformed['transactions'][0]['amount'] = '10'
+    before = account_state(blockchain)
+    response = client.post('/block/receive', json=malformed)
+    unchanged = account_state(blockchain) == before
+    ok &= response.status_code == 400 and unchanged
+    print(f"  {'Montant de type texte':30s} refusé: {'oui' if response.status_code == 400 else 'NON'} | "
+          f"statut HTTP: {response.status_code}")
+
+    # Transactions déjà reçues par gossip: un bloc qui les inclut reste acceptable
+    spends = [transfer(30, 0), transfer(30, 1)]
+    for tx in spends:
+        blockchain.add_transaction(tx)
+    block = make_block(spends)
+    legacy_accepts = legacy_import_block(copy.deepcopy(blockchain), block.to_dict()) is None
+    response = client.post('/block/receive', json=block.to_dict())
+    accepted = response.status_code == 200 and len(blockchain.pending_transactions) == 0
+    ok &= accepted and blockchain.get_balance(sender.address) == 100 - 62
+    print(f"  {'Transactions déjà en pool':30s} accepté: {'oui' if accepted else 'NON'} | "
+          f"ancien: {'accepté' if legacy_accepts else 'refusé'}")
+    ok &= follower.engine.command('verify_balance_consistency')
+    follower.engine.close()
+    print(f"\nImports identiques, blocs invalides sans effet: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# VÉRIFICATION DES TRANSACTIONS PAR LOTS (POOL DE PROCESSUS)
+# ============================================================================
+
+def bench_verify(args) -> bool:
+    print_header("VÉRIFICATION DES TRANSACTIONS PAR LOTS: PROCESSUS VS SUR PLACE")
+    # Verdicts non gardés: chaque tour refait toutes les vérifications
+    blockchain_node.SIGNATURE_CACHE = blockchain_node.VerifiedSignatureCache(0)
+    _, transactions = signed_transfers(args.txs)
+    # Quelques transactions invalides réparties dans le lot
+    for tx in transactions[::97]:
+        tx.signature = 'zz' * 64
+    for tx in transactions[50::101]:
+        tx.timestamp -= blockchain_node.TRANSACTION_MAX_AGE * 2
+    expected = [tx.is_valid() for tx in transactions]
+    blocks = [Block(number, transactions[start:start + 100], '0' * 64, "SYSTEM", 0)
+              for number, start in enumerate(range(0, len(transactions), 100))]
+    print(f"Transactions: {len(transactions)} ({expected.count(False)} invalides) | "
+          f"processeurs: {os.cpu_count()} | seuil de parallélisme: {blockchain_node.VERIFY_PARALLEL_MIN}")
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        inline = [tx.is_valid() for tx in transactions]
+    baseline = (time.perf_counter() - start) / args.rounds
+    ok = inline == expected
+    print(f"Sur place (is_valid un par un): {len(transactions) / baseline:12,.0f} tx/s")
+
+    for workers in [int(count) for count in args.workers.split(',')]:
+        verifier = blockchain_node.TransactionVerifier(workers=workers, parallel_min=0, adaptive=False)
+        verifier.verify(transactions[:1])  # Démarrage des processus hors mesure
+        if workers > 1:
+            list(verifier.pool.map(time.sleep, [0] * workers))
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            results = verifier.verify(transactions)
+        elapsed = (time.perf_counter() - start) / args.rounds
+        by_block = verifier.verify_blocks(blocks)
+        same = results == expected and [valid for block in by_block for valid in block] == \
+            [tx.is_valid(now=block.timestamp) for block in blocks for tx in block.transactions]
+        ok &= same
+        verifier.close()
+        print(f"Pool de {workers:2d} processus:           {len(transactions) / elapsed:12,.0f} tx/s "
+              f"(x{baseline / elapsed:.2f}) | résultats identiques: {'oui' if same else 'NON'}")
+
+    # Choix automatique (nœud): la voie la moins chère par transaction mesurée
+    workers = max(int(count) for count in args.workers.split(','))
+    verifier = blockchain_node.TransactionVerifier(workers=workers)
+    for _ in range(2):
+        ok &= verifier.verify(transactions) == expected  # Mesure des deux voies
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        ok &= verifier.verify(transactions) == expected
+    elapsed = (time.perf_counter() - start) / args.rounds
+    costs = {path: f"{cost * 1e6:.2f} µs" if cost is not None else '-' for path, cost in verifier.costs.items()}
+    chosen = 'pool' if verifier.use_pool(len(transactions)) else 'sur place'
+    verifier.close()
+    print(f"Choix automatique ({workers} processus): {len(transactions) / elapsed:12,.0f} tx/s | "
+          f"coût par transaction: {costs} -> {chosen}")
+    print(f"\nVerdicts identiques quel que soit le nombre de processus: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# SURCOUCHE DES COMPTES PENDANT L'ASSEMBLAGE ET L'APPLICATION DES BLOCS
+# ============================================================================
+
+def legacy_create_block(blockchain: SimplePoSBlockchain) -> Optional[Block]:
+    """Ancien create_block: dépenses cumulées par expéditeur (les réceptions du bloc
+    ne comptent pas), puis soldes relus et réécrits transaction par transaction"""
+    spent: Dict[str, float] = {}
+
+    def can_include(tx: Transaction) -> bool:
+        if not tx.is_valid():
+            return False
+        total_spent = spent.get(tx.sender, 0) + tx.amount + tx.fee
+        if blockchain.get_balance(tx.sender) < total_spent:
+            return False
+        spent[tx.sender] = total_spent
+        return True
+
+    transactions = blockchain.pending_transactions.select(blockchain.max_block_size, can_include)
+    if not transactions:
+        return None
+    validator = blockchain.select_validator()
+    block = Block(len(blockchain.chain), transactions, blockchain.get_latest_block().hash,
+                  validator, blockchain.validators[validator])
+    blockchain.chain.append(block)
+    for tx in transactions:
+        blockchain.transaction_history.add(tx.get_hash(), tx.timestamp)
+        blockchain._set_balance(tx.sender, blockchain.get_balance(tx.sender) - (tx.amount + tx.fee))
+        blockchain._set_balance(tx.recipient, blockchain.get_balance(tx.recipient) + tx.amount)
+        blockchain._index_confirmed_nonce(tx)
+    reward = blockchain.block_reward + sum(tx.fee for tx in transactions)
+    blockchain._set_balance(validator, blockchain.get_balance(validator) + reward)
+    blockchain.update_activity(validator)
+    blockchain.pending_transactions.remove_many(tx.get_hash() for tx in transactions)
+    blockchain.version += 1
+    return block
+
+def fill_pool(blockchain: SimplePoSBlockchain, wallets: List[QuantumAddress], count: int, nonces: Dict[str, int]):
+    """Transferts aléatoires entre wallets, nonces suivis par l'appelant"""
+    for _ in range(count):
+        sender, recipient = random.sample(wallets, 2)
+        nonce = nonces.get(sender.address, 0)
+        tx = Transaction(sender.address, recipient.address, random.randint(1, 10), 0.01, nonce)
+        tx.sign(sender)
+        blockchain.add_transaction(tx)
+        nonces[sender.address] = nonce + 1
+
+def bench_overlay(args) -> bool:
+    print_header("SURCOUCHE DES COMPTES: ASSEMBLAGE ET APPLICATION DES BLOCS")
+    ok = True
+
+    # Même pool, même ordre de sélection: blocs identiques, temps comparés
+    random.seed(7)
+    base = SimplePoSBlockchain()
+    wallets = fund_wallets_on_chain(base, 50)
+    base.max_pending_per_address = 10 ** 6
+    fill_pool(base, wallets, args.blocks * base.max_block_size, {})
+    results = {}
+    for name, build in (("Ancien (soldes relus)", legacy_create_block), ("Surcouche", SimplePoSBlockchain.create_block)):
+        blockchain = copy.deepcopy(base)
+        random.seed(11)  # Même validateur tiré à chaque bloc
+        start = time.perf_counter()
+        for _ in range(args.blocks):
+            build(blockchain)
+        results[name] = (time.perf_counter() - start, blockchain)
+    legacy, overlay = (chain for _, chain in results.values())
+    same = ([[tx.get_hash() for tx in block.transactions] for block in legacy.chain[2:]] ==
+            [[tx.get_hash() for tx in block.transactions] for block in overlay.chain[2:]])
+    same &= legacy.balances == overlay.balances and legacy.nonces_used == overlay.nonces_used
+    ok &= same and overlay.verify_balance_consistency()
+    print(f"Blocs: {args.blocks} x {base.max_block_size} transactions")
+    for name, (elapsed, _) in results.items():
+        print(f"{name:22s} {elapsed / args.blocks * 1e3:7.3f} ms/bloc (sélection + application)")
+    print(f"Blocs et soldes identiques: {'oui' if same else 'NON'}")
+
+    # Fonds reçus dans le bloc: dépensés plus loin dans le même bloc
+    blockchain = SimplePoSBlockchain()
+    funded = fund_wallets_on_chain(blockchain, 1)[0]
+    relay = [QuantumAddress() for _ in range(5)]
+    chain_of_spends = []
+    for number, (sender, recipient) in enumerate(zip([funded] + relay, relay + [funded])):
+        # Frais décroissants: sélection dans l'ordre de la chaîne
+        tx = Transaction(sender.address, recipient.address, 100 - 15 * number, 10 - number, 0)
+        tx.sign(sender)
+        chain_of_spends.append(tx)
+    # La pool refuse les expéditeurs sans solde: transactions ajoutées directement
+    for tx in chain_of_spends:
+        blockchain.pending_transactions.add(tx)
+    legacy_block = legacy_create_block(copy.deepcopy(blockchain))
+    block = blockchain.create_block()
+    ok &= len(block.transactions) == len(chain_of_spends) and len(legacy_block.transactions) == 1
+    ok &= blockchain.verify_balance_consistency()
+    print(f"\nChaîne de {len(chain_of_spends)} paiements financés dans le bloc: "
+          f"{len(block.transactions)} inclus (ancien: {len(legacy_block.transactions)})")
+
+    # Bloc reçu: validé en une passe et appliqué d'un bloc, ou abandonné sans trace
+    receiver = follower_node(blockchain, len(blockchain.chain) - 1)
+    receiver.blockchain.validators[block.validator] = block.stake  # Enregistré hors chaîne
+    error = receiver.blockchain.import_block(block)
+    ok &= error is None and receiver.blockchain.balances == blockchain.balances
+    print(f"Bloc reçu appliqué par sa surcouche: {'oui' if error is None else error[0]}")
+    print(f"\nSurcouche cohérente avec l'ancien calcul: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# CONCURRENCE: FIL D'ÉCRITURE UNIQUE ET INSTANTANÉS DE LECTURE
+# ============================================================================
+
+def snapshot_supply(accounts) -> float:
+    """Masse monétaire d'un instantané: soldes + stakes"""
+    return sum((balance or 0) + (stake or 0) for _, (balance, stake, _) in accounts.items())
+
+def stress_sender(url: str, wallet: QuantumAddress, wallets: List[QuantumAddress], count: int,
+                  errors: List[str]) -> int:
+    """Envoie count transferts signés (nonces consécutifs) vers d'autres wallets du lot"""
+    session = requests.Session()
+    rng = random.Random(wallet.address)
+    for nonce in range(count):
+        recipient = rng.choice(wallets)
+        tx = Transaction(wallet.address, recipient.address, rng.randint(1, 10), 0.01, nonce)
+        tx.sign(wallet)
+        response = session.post(f"{url}/transaction/receive", json=tx.to_dict())
+        if response.status_code != 200:
+            errors.append(f"transaction: {response.status_code} {response.text[:80]}")
+    return count
+
+def bench_stress(args) -> bool:
+    print_header("CONCURRENCE: FIL D'ÉCRITURE UNIQUE ET INSTANTANÉS DE LECTURE")
+    logging.getLogger('waitress').setLevel(logging.ERROR)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    node = Node(0)
+    blockchain = node.blockchain
+    wallets = fund_wallets_on_chain(blockchain, args.wallets)
+    blockchain.max_pending_per_address = 10 ** 6
+    node.rate_limit_max_requests = 10 ** 9
+    server = node.create_server('127.0.0.1', 0, threads=args.threads)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+
+    start = node.engine.read()
+    initial_supply = snapshot_supply(start.accounts)
+    per_wallet = args.requests // args.wallets
+    print(f"{args.wallets} wallets x {per_wallet} transferts croisés | {args.clients} clients | "
+          f"{args.readers} lecteurs | serveur: {args.threads} threads")
+
+    def expected_supply(snapshot) -> float:
+        # Les frais passent d'un compte à l'autre: seule la récompense crée de la monnaie
+        return initial_supply + blockchain.block_reward * (snapshot.height - start.height)
+
+    errors: List[str] = []
+    done = threading.Event()
+    reads = {'requests': 0, 'snapshots': 0, 'violations': 0}
+    read_latencies: List[float] = []
+
+    def mine():
+        session = requests.Session()
+        while not done.is_set():
+            response = session.post(f"{url}/block/mine")
+            if response.status_code not in (200, 400):  # 400: pool vide
+                errors.append(f"mine: {response.status_code}")
+            time.sleep(args.mine_interval / 1000)
+
+    def touch():
+        session = requests.Session()
+        rng = random.Random(1)
+        while not done.is_set():
+            response = session.post(f"{url}/wallet/activity/{rng.choice(wallets).address}")
+            if response.status_code != 200:
+                errors.append(f"activity: {response.status_code}")
+
+    def read(number: int):
+        session = requests.Session()
+        rng = random.Random(number)
+        while not done.is_set():
+            began = time.perf_counter()
+            path = rng.choice([f"/wallet/balance/{rng.choice(wallets).address}", "/accounts/top?limit=5"])
+            response = session.get(url + path)
+            read_latencies.append(time.perf_counter() - began)
+            reads['requests'] += 1
+            if response.status_code != 200:
+                errors.append(f"lecture: {response.status_code}")
+            # Un instantané ne montre jamais un bloc à moitié appliqué
+            snapshot = node.engine.read()
+            reads['snapshots'] += 1
+            if abs(snapshot_supply(snapshot.accounts) - expected_supply(snapshot)) > 1e-6 * initial_supply:
+                reads['violations'] += 1
+
+    background = [threading.Thread(target=mine), threading.Thread(target=touch)]
+    background += [threading.Thread(target=read, args=(number,)) for number in range(args.readers)]
+    for thread in background:
+        thread.start()
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        sent = sum(pool.map(lambda wallet: stress_sender(url, wallet, wallets, per_wallet, errors), wallets))
+    elapsed = time.perf_counter() - began
+    done.set()
+    for thread in background:
+        thread.join()
+
+    # Vider la pool puis contrôler l'état final sur le fil d'écriture
+    while len(blockchain.pending_transactions) and node.engine.command('create_block') is not None:
+        pass
+    final = node.engine.read()
+    confirmed = sum(len(final.chain[index].transactions) for index in range(start.height, final.height))
+    consistent = node.engine.command('verify_balance_consistency')
+    valid = node.engine.command('is_valid', deep=True)
+    live = node.engine.execute(lambda: {address: blockchain.get_balance(address) for address in blockchain.balances})
+    matches = all((final.accounts.get(address)[0] or 0) == balance for address, balance in live.items())
+    supply_ok = abs(snapshot_supply(final.accounts) - expected_supply(final)) <= 1e-6 * initial_supply
+    server.shutdown()
+    node.gossip.close()
+    node.engine.close()
+
+    read_latencies.sort()
+    print(f"\nTransactions envoyées: {sent} en {elapsed:.2f} s ({sent / elapsed:,.0f} req/s) | "
+          f"confirmées: {confirmed} en {final.height - start.height} blocs")
+    print(f"Lectures HTTP: {reads['requests']} | p50 {read_latencies[len(read_latencies) // 2] * 1e3:.1f} ms | "
+          f"p99 {read_latencies[int(len(read_latencies) * 0.99)] * 1e3:.1f} ms")
+    print(f"Instantanés contrôlés pendant la charge: {reads['snapshots']} | "
+          f"masse monétaire incohérente: {reads['violations']}")
+    print(f"Commandes d'écriture: {node.engine.writer.stats['commands']} | "
+          f"échecs: {node.engine.writer.stats['failed']} | erreurs HTTP: {len(errors)}")
+    for error in errors[:5]:
+        print(f"  {error}")
+    print(f"verify_balance_consistency: {'oui' if consistent else 'NON'} | chaîne valide: {'oui' if valid else 'NON'} | "
+          f"instantané final = état: {'oui' if matches else 'NON'} | masse monétaire: {'oui' if supply_ok else 'NON'}")
+    ok = (not errors and reads['violations'] == 0 and confirmed == sent and consistent and valid
+          and matches and supply_ok and node.engine.writer.stats['failed'] == 0)
+    print(f"\nÉtat cohérent après la charge concurrente: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# SIGNATURES HASH-BASED: SIGNATURE ET VÉRIFICATION
+# ============================================================================
+
+def bench_signature(args) -> bool:
+    print_header("SIGNATURES HASH-BASED (WOTS+ / HYPER-ARBRE): SIGNATURE ET VÉRIFICATION")
+    tree_size = blockchain_node.TREE_LEAVES
+    print(f"n = {blockchain_node.SIGNATURE_N} octets | {blockchain_node.SIGNATURE_LAYERS} couches de "
+          f"{tree_size} clés ({blockchain_node.SIGNATURE_CAPACITY} signatures par adresse) | "
+          f"signature: {blockchain_node.SIGNATURE_SIZE} octets")
+
+    start = time.perf_counter()
+    wallets = [QuantumAddress() for _ in range(args.wallets)]
+    keygen = (time.perf_counter() - start) / args.wallets
+    print(f"Génération des clés (arbre du haut):   {keygen * 1000:8.1f} ms/wallet")
+
+    # Signature: la première d'un arbre de la couche basse le construit, les suivantes le réutilisent
+    wallet, recipient = wallets[0], wallets[-1]
+    transactions = [Transaction(wallet.address, recipient.address, 1, 0.01, nonce) for nonce in range(args.messages)]
+    cold, warm = [], []
+    for tx in transactions:
+        start = time.perf_counter()
+        tx.sign(wallet)
+        index = int(tx.signature[:8], 16)
+        (cold if index % tree_size == 0 else warm).append(time.perf_counter() - start)
+    amortized = (sum(cold) + sum(warm)) / len(transactions)
+    print(f"Signature, première clé d'un arbre:    {len(cold) / sum(cold):8,.0f} signatures/s")
+    print(f"Signature, arbre déjà construit:       {len(warm) / sum(warm):8,.0f} signatures/s")
+    print(f"Signature, moyenne sur {len(transactions):5d} messages:  {1 / amortized:8,.0f} signatures/s")
+
+    # Clés à usage unique: index distincts, jamais réutilisés après un redémarrage
+    indexes = [int(tx.signature[:8], 16) for tx in transactions]
+    unique = len(set(indexes)) == len(indexes) and indexes == sorted(indexes)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'signing_counters.json')
+        before = [blockchain_node.SigningCounters(path).reserve(wallet.address) for _ in range(3)]
+        after = blockchain_node.SigningCounters(path).reserve(wallet.address)
+    unique &= after > max(before)
+    ok = unique
+    print(f"Clés à usage unique, jamais réutilisées (redémarrage compris): {'oui' if unique else 'NON'}")
+
+    # Vérification: sans puis avec les couches hautes déjà vérifiées (verdicts non gardés),
+    # puis transactions déjà vérifiées (SIGNATURE_CACHE)
+    results = {}
+    for mode in ("couches hautes à froid", "couches hautes en cache", "verdict en cache"):
+        cached = mode == "verdict en cache"
+        blockchain_node.SIGNATURE_CACHE = blockchain_node.VerifiedSignatureCache(
+            blockchain_node.SIGNATURE_CACHE_BYTES if cached else 0)
+        if mode == "couches hautes à froid":
+            blockchain_node.VERIFIED_ROOTS = blockchain_node.VerifiedRoots(max_size=0)
+        else:
+            blockchain_node.VERIFIED_ROOTS = blockchain_node.VerifiedRoots()
+            for tx in (transactions if cached else transactions[::tree_size]):
+                tx.is_valid()
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            ok &= all(tx.is_valid() for tx in transactions)
+        results[mode] = len(transactions) * args.rounds / (time.perf_counter() - start)
+        print(f"Vérification, {mode:23s} {results[mode]:8,.0f} vérifications/s")
+    blockchain_node.VERIFIED_ROOTS = blockchain_node.VerifiedRoots()
+
+    legacy = QuantumAddress('ab' * 64)
+    legacy_txs = [Transaction(legacy.address, recipient.address, 1, 0.01, nonce) for nonce in range(args.messages)]
+    for tx in legacy_txs:
+        tx.sign(legacy)
+    cutoff = blockchain_node.LEGACY_SIGNATURES_CUTOFF
+    blockchain_node.LEGACY_SIGNATURES_CUTOFF = float('inf')
+    start = time.perf_counter()
+    ok &= all(tx.is_valid() for tx in legacy_txs)
+    legacy_rate = len(legacy_txs) / (time.perf_counter() - start)
+    blockchain_node.LEGACY_SIGNATURES_CUTOFF = cutoff
+    print(f"Vérification, {'ancien format':23s} {legacy_rate:8,.0f} vérifications/s (format seul, aucune preuve, "
+          f"anciennes chaînes)")
+    print(f"Import de blocs de {args.block_size} transactions: "
+          f"{results['couches hautes en cache'] / args.block_size:,.1f} blocs/s sur un cœur")
+
+    # Les signatures invalides sont rejetées
+    other = wallets[1]
+    forged = []
+    tx = transactions[1]
+    tampered = Transaction.from_dict(dict(tx.to_dict(), amount=tx.amount + 1))
+    forged.append(('montant modifié', tampered))
+    flipped = Transaction.from_dict(tx.to_dict())
+    raw = bytearray.fromhex(flipped.signature)
+    raw[len(raw) // 2] ^= 1
+    flipped.signature = raw.hex()
+    forged.append(('un bit de la signature', flipped))
+    stolen = Transaction.from_dict(dict(tx.to_dict(), sender=other.address))
+    forged.append(('signature d\'un autre wallet', stolen))
+    legacy_format = Transaction.from_dict(dict(tx.to_dict(), signature='ab' * 64))
+    forged.append(('ancien format sur une adresse Qx', legacy_format))
+    truncated = Transaction.from_dict(dict(tx.to_dict(), signature=tx.signature[:-2]))
+    forged.append(('signature tronquée', truncated))
+    forged.append(('ancienne adresse, par défaut', legacy_txs[0]))
+    # Migration d'une ancienne adresse: seul un transfert sans frais vers son successeur passe
+    blockchain_node.LEGACY_MIGRATIONS[legacy.address] = recipient.address
+    migration = Transaction(legacy.address, recipient.address, 1, 0, 0)
+    migration.sign(legacy)
+    forged.append(('migration vers une autre adresse', Transaction.from_dict(dict(migration.to_dict(), recipient=other.address))))
+    forged.append(('migration avec frais', legacy_txs[0]))
+    for label, candidate in forged:
+        rejected = not candidate.is_valid()
+        ok &= rejected
+        print(f"Rejet ({label}): {'oui' if rejected else 'NON'}")
+    accepted = migration.is_valid()
+    del blockchain_node.LEGACY_MIGRATIONS[legacy.address]
+    ok &= accepted
+    print(f"Migration sans frais vers le successeur acceptée: {'oui' if accepted else 'NON'}")
+    # Ancienne chaîne: transaction datée d'avant la date limite, jugée à la date de son bloc
+    old = Transaction(legacy.address, recipient.address, 1, 0.01, 0)
+    old.timestamp = blockchain_node.LEGACY_SIGNATURES_CUTOFF - 60
+    old.sign(legacy)
+    old_chain = old.is_valid(now=old.timestamp + 1) and not old.is_valid()
+    ok &= old_chain
+    print(f"Ancienne chaîne acceptée, même transaction refusée aujourd'hui: {'oui' if old_chain else 'NON'}")
+
+    rebuilt = QuantumAddress.from_dict(wallet.to_dict())
+    ok &= rebuilt.address == wallet.address and rebuilt.sign('message', 7) == wallet.sign('message', 7)
+    print(f"\nSignatures valides acceptées, falsifications rejetées: {'oui' if ok else 'NON'}")
+    return ok
+
+# ============================================================================
+# CACHE DES SIGNATURES VÉRIFIÉES
+# ============================================================================
+
+def bench_sigcache(args) -> bool:
+    print_header("CACHE DES SIGNATURES VÉRIFIÉES: UNE VÉRIFICATION PAR TRANSACTION ET PAR NŒUD")
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    wallets = [QuantumAddress() for _ in range(args.wallets)]
+    transactions = []
+    for nonce in range(args.txs // args.wallets):
+        for wallet in wallets:
+            tx = Transaction(wallet.address, wallets[0].address, 1, 0.01, nonce)
+            tx.sign(wallet)
+            transactions.append(tx)
+    payloads = [tx.to_dict() for tx in transactions]
+    print(f"Transactions: {len(transactions)} | {args.wallets} expéditeurs | "
+          f"blocs de {SimplePoSBlockchain().max_block_size} transactions")
+
+    ok = True
+    stages = ("réception (pool)", "assemblage des blocs", "réception (pool) du peer",
+              "import des blocs par le peer", "revérification (/sync) du peer")
+    timings = {}
+    for mode, budget in (("sans cache", 0), ("avec cache", blockchain_node.SIGNATURE_CACHE_BYTES)):
+        producer, peer = Node(0), Node(0)
+        peer.blockchain.chain[0] = producer.blockchain.chain[0]
+        for node in (producer, peer):
+            node.blockchain.max_pending_per_address = len(transactions)
+            for wallet in wallets:
+                node.blockchain.balances[wallet.address] = 1_000_000
+            node.blockchain.register_validator(wallets[0].address, 1000)
+        # Deux nœuds distincts: chacun son cache (processus séparés en production)
+        caches = {node: blockchain_node.VerifiedSignatureCache(budget) for node in (producer, peer)}
+        blocks = []
+
+        def receive(node):
+            client = node.app.test_client()
+            for offset in range(0, len(payloads), 500):
+                results = client.post('/transactions/receive_batch', json={
+                    'transactions': payloads[offset:offset + 500]}).get_json()['results']
+                assert all(result['success'] for result in results)
+
+        def mine():
+            client = producer.app.test_client()
+            while len(producer.blockchain.pending_transactions):
+                response = client.post('/block/mine').get_json()
+                assert response['success'], response
+                blocks.append(response['block'])
+
+        def import_blocks():
+            client = peer.app.test_client()
+            for block in blocks:
+                assert client.post('/block/receive', json=block).status_code == 200
+
+        def audit():
+            verdicts = peer.verifier.verify_blocks(peer.blockchain.chain)
+            assert all(all(block) for block in verdicts)
+
+        steps = ((producer, lambda: receive(producer)), (producer, mine), (peer, lambda: receive(peer)),
+                 (peer, import_blocks), (peer, audit))
+        print(f"\n{mode}:")
+        for stage, (node, step) in zip(stages, steps):
+            cache = blockchain_node.SIGNATURE_CACHE = caches[node]
+            misses = cache.misses
+            start = time.perf_counter()
+            try:
+                step()
+            except AssertionError as error:
+                print(f"  {stage}: ÉCHEC {error}")
+                ok = False
+                continue
+            elapsed = time.perf_counter() - start
+            verified = cache.misses - misses
+            timings[(mode, stage)] = (elapsed, verified)
+            print(f"  {stage:30s} {elapsed * 1000:9.1f} ms | signatures vérifiées: {verified:5d}")
+        ok &= [block.hash for block in peer.blockchain.chain] == [block.hash for block in producer.blockchain.chain]
+        ok &= peer.blockchain.balances == producer.blockchain.balances
+        stats = caches[peer].stats()
+        print(f"  cache du peer: {stats['entries']} entrées ({stats['bytes'] / 1024:.0f} Kio sur "
+              f"{stats['max_bytes'] / 1024 / 1024:.0f} Mio) | succès {stats['hits']} | échecs {stats['misses']}")
+        producer.gossip.close()
+        peer.gossip.close()
+    blockchain_node.SIGNATURE_CACHE = blockchain_node.VerifiedSignatureCache()
+
+    # Une fois en pool, une transaction n'est plus vérifiée: ni à l'assemblage, ni à l'import, ni à l'audit
+    repeated = sum(timings[("avec cache", stage)][1] for stage in stages[1:2] + stages[3:]
+                   if ("avec cache", stage) in timings)
+    ok &= repeated == 0
+    total = {mode: sum(elapsed for (entry_mode, _), (elapsed, _) in timings.items() if entry_mode == mode)
+             for mode in ("sans cache", "avec cache")}
+    print(f"\nTemps total: {total['sans cache'] * 1000:.0f} ms -> {total['avec cache'] * 1000:.0f} ms "
+          f"(x{total['sans cache'] / total['avec cache']:.1f})")
+
+    # Le verdict est lié à la signature exacte: une signature modifiée est revérifiée et rejetée
+    cache = blockchain_node.SIGNATURE_CACHE
+    tx = transactions[0]
+    ok &= tx.is_valid() and tx.is_valid() and cache.hits == 1
+    raw = bytearray.fromhex(tx.signature)
+    raw[-1] ^= 1
+    forged = Transaction.from_dict(dict(tx.to_dict(), signature=raw.hex()))
+    ok &= not forged.is_valid() and cache.misses == 2
+    small = blockchain_node.VerifiedSignatureCache(max_bytes=10 * blockchain_node.VerifiedSignatureCache.ENTRY_SIZE)
+    for tx in transactions[:20]:
+        small.add(tx.get_hash(), tx.signature, tx.sender)
+    ok &= small.stats()['entries'] == 10 and small.evictions == 10
+    print(f"Aucune vérification après la pool, verdicts liés à la signature, budget respecté: "
+          f"{'oui' if ok else 'NON'}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks du nœud blockchain')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    nonce_parser = subparsers.add_parser('nonce', help='Index des nonces vs parcours complet')
+    nonce_parser.add_argument('--blocks', type=int, default=200)
+    nonce_parser.add_argument('--txs', type=int, default=50)
+    nonce_parser.set_defaults(func=bench_nonce)
+
+    history_parser = subparsers.add_parser('history', help='Historique des transactions: liste vs dictionnaire')
+    history_parser.add_argument('--txs', type=int, default=100000)
+    history_parser.set_defaults(func=bench_history)
+
+    mempool_parser = subparsers.add_parser('mempool', help='Coût de soumission quand la pool grossit')
+    mempool_parser.add_argument('--txs', type=int, default=10000)
+    mempool_parser.set_defaults(func=bench_mempool)
+
+    assembly_parser = subparsers.add_parser('assembly', help='Sélection des transactions: frais vs FIFO')
+    assembly_parser.add_argument('--txs', type=int, default=10000)
+    assembly_parser.add_argument('--rounds', type=int, default=20)
+    assembly_parser.set_defaults(func=bench_assembly)
+
+    txhash_parser = subparsers.add_parser('txhash', help='Hash des transactions: recalcul vs cache')
+    txhash_parser.add_argument('--txs', type=int, default=100000)
+    txhash_parser.set_defaults(func=bench_txhash)
+
+    merkle_parser = subparsers.add_parser('merkle', help='Hash d\'en-tête et racine de Merkle vs JSON complet')
+    merkle_parser.add_argument('--rounds', type=int, default=20)
+    merkle_parser.set_defaults(func=bench_merkle)
+
+    restart_parser = subparsers.add_parser('restart', help='Redémarrage: snapshot vs rejeu complet')
+    restart_parser.add_argument('--blocks', type=int, default=500)
+    restart_parser.add_argument('--txs', type=int, default=20)
+    restart_parser.add_argument('--snapshot-interval', type=int, default=100)
+    restart_parser.add_argument('--state-backend', choices=['memory', 'sqlite'], default='memory')
+    restart_parser.set_defaults(func=bench_restart)
+
+    state_parser = subparsers.add_parser('state', help='État des comptes: mémoire vs SQLite')
+    state_parser.add_argument('--accounts', type=int, default=200000)
+    state_parser.set_defaults(func=bench_state)
+
+    validation_parser = subparsers.add_parser('validation', help='Validation incrémentale vs audit complet')
+    validation_parser.add_argument('--blocks', type=int, default=300)
+    validation_parser.add_argument('--txs', type=int, default=20)
+    validation_parser.add_argument('--rounds', type=int, default=10)
+    validation_parser.set_defaults(func=bench_validation)
+
+    status_parser = subparsers.add_parser('status', help='Statut en cache (ETag) vs recalcul complet')
+    status_parser.add_argument('--blocks', type=int, default=300)
+    status_parser.add_argument('--txs', type=int, default=20)
+    status_parser.add_argument('--requests', type=int, default=1000)
+    status_parser.set_defaults(func=bench_status)
+
+    blocks_parser = subparsers.add_parser('blocks', help='Chaîne complète vs pages et flux NDJSON')
+    blocks_parser.add_argument('--blocks', type=int, default=1000)
+    blocks_parser.add_argument('--txs', type=int, default=20)
+    blocks_parser.set_defaults(func=bench_blocks)
+
+    sync_parser = subparsers.add_parser('sync', help='Synchronisation par en-têtes vs chaîne complète')
+    sync_parser.add_argument('--blocks', type=int, default=1000)
+    sync_parser.add_argument('--txs', type=int, default=20)
+    sync_parser.set_defaults(func=bench_sync)
+
+    catchup_parser = subparsers.add_parser('catchup', help='Rattrapage parallèle selon le nombre de peers')
+    catchup_parser.add_argument('--blocks', type=int, default=2000)
+    catchup_parser.add_argument('--txs', type=int, default=5)
+    catchup_parser.add_argument('--peers', type=int, default=4)
+    catchup_parser.add_argument('--latency', type=int, default=200, help='Temps de service d\'un lot (ms)')
+    catchup_parser.set_defaults(func=bench_catchup)
+
+    gossip_parser = subparsers.add_parser('gossip', help='Diffusion séquentielle vs gossip asynchrone')
+    gossip_parser.add_argument('--txs', type=int, default=20)
+    gossip_parser.add_argument('--peers', type=int, default=4)
+    gossip_parser.add_argument('--slow', type=int, default=2)
+    gossip_parser.add_argument('--delay', type=int, default=200, help='Temps de réponse des peers lents (ms)')
+    gossip_parser.set_defaults(func=bench_gossip)
+
+    inventory_parser = subparsers.add_parser('inventory', help='Annonces d\'inventaire vs corps poussés')
+    inventory_parser.add_argument('--txs', type=int, default=50)
+    inventory_parser.add_argument('--nodes', type=int, default=5)
+    inventory_parser.set_defaults(func=bench_inventory)
+
+    relay_parser = subparsers.add_parser('relay', help='Relais de transactions: une par requête vs lots')
+    relay_parser.add_argument('--txs', type=int, default=2000)
+    relay_parser.add_argument('--batch', type=int, default=blockchain_node.INV_BATCH_SIZE)
+    relay_parser.set_defaults(func=bench_relay)
+
+    sendbatch_parser = subparsers.add_parser('sendbatch', help='Soumission: /transaction/send en boucle vs lots signés')
+    sendbatch_parser.add_argument('--txs', type=int, default=2000)
+    sendbatch_parser.add_argument('--batch', type=int, default=blockchain_node.SEND_BATCH_SIZE)
+    sendbatch_parser.set_defaults(func=bench_sendbatch)
+
+    peers_parser = subparsers.add_parser('peers', help='Surveillance des peers: sondes vs vérification en ligne')
+    peers_parser.add_argument('--blocks', type=int, default=200)
+    peers_parser.add_argument('--txs', type=int, default=20)
+    peers_parser.add_argument('--peers', type=int, default=4, help='Peers sains et rapides')
+    peers_parser.add_argument('--slow', type=int, default=3, help='Peers lents')
+    peers_parser.add_argument('--delay', type=int, default=200, help='Temps de réponse des peers lents (ms)')
+    peers_parser.set_defaults(func=bench_peers)
+
+    load_parser = subparsers.add_parser('load', help='Charge HTTP: requêtes par seconde selon la concurrence')
+    load_parser.add_argument('--blocks', type=int, default=200)
+    load_parser.add_argument('--txs', type=int, default=20)
+    load_parser.add_argument('--duration', type=float, default=3, help='Durée de chaque palier (s)')
+    load_parser.add_argument('--concurrency', type=str, default='1,4,16,64', help='Paliers de clients simultanés')
+    load_parser.add_argument('--write-ratio', type=float, default=0.2, help='Part des requêtes qui envoient une transaction')
+    load_parser.add_argument('--mine-interval', type=int, default=100, help='Intervalle entre deux /block/mine (ms)')
+    load_parser.add_argument('--threads', type=int, default=blockchain_node.SERVER_THREADS)
+    load_parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                             help='Processus clients (les clients ne partagent pas le GIL du serveur)')
+    load_parser.set_defaults(func=bench_load)
+
+    import_parser = subparsers.add_parser('import', help='Import des blocs reçus: étapes vs contrôles en ligne')
+    import_parser.add_argument('--blocks', type=int, default=300)
+    import_parser.add_argument('--txs', type=int, default=50)
+    import_parser.set_defaults(func=bench_import)
+
+    verify_parser = subparsers.add_parser('verify', help='Vérification par lots: pool de processus vs sur place')
+    verify_parser.add_argument('--txs', type=int, default=2000)
+    verify_parser.add_argument('--workers', type=str, default='1,2,4,8', help='Nombres de processus mesurés')
+    verify_parser.add_argument('--rounds', type=int, default=3)
+    verify_parser.set_defaults(func=bench_verify)
+
+    overlay_parser = subparsers.add_parser('overlay', help='Surcouche des comptes vs soldes relus par transaction')
+    overlay_parser.add_argument('--blocks', type=int, default=200)
+    overlay_parser.set_defaults(func=bench_overlay)
+
+    stress_parser = subparsers.add_parser('stress', help='Écritures et lectures concurrentes: cohérence des soldes')
+    stress_parser.add_argument('--wallets', type=int, default=50)
+    stress_parser.add_argument('--requests', type=int, default=5000, help='Transactions envoyées au total')
+    stress_parser.add_argument('--clients', type=int, default=32, help='Clients HTTP simultanés')
+    stress_parser.add_argument('--readers', type=int, default=4, help='Lecteurs simultanés')
+    stress_parser.add_argument('--mine-interval', type=int, default=50, help='Intervalle entre deux /block/mine (ms)')
+    stress_parser.add_argument('--threads', type=int, default=16, help='Threads du serveur de production')
+    stress_parser.set_defaults(func=bench_stress)
+
+    signature_parser = subparsers.add_parser('signature', help='Signatures hash-based: signatures et vérifications par seconde')
+    signature_parser.add_argument('--messages', type=int, default=1024, help='Transactions signées (nonces consécutifs)')
+    signature_parser.add_argument('--wallets', type=int, default=5, help='Wallets générés')
+    signature_parser.add_argument('--rounds', type=int, default=3)
+    signature_parser.add_argument('--block-size', type=int, default=100, help='Transactions par bloc importé')
+    signature_parser.set_defaults(func=bench_signature)
+
+    sigcache_parser = subparsers.add_parser('sigcache', help='Cache des signatures vérifiées: vérifications par étape')
+    sigcache_parser.add_argument('--txs', type=int, default=500)
+    sigcache_parser.add_argument('--wallets', type=int, default=10, help='Expéditeurs')
+    sigcache_parser.set_defaults(func=bench_sigcache)
+
+    args = parser.parse_args()
+    if not args.func(args):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -4,9 +4,11 @@ BLOCKCHAIN NODE
 
 Installation:
     pip install flask requests
+    pip install waitress        # optionnel: serveur de production
 
 Utilisation:
     python blockchain_node.py --port 5000
+    python blockchain_node.py --port 5000 --server production --threads 8
 
 Note:
     L'adresse du trésor est définie par défaut dans le code pour garantir
@@ -16,17 +18,39 @@ Note:
     Pour rejoindre le réseau officiel, ne pas spécifier --treasury ou TREASURY_ADDRESS.
 """
 
+import bisect
+import functools
 import hashlib
+import heapq
+import itertools
 import json
 import time
 import random
 import argparse
 import os
 import logging
+import math
+import sqlite3
+import struct
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
-from typing import List, Dict, Optional
-from flask import Flask, jsonify, request
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from queue import Queue
+from typing import Iterator, List, Dict, Optional, Tuple
+from flask import Flask, Response, copy_current_request_context, jsonify, request
 import requests
+from werkzeug.serving import make_server
+
+try:
+    import waitress  # Serveur WSGI de production (optionnel)
+except ImportError:
+    waitress = None
 
 # ============================================================================
 # CONFIGURATION DU MECANISME D'INACTIVITE
@@ -46,28 +70,438 @@ DEFAULT_TREASURY_ADDRESS = "Qbd7901a83d578aabe02710c57540c19242a3941d178bed"
 
 # PROTECTION 7: Configuration pour les attaques de rejeu
 TRANSACTION_MAX_AGE = 3600  # Transactions expirées après 1 heure (3600 secondes)
+# Les transactions d'un bloc sont jugées à sa date: un bloc n'est jamais daté avant
+# le bloc précédent, ni plus de BLOCK_MAX_FUTURE_DRIFT secondes après l'horloge locale
+BLOCK_MAX_FUTURE_DRIFT = 120
+
+# ============================================================================
+# CONFIGURATION DES SIGNATURES
+# ============================================================================
+
+# Signatures hash-based: clés à usage unique WOTS+ (Winternitz w=16) rangées dans
+# un hyper-arbre de Merkle à la XMSS^MT, sur sha3_256 tronqué à SIGNATURE_N octets
+# (16 octets: niveau 1 du NIST, comme SPHINCS+-128). SIGNATURE_LAYERS couches
+# d'arbres de hauteur SIGNATURE_TREE_HEIGHT: 128^3 = 2 097 152 clés par adresse
+SIGNATURE_N = 16
+SIGNATURE_TREE_HEIGHT = 7
+SIGNATURE_LAYERS = 3
+# Clés à usage unique réservées d'un coup par adresse (compteurs persistants):
+# une écriture sur disque toutes les SIGNING_COUNTER_RESERVE signatures
+SIGNING_COUNTER_RESERVE = 16
+# Signatures des couches hautes déjà vérifiées (partagées par les transactions
+# d'un même arbre de la couche basse): nombre d'entrées gardées
+SIGNATURE_ROOT_CACHE_SIZE = 4096
+# Verdicts des signatures déjà vérifiées (transaction reçue, mise en pool, puis
+# incluse dans un bloc et importée): budget mémoire du cache, en octets
+SIGNATURE_CACHE_BYTES = 16 * 1024 * 1024
+# Wallets reconstruits depuis une clé privée (/transaction/send): arbres gardés
+WALLET_CACHE_SIZE = 64
+# Anciennes adresses (Q + 46 caractères hex): leur signature n'est vérifiable que
+# sur son format (128 caractères hex), n'importe qui peut donc la produire.
+# Règles de la chaîne, identiques sur tous les nœuds (jamais une option locale,
+# qui rendrait la validité d'un bloc dépendante de la configuration du nœud):
+# - signatures acceptées pour les transactions datées d'avant la date limite
+#   (18/10/2026 00:00 UTC, passage aux signatures à base de hash): les anciennes
+#   chaînes restent valides, et une transaction antidatée est expirée
+#   (TRANSACTION_MAX_AGE) dans tout bloc daté de plus d'une heure après la date limite
+LEGACY_SIGNATURES_CUTOFF = 1792281600
+# - migration: {ancienne adresse: adresse Qx qui lui succède}. Une transaction
+#   sans frais d'une ancienne adresse vers son successeur reste acceptée: qui la
+#   forge ne peut que déplacer les fonds vers le successeur. Le successeur du
+#   trésor officiel (créé par create_treasury.py) est publié ici, par une version
+#   du nœud: tant qu'il ne l'est pas, le trésor officiel ne peut pas distribuer
+LEGACY_MIGRATIONS: Dict[str, str] = {}
+
+# ============================================================================
+# CONFIGURATION DU FORMAT DES BLOCS
+# ============================================================================
+
+# Version 1: hash calculé sur le JSON complet du bloc (transactions incluses)
+# Version 2: hash calculé sur l'en-tête seul, qui contient la racine de Merkle des transactions
+LEGACY_BLOCK_VERSION = 1
+BLOCK_VERSION = 2
+
+# Taille maximale d'une page JSON pour /blocks et /headers; au-delà (ou avec
+# ?format=ndjson), la plage est diffusée en NDJSON, un élément par ligne
+BLOCKS_PAGE_SIZE = 100
+HEADERS_PAGE_SIZE = 2000
+# Taille maximale des listes de comptes et d'activités (/accounts/top, /accounts/inactive,
+# /validators, /security/suspicious)
+LIST_PAGE_SIZE = 1000
+
+# Synchronisation par en-têtes: délai maximal d'une requête vers un peer (secondes)
+SYNC_TIMEOUT = 30
+# Rattrapage: lots de blocs téléchargés en parallèle auprès des peers
+SYNC_WORKERS = 4
+SYNC_BLOCKS_TIMEOUT = 10  # Un peer plus lent est abandonné pour ce lot
+
+# Diffusion (gossip): envois simultanés au plus, file bornée par peer, délais (connexion, réponse)
+GOSSIP_CONCURRENCY = 8
+GOSSIP_QUEUE_SIZE = 1000
+GOSSIP_TIMEOUT = (1, 2)
+# Inventaire: hash annoncés par message /inv, hash mémorisés par peer, délai avant
+# de redemander un objet déjà demandé à un autre peer (secondes)
+INV_BATCH_SIZE = 500
+INVENTORY_SIZE = 50000
+GETDATA_TIMEOUT = 10
+# Relais par lots: une annonce attend au plus GOSSIP_BATCH_WINDOW secondes que
+# d'autres la rejoignent (fenêtre bornée aussi par INV_BATCH_SIZE)
+GOSSIP_BATCH_WINDOW = 0.05
+# Nombre maximal de transactions par appel à /transactions/send_batch
+SEND_BATCH_SIZE = 1000
+
+# Surveillance des peers: intervalle entre deux sondes GET /health (secondes),
+# délai d'une sonde, sondes simultanées, échecs consécutifs avant mise à l'écart
+PEER_PROBE_INTERVAL = 30
+PEER_PROBE_TIMEOUT = 2
+PEER_PROBE_WORKERS = 16
+PEER_MAX_FAILURES = 3
+
+# Mode production: threads de traitement des requêtes (waitress); sans waitress,
+# le serveur WSGI multi-thread de werkzeug crée un thread par requête
+SERVER_THREADS = 8
+# Instantanés des comptes: modifications gardées à part de la copie de base
+# jusqu'à ce nombre de comptes, puis fusionnées dans une nouvelle base
+SNAPSHOT_DELTA_SIZE = 4096
+# Import de blocs (/block/receive): nombre de blocs récents gardés pour les latences
+IMPORT_STATS_WINDOW = 1000
+
+# Vérification des transactions par lots: processus de vérification, taille de
+# lot à partir de laquelle le lot est réparti entre eux, taille minimale d'un morceau
+VERIFY_WORKERS = os.cpu_count() or 1
+VERIFY_PARALLEL_MIN = 64
+VERIFY_CHUNK_MIN = 32
+
+# ============================================================================
+# SIGNATURES POST-QUANTIQUES (WOTS+ / HYPER-ARBRE DE MERKLE)
+# ============================================================================
+
+WOTS_W = 16
+WOTS_LEN1 = 2 * SIGNATURE_N  # Chiffres en base 16 du condensé signé
+WOTS_LEN2 = 3                # Somme de contrôle: au plus 15 * 32 = 480 < 16 ** 3
+WOTS_LEN = WOTS_LEN1 + WOTS_LEN2
+TREE_LEAVES = 1 << SIGNATURE_TREE_HEIGHT
+SIGNATURE_CAPACITY = TREE_LEAVES ** SIGNATURE_LAYERS
+LAYER_SIGNATURE_SIZE = (WOTS_LEN + SIGNATURE_TREE_HEIGHT) * SIGNATURE_N
+# Index de la clé (4 octets), graine publique, puis une signature par couche
+SIGNATURE_SIZE = 4 + SIGNATURE_N + SIGNATURE_LAYERS * LAYER_SIGNATURE_SIZE
+HASH_ADDRESS_PREFIX = "Qx"
+LEGACY_SIGNATURE_LENGTH = 128
+LEGACY_PRIVATE_KEY_LENGTH = 128
+
+# Domaines de hachage (premier octet de l'adresse de hachage)
+HASH_SECRET, HASH_CHAIN, HASH_LEAF, HASH_NODE, HASH_MESSAGE = range(5)
+
+# Suffixes (chaîne, étape) précalculés: une étape de chaîne n'est qu'une
+# concaténation et un hash
+CHAIN_TWEAKS = [[bytes((chain, step)) for step in range(WOTS_W)] for chain in range(WOTS_LEN)]
+
+def hash_address(domain: int, layer: int, tree: int, leaf: int) -> bytes:
+    return struct.pack('>BBIH', domain, layer, tree, leaf)
+
+def short_hash(data: bytes) -> bytes:
+    return hashlib.sha3_256(data).digest()[:SIGNATURE_N]
+
+def message_digest(pub_seed: bytes, index: int, message: bytes) -> bytes:
+    """Condensé signé par la couche basse (lié à la graine publique et à l'index)"""
+    return short_hash(pub_seed + hash_address(HASH_MESSAGE, 0, index, 0) + message)
+
+def wots_digits(digest: bytes) -> List[int]:
+    """Chiffres en base 16 du condensé, suivis de ceux de la somme de contrôle"""
+    digits = []
+    for byte in digest:
+        digits.append(byte >> 4)
+        digits.append(byte & 15)
+    checksum = sum(WOTS_W - 1 - digit for digit in digits)
+    digits.extend(((checksum >> 8) & 15, (checksum >> 4) & 15, checksum & 15))
+    return digits
+
+def wots_chains(prefix: bytes, values: List[bytes], starts: List[int], stops: List[int]) -> List[bytes]:
+    """Fait avancer chaque chaîne de starts[i] à stops[i]: toutes les chaînes
+    d'une clé en un seul passage (c'est là que se fait presque tout le hachage)
+    
+    Le préfixe commun (graine publique, adresse de la clé) n'est absorbé qu'une
+    fois: chaque étape repart d'une copie de cet état.
+    """
+    base = hashlib.sha3_256(prefix)
+    n = SIGNATURE_N
+    ends = []
+    for tweaks, value, start, stop in zip(CHAIN_TWEAKS, values, starts, stops):
+        for step in range(start, stop):
+            state = base.copy()
+            state.update(tweaks[step] + value)
+            value = state.digest()[:n]
+        ends.append(value)
+    return ends
+
+def tree_parent(pub_seed: bytes, layer: int, tree: int, height: int, index: int,
+                left: bytes, right: bytes) -> bytes:
+    return short_hash(pub_seed + hash_address(HASH_NODE, layer, tree, (height << 8) | index) + left + right)
+
+def layer_root(pub_seed: bytes, layer: int, tree: int, leaf: int, digest: bytes, chunk: bytes) -> bytes:
+    """Racine de l'arbre (layer, tree) reconstruite depuis la signature WOTS de
+    digest par la feuille leaf et son chemin d'authentification"""
+    n = SIGNATURE_N
+    signature = [chunk[offset:offset + n] for offset in range(0, WOTS_LEN * n, n)]
+    digits = wots_digits(digest)
+    ends = wots_chains(pub_seed + hash_address(HASH_CHAIN, layer, tree, leaf),
+                       signature, digits, [WOTS_W - 1] * WOTS_LEN)
+    node = short_hash(pub_seed + hash_address(HASH_LEAF, layer, tree, leaf) + b''.join(ends))
+    index = leaf
+    for height in range(SIGNATURE_TREE_HEIGHT):
+        offset = (WOTS_LEN + height) * n
+        sibling = chunk[offset:offset + n]
+        if index & 1:
+            node = tree_parent(pub_seed, layer, tree, height + 1, index >> 1, sibling, node)
+        else:
+            node = tree_parent(pub_seed, layer, tree, height + 1, index >> 1, node, sibling)
+        index >>= 1
+    return node
+
+class VerifiedRoots:
+    """Couches hautes de signatures déjà vérifiées -> racine de l'hyper-arbre
+    
+    Toutes les signatures d'un même arbre de la couche basse (TREE_LEAVES index
+    consécutifs d'une adresse) portent les mêmes couches hautes: elles ne sont
+    reconstruites qu'une fois. La clé contient tous les octets dont dépend la
+    racine, l'entrée ne peut donc pas servir pour une autre signature.
+    """
+    
+    def __init__(self, max_size: int = SIGNATURE_ROOT_CACHE_SIZE):
+        self.max_size = max_size
+        self._roots: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key: bytes) -> Optional[bytes]:
+        with self.lock:
+            root = self._roots.get(key)
+            if root is not None:
+                self._roots.move_to_end(key)
+            return root
+    
+    def put(self, key: bytes, root: bytes):
+        with self.lock:
+            self._roots[key] = root
+            if len(self._roots) > self.max_size:
+                self._roots.popitem(last=False)
+
+VERIFIED_ROOTS = VerifiedRoots()
+
+def recover_public_key(message: bytes, signature: bytes) -> Optional[bytes]:
+    """Clé publique (graine publique + racine) qu'une signature valide de message
+    implique, ou None si la signature est mal formée; elle est ensuite comparée
+    à l'adresse de l'expéditeur"""
+    if len(signature) != SIGNATURE_SIZE:
+        return None
+    index = int.from_bytes(signature[:4], 'big')
+    if index >= SIGNATURE_CAPACITY:
+        return None
+    pub_seed = signature[4:4 + SIGNATURE_N]
+    offset = 4 + SIGNATURE_N
+    tree, leaf = index >> SIGNATURE_TREE_HEIGHT, index & (TREE_LEAVES - 1)
+    node = layer_root(pub_seed, 0, tree, leaf, message_digest(pub_seed, index, message),
+                      signature[offset:offset + LAYER_SIGNATURE_SIZE])
+    upper = signature[offset + LAYER_SIGNATURE_SIZE:]
+    key = pub_seed + tree.to_bytes(4, 'big') + node + upper
+    root = VERIFIED_ROOTS.get(key)
+    if root is None:
+        root = node
+        for layer in range(1, SIGNATURE_LAYERS):
+            start = (layer - 1) * LAYER_SIGNATURE_SIZE
+            tree, leaf = tree >> SIGNATURE_TREE_HEIGHT, tree & (TREE_LEAVES - 1)
+            root = layer_root(pub_seed, layer, tree, leaf, root, upper[start:start + LAYER_SIGNATURE_SIZE])
+        VERIFIED_ROOTS.put(key, root)
+    return pub_seed + root
+
+class HashSignatureKey:
+    """Clé de signature hash-based: graines secrète et publique, arbres précalculés
+    
+    Les arbres (toutes les chaînes de leurs TREE_LEAVES clés WOTS parcourues) sont
+    construits à la première signature qui en a besoin puis gardés, de même
+    que la signature des couches hautes de chaque arbre de la couche basse:
+    une signature ne coûte ensuite que ses chaînes WOTS de la couche basse.
+    Une clé ne doit signer qu'un seul message: les index sont distribués par
+    SigningCounters.
+    """
+    
+    def __init__(self, sk_seed: bytes, pub_seed: bytes):
+        self.sk_seed = sk_seed
+        self.pub_seed = pub_seed
+        self.trees: Dict[Tuple[int, int], List[List[bytes]]] = {}
+        self.upper_signatures: Dict[int, bytes] = {}
+        self.public_key = pub_seed + self.tree_levels(SIGNATURE_LAYERS - 1, 0)[-1][0]
+    
+    def wots_secret(self, layer: int, tree: int, leaf: int) -> List[bytes]:
+        base = self.sk_seed + self.pub_seed + hash_address(HASH_SECRET, layer, tree, leaf)
+        return [short_hash(base + bytes((chain,))) for chain in range(WOTS_LEN)]
+    
+    def tree_levels(self, layer: int, tree: int) -> List[List[bytes]]:
+        levels = self.trees.get((layer, tree))
+        if levels is None:
+            pub_seed = self.pub_seed
+            nodes = []
+            for leaf in range(TREE_LEAVES):
+                ends = wots_chains(pub_seed + hash_address(HASH_CHAIN, layer, tree, leaf),
+                                   self.wots_secret(layer, tree, leaf), [0] * WOTS_LEN, [WOTS_W - 1] * WOTS_LEN)
+                nodes.append(short_hash(pub_seed + hash_address(HASH_LEAF, layer, tree, leaf) + b''.join(ends)))
+            levels = [nodes]
+            for height in range(1, SIGNATURE_TREE_HEIGHT + 1):
+                below = levels[-1]
+                levels.append([tree_parent(pub_seed, layer, tree, height, index, below[2 * index], below[2 * index + 1])
+                               for index in range(len(below) // 2)])
+            self.trees[(layer, tree)] = levels
+        return levels
+    
+    def sign_layer(self, layer: int, tree: int, leaf: int, digest: bytes) -> bytes:
+        digits = wots_digits(digest)
+        signature = wots_chains(self.pub_seed + hash_address(HASH_CHAIN, layer, tree, leaf),
+                                self.wots_secret(layer, tree, leaf), [0] * WOTS_LEN, digits)
+        levels = self.tree_levels(layer, tree)
+        auth = [levels[height][(leaf >> height) ^ 1] for height in range(SIGNATURE_TREE_HEIGHT)]
+        return b''.join(signature) + b''.join(auth)
+    
+    def sign(self, message: bytes, index: int) -> bytes:
+        if not 0 <= index < SIGNATURE_CAPACITY:
+            raise ValueError(f"Pas de clé de signature n° {index} (capacité {SIGNATURE_CAPACITY})")
+        tree, leaf = index >> SIGNATURE_TREE_HEIGHT, index & (TREE_LEAVES - 1)
+        lower = self.sign_layer(0, tree, leaf, message_digest(self.pub_seed, index, message))
+        upper = self.upper_signatures.get(tree)
+        if upper is None:
+            parts = []
+            root, below = self.tree_levels(0, tree)[-1][0], tree
+            for layer in range(1, SIGNATURE_LAYERS):
+                below, leaf = below >> SIGNATURE_TREE_HEIGHT, below & (TREE_LEAVES - 1)
+                parts.append(self.sign_layer(layer, below, leaf, root))
+                root = self.tree_levels(layer, below)[-1][0]
+            upper = self.upper_signatures[tree] = b''.join(parts)
+        return index.to_bytes(4, 'big') + self.pub_seed + lower + upper
+
+class SigningCounters:
+    """Prochaine clé à usage unique de chaque adresse Qx qui signe sur ce nœud
+    
+    Signer deux messages avec la même clé WOTS révèle assez de secrets pour
+    forger une signature: l'index ne dépend pas du nonce de la transaction
+    (réutilisé après expiration ou réorganisation) et ne fait qu'avancer. Les
+    index sont réservés par tranches de SIGNING_COUNTER_RESERVE; la fin de la
+    tranche est écrite sur disque (écriture atomique, fsync) avant qu'elle ne
+    serve. Après un arrêt brutal, le reste de la tranche est sauté, jamais
+    réutilisé. Le premier index d'une adresse est tiré au hasard (début d'un
+    arbre de la couche basse, dans la première moitié de la capacité): deux
+    signataires indépendants d'une même clé ne partent pas du même index.
+    path None: compteurs en mémoire seulement.
+    """
+    
+    def __init__(self, path: str = None):
+        self.path = path
+        self.lock = threading.Lock()
+        self._reserved: Dict[str, int] = {}  # Adresse -> fin de la tranche enregistrée
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self._reserved = {address: int(limit) for address, limit in json.load(f).items()}
+        self._next: Dict[str, int] = dict(self._reserved)  # Tranches en cours abandonnées
+    
+    def reserve(self, address: str) -> int:
+        """Index de la prochaine clé de address (ValueError si la capacité est épuisée)"""
+        with self.lock:
+            index = self._next.get(address)
+            if index is None:
+                trees = (SIGNATURE_CAPACITY // 2) >> SIGNATURE_TREE_HEIGHT
+                index = (int.from_bytes(os.urandom(4), 'big') % trees) << SIGNATURE_TREE_HEIGHT
+            if index >= SIGNATURE_CAPACITY:
+                raise ValueError(f"Clés de signature épuisées ({SIGNATURE_CAPACITY} signatures): "
+                                 f"transférez les fonds vers un nouveau wallet")
+            if index >= self._reserved.get(address, 0):
+                reserved = dict(self._reserved)
+                reserved[address] = min(index + SIGNING_COUNTER_RESERVE, SIGNATURE_CAPACITY)
+                self._save(reserved)
+                self._reserved = reserved
+            self._next[address] = index + 1
+            return index
+    
+    def _save(self, reserved: Dict[str, int]):
+        if self.path is None:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(reserved, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+# Compteurs utilisés par QuantumAddress.sign (fichier choisi au lancement du nœud)
+SIGNING_COUNTERS = SigningCounters()
 
 # ============================================================================
 # CORE BLOCKCHAIN
 # ============================================================================
 
 class QuantumAddress:
-    def __init__(self):
-        seed = str(time.time()) + str(random.random())
-        self.private_key = hashlib.sha3_512(seed.encode()).hexdigest()
-        self.public_key = hashlib.sha3_512(self.private_key.encode()).hexdigest()
-        
-        addr_hash = hashlib.sha3_256(self.public_key.encode()).hexdigest()
+    """Wallet: clé privée, clé publique et adresse dérivée de la clé publique
+    
+    Les wallets créés signent avec HashSignatureKey (adresses Qx...). Une clé
+    privée de 128 caractères est celle d'une ancienne adresse (Q...), dont la
+    signature n'est vérifiable que sur son format (LEGACY_SIGNATURES_CUTOFF,
+    LEGACY_MIGRATIONS).
+    """
+    
+    def __init__(self, private_key: str = None):
+        if private_key is None:
+            private_key = os.urandom(2 * SIGNATURE_N).hex()
+        self.private_key = private_key
+        if len(private_key) == LEGACY_PRIVATE_KEY_LENGTH:
+            self.key = None
+            self.public_key = hashlib.sha3_512(private_key.encode()).hexdigest()
+            self.address = QuantumAddress.address_of(self.public_key, "Q")
+            return
+        seeds = bytes.fromhex(private_key)
+        if len(seeds) != 2 * SIGNATURE_N:
+            raise ValueError("Clé privée invalide")
+        self.key = HashSignatureKey(seeds[:SIGNATURE_N], seeds[SIGNATURE_N:])
+        self.public_key = self.key.public_key.hex()
+        self.address = QuantumAddress.address_of(self.public_key)
+    
+    @staticmethod
+    def address_of(public_key: str, prefix: str = HASH_ADDRESS_PREFIX) -> str:
+        addr_hash = hashlib.sha3_256(public_key.encode()).hexdigest()
         checksum = hashlib.sha3_256(addr_hash.encode()).hexdigest()[:6]
-        self.address = f"Q{addr_hash[:40]}{checksum}"
+        return f"{prefix}{addr_hash[:40]}{checksum}"
     
-    def sign(self, message: str) -> str:
-        sig_data = f"{message}:{self.private_key}"
-        return hashlib.sha3_512(sig_data.encode()).hexdigest()
+    @staticmethod
+    def is_legacy_address(address: str) -> bool:
+        return not address.startswith(HASH_ADDRESS_PREFIX)
+    
+    def sign(self, message: str, index: int = None) -> str:
+        """Signe message avec la prochaine clé à usage unique (SIGNING_COUNTERS)
+        
+        index: clé imposée, que l'appelant garantit n'avoir jamais servi.
+        """
+        if self.key is None:
+            sig_data = f"{message}:{self.private_key}"
+            return hashlib.sha3_512(sig_data.encode()).hexdigest()
+        if index is None:
+            index = SIGNING_COUNTERS.reserve(self.address)
+        return self.key.sign(message.encode(), index).hex()
     
     @staticmethod
-    def verify(message: str, signature: str, public_key: str) -> bool:
-        return len(signature) == 128 and len(public_key) == 128
+    def verify(message: str, signature: str, address: str) -> bool:
+        """La signature a-t-elle été produite par la clé privée de address?
+        
+        Ancienne adresse: seul le format est vérifiable (voir Transaction.is_valid).
+        """
+        if QuantumAddress.is_legacy_address(address):
+            if len(signature) != LEGACY_SIGNATURE_LENGTH:
+                return False
+            try:
+                int(signature, 16)
+            except ValueError:
+                return False
+            return True
+        try:
+            raw = bytes.fromhex(signature)
+        except ValueError:
+            return False
+        public_key = recover_public_key(message.encode(), raw)
+        return public_key is not None and QuantumAddress.address_of(public_key.hex()) == address
     
     def to_dict(self) -> Dict:
         return {
@@ -76,17 +510,130 @@ class QuantumAddress:
             'private_key': self.private_key
         }
     
+    @staticmethod
+    @functools.lru_cache(maxsize=WALLET_CACHE_SIZE)
+    def from_private_key(private_key: str) -> 'QuantumAddress':
+        """Wallet d'une clé privée; les derniers reconstruits sont gardés avec leurs
+        arbres précalculés (ValueError si la clé est mal formée)"""
+        return QuantumAddress(private_key)
+    
     @staticmethod
     def from_dict(data: Dict) -> 'QuantumAddress':
-        wallet = QuantumAddress()
-        wallet.address = data['address']
-        wallet.public_key = data['public_key']
-        wallet.private_key = data['private_key']
-        return wallet
+        return QuantumAddress.from_private_key(data['private_key'])
+
+class VerifiedSignatureCache:
+    """Verdicts des signatures hash-based déjà vérifiées, LRU borné par un budget mémoire
+    
+    Une même transaction est vérifiée à sa réception, à son entrée dans la
+    pool, à l'assemblage du bloc, à l'import du bloc par chaque peer et lors
+    des audits de la chaîne: seule la première vérification fait le travail.
+    La clé est le sha3_256 de (hash de la transaction, expéditeur, signature):
+    l'adresse engage la clé publique, un verdict ne peut donc servir qu'à la
+    signature exacte qui l'a produit. Les anciennes signatures (contrôle de
+    format) ne passent pas par le cache.
+    """
+    
+    # Octets par entrée: clé de 32 octets et nœud de l'OrderedDict (mesuré)
+    ENTRY_SIZE = 176
+    
+    def __init__(self, max_bytes: int = SIGNATURE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_bytes // VerifiedSignatureCache.ENTRY_SIZE
+        self._verdicts: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def key(tx_hash: str, signature: str, sender: str) -> bytes:
+        return hashlib.sha3_256(f"{tx_hash}:{sender}:{signature}".encode()).digest()
+    
+    def verify(self, tx_hash: str, signature: str, sender: str) -> bool:
+        """QuantumAddress.verify(tx_hash, signature, sender), sans refaire une vérification connue"""
+        if QuantumAddress.is_legacy_address(sender):
+            return QuantumAddress.verify(tx_hash, signature, sender)
+        key = VerifiedSignatureCache.key(tx_hash, signature, sender)
+        with self.lock:
+            valid = self._verdicts.get(key)
+            if valid is not None:
+                self._verdicts.move_to_end(key)
+                self.hits += 1
+                return valid
+            self.misses += 1
+        valid = QuantumAddress.verify(tx_hash, signature, sender)
+        self._store(key, valid)
+        return valid
+    
+    def contains(self, tx_hash: str, signature: str, sender: str) -> bool:
+        """Verdict déjà connu (sans compter de succès ni d'échec)"""
+        return VerifiedSignatureCache.key(tx_hash, signature, sender) in self._verdicts
+    
+    def add(self, tx_hash: str, signature: str, sender: str, valid: bool = True):
+        """Verdict obtenu ailleurs (processus de vérification)"""
+        if not QuantumAddress.is_legacy_address(sender):
+            self._store(VerifiedSignatureCache.key(tx_hash, signature, sender), valid)
+    
+    def _store(self, key: bytes, valid: bool):
+        with self.lock:
+            self._verdicts[key] = valid
+            self._verdicts.move_to_end(key)
+            while len(self._verdicts) > self.max_entries:
+                self._verdicts.popitem(last=False)
+                self.evictions += 1
+    
+    def stats(self) -> Dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._verdicts),
+                'max_entries': self.max_entries,
+                'bytes': len(self._verdicts) * VerifiedSignatureCache.ENTRY_SIZE,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
+
+SIGNATURE_CACHE = VerifiedSignatureCache()
+
+def typed_field(data: Dict, name: str, types: tuple, *default):
+    """Champ d'un objet reçu (JSON), refusé s'il manque ou n'a pas le bon type
+    
+    Un booléen n'est pas accepté comme nombre et les nombres doivent être finis
+    (NaN et inf sont valides en JSON Python mais faussent les soldes).
+    Lève ValueError: l'objet est alors refusé comme mal formé.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Objet attendu')
+    if name not in data:
+        if default:
+            return default[0]
+        raise ValueError(f'Champ manquant: {name}')
+    value = data[name]
+    if value is None and type(None) in types:
+        return value
+    if isinstance(value, bool) or not isinstance(value, types):
+        raise ValueError(f'Type invalide pour le champ {name}')
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f'Valeur non finie pour le champ {name}')
+    return value
 
 class Transaction:
+    # Champs couverts par le hash: les modifier invalide le hash mis en cache
+    HASHED_FIELDS = frozenset(('sender', 'recipient', 'amount', 'fee', 'nonce', 'timestamp'))
+    # Champs couverts par la feuille de Merkle (le hash + la signature et le type)
+    LEAF_FIELDS = HASHED_FIELDS | {'signature', 'tx_type'}
+    
+    __slots__ = ('sender', 'recipient', 'amount', 'fee', 'nonce', 'timestamp',
+                 'signature', 'tx_type', '_hash', '_payload', '_leaf_hash')
+    
     def __init__(self, sender: str, recipient: str, amount: float, 
                  fee: float = 0.01, nonce: int = 0, tx_type: str = "TRANSFER"):
+        self._hash = None
+        self._payload = None
+        self._leaf_hash = None
         self.sender = sender
         self.recipient = recipient
         self.amount = amount
@@ -96,14 +643,40 @@ class Transaction:
         self.signature = None
         self.tx_type = tx_type
     
-    def is_expired(self, max_age: int = TRANSACTION_MAX_AGE) -> bool:
-        """PROTECTION 7: Vérifie si la transaction est expirée (attaque de rejeu)"""
-        age = time.time() - self.timestamp
+    def is_expired(self, max_age: int = TRANSACTION_MAX_AGE, now: float = None) -> bool:
+        """PROTECTION 7: Vérifie si la transaction est expirée (attaque de rejeu)
+        
+        now permet de juger une transaction historique à la date de son bloc.
+        """
+        age = (time.time() if now is None else now) - self.timestamp
         return age > max_age  # TRANSFER, VALIDATOR_REWARD, etc.
     
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in Transaction.LEAF_FIELDS:
+            object.__setattr__(self, '_leaf_hash', None)
+            if name in Transaction.HASHED_FIELDS:
+                object.__setattr__(self, '_hash', None)
+                object.__setattr__(self, '_payload', None)
+    
+    def get_payload(self) -> bytes:
+        """Sérialisation canonique signée par l'expéditeur (calculée une seule fois)"""
+        if self._payload is None:
+            data = f"{self.sender}{self.recipient}{self.amount}{self.fee}{self.nonce}{self.timestamp}"
+            self._payload = data.encode()
+        return self._payload
+    
     def get_hash(self) -> str:
-        data = f"{self.sender}{self.recipient}{self.amount}{self.fee}{self.nonce}{self.timestamp}"
-        return hashlib.sha3_256(data.encode()).hexdigest()
+        if self._hash is None:
+            self._hash = hashlib.sha3_256(self.get_payload()).hexdigest()
+        return self._hash
+    
+    def get_leaf_hash(self) -> str:
+        """Feuille de l'arbre de Merkle du bloc: engage aussi la signature et le type"""
+        if self._leaf_hash is None:
+            data = f"{self.get_hash()}{self.signature}{self.tx_type}"
+            self._leaf_hash = hashlib.sha3_256(b'\x00' + data.encode()).hexdigest()
+        return self._leaf_hash
     
     def sign(self, wallet: QuantumAddress):
         if wallet.address != self.sender:
@@ -111,20 +684,14 @@ class Transaction:
         tx_hash = self.get_hash()
         self.signature = wallet.sign(tx_hash)
     
-    def is_valid(self) -> bool:
+    def is_legacy_migration(self) -> bool:
+        """Transfert sans frais d'une ancienne adresse vers son successeur Qx (LEGACY_MIGRATIONS)"""
+        return self.fee == 0 and LEGACY_MIGRATIONS.get(self.sender) == self.recipient
+    
+    def is_valid(self, now: float = None) -> bool:
         if self.sender in ["SYSTEM"]:
             return True
         
-        # PROTECTION 2: Validation stricte de la signature
-        if self.signature is None or len(self.signature) != 128:
-            return False
-        
-        # Vérifier que la signature est au format hexadécimal valide
-        try:
-            int(self.signature, 16)
-        except ValueError:
-            return False
-        
         # PROTECTION 11: Vérifier que les montants sont valides
         if self.amount <= 0:
             return False
@@ -132,10 +699,16 @@ class Transaction:
             return False
         
         # PROTECTION 7: Vérifier que la transaction n'est pas expirée (attaque de rejeu)
-        if self.is_expired():
+        if self.is_expired(now=now):
             return False
         
-        return True
+        # PROTECTION 2: Vérification de la signature (en dernier: c'est le contrôle coûteux)
+        if not isinstance(self.signature, str):
+            return False
+        if QuantumAddress.is_legacy_address(self.sender) and not (
+                self.timestamp < LEGACY_SIGNATURES_CUTOFF or self.is_legacy_migration()):
+            return False
+        return SIGNATURE_CACHE.verify(self.get_hash(), self.signature, self.sender)
     
     def to_dict(self) -> Dict:
         return {
@@ -151,30 +724,119 @@ class Transaction:
     
     @staticmethod
     def from_dict(data: Dict) -> 'Transaction':
+        number = (int, float)
         tx = Transaction(
-            data['sender'],
-            data['recipient'],
-            data['amount'],
-            data.get('fee', 0.01),
-            data.get('nonce', 0),
-            data.get('tx_type', 'TRANSFER')
+            typed_field(data, 'sender', (str,)),
+            typed_field(data, 'recipient', (str,)),
+            typed_field(data, 'amount', number),
+            typed_field(data, 'fee', number, 0.01),
+            typed_field(data, 'nonce', (int,), 0),
+            typed_field(data, 'tx_type', (str,), 'TRANSFER')
         )
-        tx.timestamp = data['timestamp']
-        tx.signature = data.get('signature')
+        tx.timestamp = typed_field(data, 'timestamp', number)
+        tx.signature = typed_field(data, 'signature', (str, type(None)), None)
         return tx
 
+def merkle_parent(left: str, right: str) -> str:
+    """Nœud interne de l'arbre de Merkle (préfixe 0x01, les feuilles utilisent 0x00)"""
+    return hashlib.sha3_256(b'\x01' + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+def build_merkle_levels(leaves: List[str]) -> List[List[str]]:
+    """Construit les niveaux de l'arbre, des feuilles jusqu'à la racine
+    
+    Un nœud sans voisin est remonté tel quel au niveau supérieur (pas de
+    duplication), ce qui évite que deux listes de transactions différentes
+    produisent la même racine.
+    """
+    if not leaves:
+        return [[hashlib.sha3_256(b'').hexdigest()]]
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        current = levels[-1]
+        parents = [merkle_parent(current[i], current[i + 1]) for i in range(0, len(current) - 1, 2)]
+        if len(current) % 2 == 1:
+            parents.append(current[-1])
+        levels.append(parents)
+    return levels
+
+def verify_merkle_proof(leaf_hash: str, proof: List[List[str]], merkle_root: str) -> bool:
+    """Vérifie une preuve d'inclusion [[côté, hash_voisin], ...] produite par Block.get_merkle_proof"""
+    current = leaf_hash
+    for side, sibling in proof:
+        if side == 'L':
+            current = merkle_parent(sibling, current)
+        elif side == 'R':
+            current = merkle_parent(current, sibling)
+        else:
+            return False
+    return current == merkle_root
+
 class Block:
     def __init__(self, index: int, transactions: List[Transaction], 
-                 previous_hash: str, validator: str, stake: float):
+                 previous_hash: str, validator: str, stake: float,
+                 version: int = BLOCK_VERSION):
         self.index = index
+        self.version = version
         self.timestamp = time.time()
         self.transactions = transactions
         self.previous_hash = previous_hash
         self.validator = validator
         self.stake = stake
+        self._merkle_levels = None  # Les transactions d'un bloc ne changent plus après création
+        self.merkle_root = self.compute_merkle_root() if version >= BLOCK_VERSION else None
         self.hash = self.calculate_hash()
     
+    def compute_merkle_root(self) -> str:
+        if self._merkle_levels is None:
+            self._merkle_levels = build_merkle_levels([tx.get_leaf_hash() for tx in self.transactions])
+        return self._merkle_levels[-1][0]
+    
+    def has_valid_merkle_root(self) -> bool:
+        """Vérifie que la racine annoncée correspond aux transactions (blocs version 2)"""
+        if self.version < BLOCK_VERSION:
+            return True  # Le hash legacy couvre déjà les transactions
+        return self.merkle_root == self.compute_merkle_root()
+    
+    def get_merkle_proof(self, tx_hash: str) -> Optional[List[List[str]]]:
+        """Preuve d'inclusion d'une transaction: liste de [côté du voisin, hash du voisin]"""
+        if self.version < BLOCK_VERSION:
+            return None
+        position = next((i for i, tx in enumerate(self.transactions) if tx.get_hash() == tx_hash), None)
+        if position is None:
+            return None
+        self.compute_merkle_root()
+        proof = []
+        for level in self._merkle_levels[:-1]:
+            sibling = position ^ 1
+            if sibling < len(level):
+                proof.append(['L' if sibling < position else 'R', level[sibling]])
+            position //= 2
+        return proof
+    
+    def get_header(self) -> Dict:
+        """En-tête du bloc: tout ce qui est couvert par le hash, sauf les transactions"""
+        return {
+            'version': self.version,
+            'index': self.index,
+            'timestamp': self.timestamp,
+            'previous_hash': self.previous_hash,
+            'validator': self.validator,
+            'stake': self.stake,
+            'merkle_root': self.merkle_root
+        }
+    
+    @staticmethod
+    def hash_header(header: Dict) -> str:
+        """Hash d'un en-tête version 2 (permet de vérifier un en-tête reçu sans le bloc)"""
+        fields = {key: header[key] for key in
+                  ('version', 'index', 'timestamp', 'previous_hash', 'validator', 'stake', 'merkle_root')}
+        return hashlib.sha3_256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+    
     def calculate_hash(self) -> str:
+        if self.version >= BLOCK_VERSION:
+            # Taille constante, indépendante du nombre de transactions
+            return Block.hash_header(self.get_header())
+        
         block_data = {
             'index': self.index,
             'timestamp': self.timestamp,
@@ -186,8 +848,9 @@ class Block:
         return hashlib.sha3_256(json.dumps(block_data, sort_keys=True).encode()).hexdigest()
     
     def to_dict(self) -> Dict:
-        return {
+        data = {
             'index': self.index,
+            'version': self.version,
             'timestamp': self.timestamp,
             'hash': self.hash,
             'previous_hash': self.previous_hash,
@@ -195,154 +858,1247 @@ class Block:
             'stake': self.stake,
             'transactions': [tx.to_dict() for tx in self.transactions]
         }
+        if self.version >= BLOCK_VERSION:
+            data['merkle_root'] = self.merkle_root
+        return data
     
     @staticmethod
     def from_dict(data: Dict) -> 'Block':
-        transactions = [Transaction.from_dict(tx) for tx in data['transactions']]
+        number = (int, float)
+        transactions = [Transaction.from_dict(tx) for tx in typed_field(data, 'transactions', (list,))]
         block = Block(
-            data['index'],
+            typed_field(data, 'index', (int,)),
             transactions,
-            data['previous_hash'],
-            data['validator'],
-            data['stake']
+            typed_field(data, 'previous_hash', (str,)),
+            typed_field(data, 'validator', (str,)),
+            typed_field(data, 'stake', number),
+            # Les blocs sans version ont été produits avant l'introduction de Merkle
+            typed_field(data, 'version', (int,), LEGACY_BLOCK_VERSION)
         )
-        block.timestamp = data['timestamp']
-        block.hash = data['hash']
+        block.timestamp = typed_field(data, 'timestamp', number)
+        block.hash = typed_field(data, 'hash', (str,))
+        if block.version >= BLOCK_VERSION:
+            block.merkle_root = typed_field(data, 'merkle_root', (str, type(None)), None)
         return block
 
-class SimplePoSBlockchain:
-    def __init__(self, min_stake: float = 100, treasury_address: str = None):
-        self.chain: List[Block] = []
-        self.pending_transactions: List[Transaction] = []
-        self.validators: Dict[str, float] = {}
-        self.balances: Dict[str, float] = {}
-        self.last_activity: Dict[str, float] = {}  # Suivi de la dernière activité
-        self.min_stake = min_stake
-        self.block_reward = 10
-        self.transaction_fees_pool = 0
-        self.treasury_address = treasury_address  # Adresse du trésor
-        self.inactivity_threshold = INACTIVITY_THRESHOLD
-        
-        # PROTECTION 1: Suivi des nonces pour prévenir les doubles dépenses
-        self.nonces_used: Dict[str, int] = {}  # {address: dernier_nonce_utilisé}
-        
-        # PROTECTION 3: Limites anti-spam
-        self.max_pending_per_address = 10  # Maximum de transactions en attente par adresse
-        self.max_block_size = 100  # Maximum de transactions par bloc
-        
-        # PROTECTION 6: Suivi des transactions pour vérification de cohérence
-        self.transaction_history: List[str] = []  # Hash des transactions traitées
-        
-        self.create_genesis_block()
+class TransactionHistory:
+    """PROTECTION 6: Historique des transactions traitées (détection des rejeux)
     
-    def create_genesis_block(self):
-        genesis_tx = Transaction("SYSTEM", "GENESIS", 0)
-        genesis_block = Block(0, [genesis_tx], "0", "SYSTEM", 0)
-        self.chain.append(genesis_block)
+    Les hash sont stockés dans un dictionnaire {hash: timestamp} pour un test
+    d'appartenance en O(1). Une transaction plus ancienne que max_age est de toute
+    façon rejetée par is_expired(), donc en mode élagage les entrées expirées sont
+    retirées au fil des ajouts: la mémoire reste bornée par le volume de
+    transactions sur la fenêtre TRANSACTION_MAX_AGE.
+    """
     
-    def get_latest_block(self) -> Block:
-        return self.chain[-1]
+    def __init__(self, max_age: int = TRANSACTION_MAX_AGE, prune_expired: bool = True):
+        self.max_age = max_age
+        self.prune_expired = prune_expired
+        self._timestamps: Dict[str, float] = {}
+        self._expiry_heap: List[tuple] = []  # (timestamp, hash) le plus ancien en tête
     
-    def update_activity(self, address: str):
-        """Met à jour la dernière activité d'une adresse"""
-        self.last_activity[address] = time.time()
+    def __contains__(self, tx_hash: str) -> bool:
+        return tx_hash in self._timestamps
     
-    def get_inactive_time(self, address: str) -> float:
-        """Retourne le temps d'inactivité en secondes"""
-        if address not in self.last_activity:
-            # Si jamais d'activité, on considère la création du wallet
+    def __len__(self) -> int:
+        return len(self._timestamps)
+    
+    def add(self, tx_hash: str, timestamp: float):
+        if tx_hash in self._timestamps:
+            return
+        self._timestamps[tx_hash] = timestamp
+        if self.prune_expired:
+            heapq.heappush(self._expiry_heap, (timestamp, tx_hash))
+            self.prune()
+    
+    def prune(self, now: float = None) -> int:
+        """Retire les transactions qui ne peuvent plus être rejouées (expirées)"""
+        if not self.prune_expired:
             return 0
-        return time.time() - self.last_activity[address]
+        cutoff = (now if now is not None else time.time()) - self.max_age
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] < cutoff:
+            _, tx_hash = heapq.heappop(self._expiry_heap)
+            del self._timestamps[tx_hash]
+            removed += 1
+        return removed
     
-    def register_validator(self, address: str, stake: float) -> bool:
-        if stake < self.min_stake:
-            return False
-        if self.get_balance(address) < stake:
+    def items(self):
+        return self._timestamps.items()
+    
+    def clear(self):
+        self._timestamps.clear()
+        self._expiry_heap.clear()
+
+class Mempool:
+    """Pool des transactions en attente, indexée par hash et par expéditeur
+    
+    - _transactions: {hash: tx} dans l'ordre d'arrivée (doublons détectés en O(1))
+    - _by_sender: {adresse: [(nonce, seq, hash), ...]} trié par nonce
+    - _heads: tas des premières transactions de chaque expéditeur, par frais décroissants
+    - fee_total: somme des frais en attente, maintenue à chaque ajout/retrait
+    
+    Le tas _heads est invalidé paresseusement: une entrée dont la transaction a
+    quitté la pool ou n'est plus en tête de son expéditeur est ignorée au dépilage.
+    """
+    
+    def __init__(self):
+        self._transactions: Dict[str, Transaction] = {}
+        self._by_sender: Dict[str, List[tuple]] = {}
+        self._heads: List[tuple] = []
+        self._seq = itertools.count()
+        self.fee_total = 0
+    
+    def __len__(self) -> int:
+        return len(self._transactions)
+    
+    def __iter__(self):
+        return iter(self._transactions.values())
+    
+    def __contains__(self, tx_hash: str) -> bool:
+        return tx_hash in self._transactions
+    
+    def get(self, tx_hash: str) -> Optional[Transaction]:
+        return self._transactions.get(tx_hash)
+    
+    def add(self, tx: Transaction, tx_hash: str = None) -> bool:
+        """Ajoute une transaction; retourne False si elle est déjà présente"""
+        tx_hash = tx_hash or tx.get_hash()
+        if tx_hash in self._transactions:
             return False
-        
-        self.balances[address] = self.get_balance(address) - stake
-        self.validators[address] = self.validators.get(address, 0) + stake
-        self.update_activity(address)  # L'enregistrement compte comme activité
+        self._transactions[tx_hash] = tx
+        queue = self._by_sender.setdefault(tx.sender, [])
+        entry = (tx.nonce, next(self._seq), tx_hash)
+        bisect.insort(queue, entry)
+        if queue[0] is entry:
+            self._push_head(entry)
+        if tx.sender not in ["SYSTEM"]:
+            self.fee_total += tx.fee
         return True
     
-    def select_validator(self) -> Optional[str]:
-        if not self.validators:
-            return None
+    def remove_many(self, tx_hashes) -> int:
+        """Retire les transactions d'un bloc; les hash absents sont ignorés"""
+        removed = 0
+        for tx_hash in tx_hashes:
+            tx = self._transactions.pop(tx_hash, None)
+            if tx is None:
+                continue
+            queue = self._by_sender[tx.sender]
+            for i, entry in enumerate(queue):
+                if entry[2] == tx_hash:
+                    del queue[i]
+                    break
+            if not queue:
+                del self._by_sender[tx.sender]
+            elif i == 0:
+                self._push_head(queue[0])
+            if tx.sender not in ["SYSTEM"]:
+                self.fee_total -= tx.fee
+            removed += 1
+        if not self._transactions:
+            self.fee_total = 0  # Éviter l'accumulation d'erreurs d'arrondi
+        return removed
+    
+    def _head_entry(self, entry: tuple) -> tuple:
+        """Entrée du tas de priorité: SYSTEM d'abord, puis frais décroissants, puis ordre d'arrivée"""
+        tx = self._transactions[entry[2]]
+        priority = float('-inf') if tx.sender in ["SYSTEM"] else -tx.fee
+        return (priority, entry[1], entry[2])
+    
+    def _push_head(self, entry: tuple):
+        heapq.heappush(self._heads, self._head_entry(entry))
         
-        total_stake = sum(self.validators.values())
-        if total_stake == 0:
-            return None
+        # Compacter le tas si les entrées périmées s'accumulent
+        if len(self._heads) > 2 * len(self._by_sender) + 64:
+            self._heads = [self._head_entry(queue[0]) for queue in self._by_sender.values()]
+            heapq.heapify(self._heads)
+    
+    def select(self, limit: int, accept) -> List[Transaction]:
+        """Sélectionne jusqu'à `limit` transactions par frais décroissants
         
-        rand_val = random.uniform(0, total_stake)
-        cumulative = 0
+        L'ordre des nonces de chaque expéditeur est respecté: seule la tête de
+        chaque file est candidate, et la suivante le devient une fois la tête
+        retenue. `accept(tx)` décide de l'inclusion (validité, solde cumulé); un
+        refus écarte l'expéditeur pour le reste du bloc. Coût O(k log n) sans
+        retrier la pool. La pool n'est pas modifiée.
+        """
+        chosen: List[Transaction] = []
+        popped: List[tuple] = []
+        cursor: Dict[str, int] = {}  # position courante dans la file de chaque expéditeur
         
-        for address, stake in self.validators.items():
-            cumulative += stake
-            if rand_val <= cumulative:
-                return address
+        while self._heads and len(chosen) < limit:
+            head = heapq.heappop(self._heads)
+            tx = self._transactions.get(head[2])
+            if tx is None:
+                continue  # Transaction retirée de la pool
+            queue = self._by_sender[tx.sender]
+            position = cursor.get(tx.sender, 0)
+            if position >= len(queue) or queue[position][2] != head[2]:
+                continue  # Entrée périmée ou en double
+            popped.append(head)
+            
+            if not accept(tx):
+                cursor[tx.sender] = len(queue)
+                continue
+            
+            chosen.append(tx)
+            cursor[tx.sender] = position + 1
+            if position + 1 < len(queue):
+                heapq.heappush(self._heads, self._head_entry(queue[position + 1]))
         
-        return list(self.validators.keys())[0]
+        # Remettre les têtes dépilées; celles incluses dans le bloc deviendront périmées
+        for head in popped:
+            heapq.heappush(self._heads, head)
+        return chosen
     
-    def get_next_expected_nonce(self, address: str) -> int:
-        """Retourne le prochain nonce attendu pour une adresse"""
-        # Calculer le nonce attendu en comptant les transactions dans la blockchain
-        expected_nonce = 0
-        for block in self.chain:
-            for tx in block.transactions:
-                if tx.sender == address and tx.sender not in ["SYSTEM"]:
-                    expected_nonce = max(expected_nonce, tx.nonce + 1)
-        # Ajouter les transactions en attente
-        for tx in self.pending_transactions:
-            if tx.sender == address and tx.sender not in ["SYSTEM"]:
-                expected_nonce = max(expected_nonce, tx.nonce + 1)
-        return expected_nonce
+    def count_for(self, sender: str) -> int:
+        return len(self._by_sender.get(sender, ()))
     
-    def add_transaction(self, tx: Transaction) -> bool:
-        if not tx.is_valid():
-            return False
-        
-        if tx.sender in ["SYSTEM"]:
-            self.pending_transactions.append(tx)
-            return True
-        
-        tx_hash = tx.get_hash()
+    def max_nonce(self, sender: str) -> Optional[int]:
+        queue = self._by_sender.get(sender)
+        return queue[-1][0] if queue else None
+    
+    def for_sender(self, sender: str) -> List[Transaction]:
+        """Transactions en attente d'un expéditeur, triées par nonce"""
+        return [self._transactions[entry[2]] for entry in self._by_sender.get(sender, ())]
+    
+    def clear(self):
+        self._transactions.clear()
+        self._by_sender.clear()
+        self._heads.clear()
+        self.fee_total = 0
+
+# ============================================================================
+# STOCKAGE PERSISTANT
+# ============================================================================
+
+class BlockFiles:
+    """Index et segments ouverts d'une génération de ChainStore
+    
+    Les lectures (seek puis read sur des descripteurs partagés) et les ajouts
+    du fil d'écriture passent par un même verrou: un lecteur ne déplace jamais
+    la position d'écriture. Les segments ouverts le restent. Une réorganisation
+    (ChainStore.reset) commence une nouvelle génération: les fichiers de
+    l'ancienne sont supprimés mais restent lisibles (systèmes POSIX) par les
+    vues publiées avant elle, tant que l'une d'elles les référence.
+    """
+    
+    INDEX_RECORD = struct.Struct('<IQI')  # segment, offset, longueur
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.lock = threading.RLock()
+        self.index = open(os.path.join(directory, 'blocks.idx'), 'a+b')
+        self.segments: Dict[int, object] = {}
+        self.height = 0
+    
+    def segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f'blocks-{number:06d}.log')
+    
+    def segment(self, number: int):
+        with self.lock:
+            handle = self.segments.get(number)
+            if handle is None:
+                handle = self.segments[number] = open(self.segment_path(number), 'a+b')
+            return handle
+    
+    def read_record(self, height: int) -> tuple:
+        size = self.INDEX_RECORD.size
+        with self.lock:
+            self.index.seek(height * size)
+            return self.INDEX_RECORD.unpack(self.index.read(size))
+    
+    def read_block(self, height: int) -> 'Block':
+        if height < 0 or height >= self.height:
+            raise IndexError(height)
+        with self.lock:
+            segment, offset, length = self.read_record(height)
+            handle = self.segment(segment)
+            handle.seek(offset)
+            data = handle.read(length)
+        return Block.from_dict(json.loads(data))
+    
+    def open_segments(self, last: int):
+        """Ouvre les segments 0..last encore sur disque (avant leur suppression)"""
+        for number in range(last + 1):
+            if os.path.exists(self.segment_path(number)):
+                self.segment(number)
+    
+    def close(self):
+        with self.lock:
+            for handle in self.segments.values():
+                handle.close()
+            self.index.close()
+
+class ChainStore:
+    """Stockage des blocs sur disque: journal segmenté en ajout seul + index des offsets
+    
+    Fichiers dans `directory`:
+    - blocks-NNNNNN.log: segments NDJSON, un bloc sérialisé par ligne
+    - blocks.idx: un enregistrement de taille fixe par hauteur (segment, offset, longueur)
+    - snapshot-HHHHHHHHHHHH.json: état complet de la blockchain à une hauteur donnée
+    
+    Les écritures sont poussées au système à chaque bloc mais fsync n'est appelé
+    que tous les `fsync_every` blocs ou toutes les `fsync_interval` secondes.
+    Les fichiers ouverts sont ceux de la génération courante (files, BlockFiles).
+    """
+    
+    INDEX_RECORD = BlockFiles.INDEX_RECORD
+    
+    def __init__(self, directory: str, segment_size: int = 64 * 1024 * 1024,
+                 fsync_every: int = 16, fsync_interval: float = 1.0,
+                 snapshot_interval: int = 1000, snapshots_kept: int = 2):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.snapshot_interval = snapshot_interval
+        self.snapshots_kept = snapshots_kept
+        os.makedirs(directory, exist_ok=True)
         
-        # PROTECTION 7: Vérifier que la transaction n'est pas expirée (attaque de rejeu)
-        if tx.is_expired():
-            return False
+        self.files = BlockFiles(directory)
+        self._segment_number = 0
+        self._unsynced = 0
+        self._last_fsync = time.time()
+        self._recover()
+    
+    def _recover(self):
+        """Écarte les écritures incomplètes laissées par un arrêt brutal"""
+        files = self.files
+        record_size = self.INDEX_RECORD.size
+        files.index.seek(0, os.SEEK_END)
+        height = files.index.tell() // record_size
         
-        # PROTECTION 1: Vérification du nonce pour prévenir les doubles dépenses
-        expected_nonce = self.get_next_expected_nonce(tx.sender)
-        if tx.nonce < expected_nonce:
-            # Nonce déjà utilisé - tentative de double dépense
-            return False
+        # Un enregistrement d'index doit pointer vers un bloc entièrement écrit
+        while height > 0:
+            segment, offset, length = files.read_record(height - 1)
+            path = files.segment_path(segment)
+            if os.path.exists(path) and os.path.getsize(path) >= offset + length:
+                break
+            height -= 1
+        files.index.truncate(height * record_size)
         
-        # PROTECTION 6: Vérifier que la transaction n'a pas déjà été traitée (dans l'historique)
-        if tx_hash in self.transaction_history:
-            return False  # Transaction déjà traitée - attaque de rejeu
+        if height > 0:
+            segment, offset, length = files.read_record(height - 1)
+            self._segment_number = segment
+            end = offset + length
+        else:
+            self._segment_number = 0
+            end = 0
         
-        # PROTECTION 3: Limite anti-spam - vérifier le nombre de transactions en attente par adresse
-        pending_count = sum(1 for t in self.pending_transactions if t.sender == tx.sender)
-        if pending_count >= self.max_pending_per_address:
-            # Trop de transactions en attente pour cette adresse
-            return False
+        # Les octets après le dernier bloc indexé sont une écriture interrompue
+        files.segment(self._segment_number).truncate(end)
+        files.height = height
+    
+    def __len__(self) -> int:
+        return self.files.height
+    
+    def append_block(self, block: 'Block'):
+        line = (json.dumps(block.to_dict(), sort_keys=True) + '\n').encode()
+        files = self.files
+        with files.lock:
+            segment = files.segment(self._segment_number)
+            segment.seek(0, os.SEEK_END)
+            offset = segment.tell()
+            if offset > 0 and offset + len(line) > self.segment_size:
+                self._sync()
+                self._segment_number += 1
+                segment = files.segment(self._segment_number)
+                offset = 0
+            
+            segment.write(line)
+            segment.flush()
+            files.index.seek(0, os.SEEK_END)
+            files.index.write(self.INDEX_RECORD.pack(self._segment_number, offset, len(line)))
+            files.index.flush()
+            files.height += 1
+            
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.time() - self._last_fsync >= self.fsync_interval:
+                self._sync()
+    
+    def read_block(self, height: int) -> 'Block':
+        return self.files.read_block(height)
+    
+    def _sync(self):
+        with self.files.lock:
+            if self._unsynced:
+                os.fsync(self.files.segment(self._segment_number).fileno())
+                os.fsync(self.files.index.fileno())
+                self._unsynced = 0
+            self._last_fsync = time.time()
+    
+    def flush(self):
+        self._sync()
+    
+    def save_snapshot(self, state: Dict):
+        """Écrit un snapshot de façon atomique (fichier temporaire puis renommage)"""
+        self._sync()
+        path = os.path.join(self.directory, f"snapshot-{state['height']:012d}.json")
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
         
-        # Vérifier que la transaction n'est pas déjà dans la pool (doublon)
-        for existing_tx in self.pending_transactions:
-            if existing_tx.get_hash() == tx_hash:
-                return False  # Transaction déjà présente
+        for old_path in self._snapshot_paths()[:-self.snapshots_kept]:
+            os.remove(old_path)
+    
+    def _snapshot_paths(self) -> List[str]:
+        names = sorted(n for n in os.listdir(self.directory)
+                       if n.startswith('snapshot-') and n.endswith('.json'))
+        return [os.path.join(self.directory, n) for n in names]
+    
+    def load_latest_snapshot(self) -> Optional[Dict]:
+        """Dernier snapshot cohérent avec les blocs présents sur disque"""
+        for path in reversed(self._snapshot_paths()):
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+                height = state['height']
+                if 0 < height <= len(self) and self.read_block(height - 1).hash == state['tip_hash']:
+                    return state
+            except (OSError, ValueError, KeyError, IndexError):
+                continue
+        return None
+    
+    def reset(self):
+        """Efface blocs et snapshots (remplacement complet de la chaîne)
         
-        sender_balance = self.get_balance(tx.sender)
+        Les fichiers de la génération remplacée restent ouverts: les vues
+        (StoredChain) créées avant le remplacement continuent de les lire.
+        """
+        with self.files.lock:
+            self._sync()
+            self.files.open_segments(self._segment_number)
+            for name in os.listdir(self.directory):
+                if name.startswith(('blocks-', 'snapshot-')) or name == 'blocks.idx':
+                    os.remove(os.path.join(self.directory, name))
+        self.files = BlockFiles(self.directory)
+        self._unsynced = 0
+        self._recover()
+    
+    def close(self):
+        self._sync()
+        self.files.close()
+
+class StoredChain:
+    """Vue de type liste sur les blocs d'un ChainStore
+    
+    Les blocs sont lus depuis le disque à la demande; les plus récents restent
+    en cache car ce sont ceux que la validation et l'API consultent le plus.
+    La vue lit la génération de fichiers du stockage à sa création: après une
+    réorganisation, les instantanés qui la référencent lisent toujours leurs
+    blocs. Le cache est partagé par les threads de lecture (verrou).
+    """
+    
+    def __init__(self, store: ChainStore, cache_size: int = 256):
+        self.store = store
+        self.files = store.files
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[int, Block]' = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return self.files.height
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        with self.lock:
+            block = self._cache.get(index)
+            if block is not None:
+                self._cache.move_to_end(index)
+                return block
+        block = self.files.read_block(index)
+        self._remember(index, block)
+        return block
+    
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+    
+    def _remember(self, index: int, block: Block):
+        with self.lock:
+            self._cache[index] = block
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def append(self, block: Block):
+        self.store.append_block(block)
+        self._remember(len(self) - 1, block)
+
+class BranchChain:
+    """Vue de type liste: les height premiers blocs d'une chaîne, suivis de blocs en mémoire
+    
+    Sert à valider une branche concurrente (réorganisation) sans copier ni
+    modifier la chaîne locale, qu'elle soit en mémoire ou sur disque.
+    """
+    
+    def __init__(self, base, height: int):
+        self.base = base
+        self.height = height
+        self.blocks: List[Block] = []
+    
+    def __len__(self) -> int:
+        return self.height + len(self.blocks)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.base[index] if index < self.height else self.blocks[index - self.height]
+    
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+    
+    def append(self, block: Block):
+        self.blocks.append(block)
+
+# ============================================================================
+# ÉTAT DES COMPTES
+# ============================================================================
+
+class MemoryState:
+    """État des comptes en mémoire (dictionnaires Python), sauvegardé dans les snapshots"""
+    
+    persistent = False
+    
+    def __init__(self):
+        self.balances: Dict[str, float] = {}
+        self.validators: Dict[str, float] = {}
+        self.last_activity: Dict[str, float] = {}
+        self.nonces_used: Dict[str, int] = {}
+        self.height = 0
+    
+    def batch(self):
+        return nullcontext()
+    
+    def reset(self):
+        for mapping in (self.balances, self.validators, self.last_activity, self.nonces_used):
+            mapping.clear()
+        self.height = 0
+    
+    def top_balances(self, limit: int) -> List[tuple]:
+        return heapq.nlargest(limit, self.balances.items(), key=lambda item: item[1])
+    
+    def validators_by_stake(self, limit: int) -> List[tuple]:
+        return heapq.nlargest(limit, self.validators.items(), key=lambda item: item[1])
+    
+    def inactive_accounts(self, before: float, limit: int) -> List[tuple]:
+        inactive = ((a, t) for a, t in self.last_activity.items() if t < before)
+        return heapq.nsmallest(limit, inactive, key=lambda item: item[1])
+    
+    def temporary_balances(self, name: str) -> Dict[str, float]:
+        return {}
+    
+    def balance_mismatches(self, replayed: Dict[str, float], tolerance: float) -> set:
+        return {
+            address for address in set(replayed) | set(self.balances)
+            if abs(replayed.get(address, 0) - self.balances.get(address, 0)) > tolerance
+        }
+
+class StateOverlay:
+    """Surcouche copie sur écriture d'un dictionnaire d'état {adresse: valeur}
+    
+    Les lectures traversent jusqu'au dictionnaire de base tant que l'adresse
+    n'a pas été écrite; les écritures restent dans changes. La base n'est
+    modifiée que par commit(); abandonner la surcouche ne laisse aucune trace.
+    """
+    __slots__ = ('base', 'changes')
+    
+    def __init__(self, base):
+        self.base = base
+        self.changes: Dict[str, float] = {}
+    
+    def get(self, key: str, default=None):
+        if key in self.changes:
+            return self.changes[key]
+        return self.base.get(key, default)
+    
+    def __setitem__(self, key: str, value):
+        self.changes[key] = value
+    
+    def commit(self, write=None):
+        """Écrit les changements dans la base (ou via write(clé, valeur))"""
+        write = write or self.base.__setitem__
+        for key, value in self.changes.items():
+            write(key, value)
+
+class BlockOverlay:
+    """Effets provisoires d'une suite de transactions sur les soldes et les derniers nonces
+    
+    Les transactions sont appliquées une à une (les dépenses et réceptions
+    précédentes du bloc comptent pour les suivantes), en une passe O(txs).
+    Utilisé pour assembler un bloc, valider un bloc reçu et appliquer un bloc.
+    """
+    __slots__ = ('balances', 'nonces')
+    
+    def __init__(self, balances, nonces):
+        self.balances = StateOverlay(balances)
+        self.nonces = StateOverlay(nonces)
+    
+    def stage(self, tx: 'Transaction', check_nonce: bool = True, check_balance: bool = True) -> Optional[str]:
+        """Applique tx sur la surcouche; en cas de refus ('nonce' ou 'balance'), rien n'est écrit"""
+        if tx.sender not in ["SYSTEM"]:
+            last_nonce = self.nonces.get(tx.sender, -1)
+            if check_nonce and tx.nonce <= last_nonce:
+                return 'nonce'
+            cost = tx.amount + tx.fee
+            sender_balance = self.balances.get(tx.sender, 0)
+            if check_balance and sender_balance < cost:
+                return 'balance'
+            self.balances[tx.sender] = sender_balance - cost
+            if tx.nonce > last_nonce:
+                self.nonces[tx.sender] = tx.nonce
+        self.balances[tx.recipient] = self.balances.get(tx.recipient, 0) + tx.amount
+        return None
+
+class SQLiteColumnMap(MutableMapping):
+    """Dictionnaire {adresse: valeur} adossé à une colonne d'une table SQLite
+    
+    Une valeur NULL signifie que l'adresse est absente de ce dictionnaire, ce qui
+    permet de ranger plusieurs dictionnaires dans la même table de comptes.
+    """
+    
+    def __init__(self, state: 'SQLiteState', table: str, column: str):
+        self._state = state
+        self._table = table
+        self._column = column
+    
+    def _query(self, sql: str, params=()):
+        with self._state.lock:
+            return self._state.conn.execute(sql, params).fetchall()
+    
+    def __getitem__(self, address: str):
+        rows = self._query(f"SELECT {self._column} FROM {self._table} WHERE address = ?", (address,))
+        if not rows or rows[0][0] is None:
+            raise KeyError(address)
+        return rows[0][0]
+    
+    def __contains__(self, address) -> bool:
+        try:
+            self[address]
+        except KeyError:
+            return False
+        return True
+    
+    def __setitem__(self, address: str, value):
+        self._query(
+            f"INSERT INTO {self._table} (address, {self._column}) VALUES (?, ?) "
+            f"ON CONFLICT(address) DO UPDATE SET {self._column} = excluded.{self._column}",
+            (address, value)
+        )
+    
+    def __delitem__(self, address: str):
+        if address not in self:
+            raise KeyError(address)
+        self._query(f"UPDATE {self._table} SET {self._column} = NULL WHERE address = ?", (address,))
+    
+    def __iter__(self):
+        rows = self._query(f"SELECT address FROM {self._table} WHERE {self._column} IS NOT NULL")
+        return iter([row[0] for row in rows])
+    
+    def __len__(self) -> int:
+        return self._query(f"SELECT COUNT(*) FROM {self._table} WHERE {self._column} IS NOT NULL")[0][0]
+    
+    def items(self):
+        return self._query(f"SELECT address, {self._column} FROM {self._table} WHERE {self._column} IS NOT NULL")
+    
+    def values(self):
+        return [row[0] for row in self._query(f"SELECT {self._column} FROM {self._table} WHERE {self._column} IS NOT NULL")]
+    
+    def clear(self):
+        self._query(f"UPDATE {self._table} SET {self._column} = NULL")
+
+class SQLiteState:
+    """État des comptes dans une base SQLite indexée
+    
+    La mémoire du processus ne dépend plus du nombre d'adresses. Chaque bloc est
+    appliqué dans une seule transaction SQL qui enregistre aussi la hauteur
+    atteinte, de sorte qu'au redémarrage seuls les blocs suivants sont rejoués.
+    """
+    
+    persistent = True
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS accounts (
+            address TEXT PRIMARY KEY,
+            balance REAL,
+            last_activity REAL,
+            last_nonce INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_accounts_balance ON accounts(balance);
+        CREATE INDEX IF NOT EXISTS idx_accounts_last_activity ON accounts(last_activity);
+        CREATE TABLE IF NOT EXISTS validators (
+            address TEXT PRIMARY KEY,
+            stake REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_validators_stake ON validators(stake);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+    
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA temp_store=FILE')
+        self.conn.executescript(self.SCHEMA)
+        self._batch_depth = 0
+        
+        self.balances = SQLiteColumnMap(self, 'accounts', 'balance')
+        self.last_activity = SQLiteColumnMap(self, 'accounts', 'last_activity')
+        self.nonces_used = SQLiteColumnMap(self, 'accounts', 'last_nonce')
+        self.validators = SQLiteColumnMap(self, 'validators', 'stake')
+    
+    @contextmanager
+    def batch(self):
+        """Regroupe les écritures dans une transaction (annulée en cas d'erreur)"""
+        with self.lock:
+            if self._batch_depth == 0:
+                self.conn.execute('BEGIN')
+            self._batch_depth += 1
+            try:
+                yield
+            except BaseException:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.conn.execute('ROLLBACK')
+                raise
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.conn.execute('COMMIT')
+    
+    @property
+    def height(self) -> int:
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'height'").fetchone()
+        return int(row[0]) if row else 0
+    
+    @height.setter
+    def height(self, value: int):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('height', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (str(value),)
+            )
+    
+    def reset(self):
+        with self.batch():
+            self.conn.execute('DELETE FROM accounts')
+            self.conn.execute('DELETE FROM validators')
+            self.conn.execute('DELETE FROM meta')
+    
+    def top_balances(self, limit: int) -> List[tuple]:
+        with self.lock:
+            return self.conn.execute(
+                'SELECT address, balance FROM accounts WHERE balance IS NOT NULL '
+                'ORDER BY balance DESC LIMIT ?', (limit,)
+            ).fetchall()
+    
+    def validators_by_stake(self, limit: int) -> List[tuple]:
+        with self.lock:
+            return self.conn.execute(
+                'SELECT address, stake FROM validators WHERE stake IS NOT NULL '
+                'ORDER BY stake DESC LIMIT ?', (limit,)
+            ).fetchall()
+    
+    def inactive_accounts(self, before: float, limit: int) -> List[tuple]:
+        with self.lock:
+            return self.conn.execute(
+                'SELECT address, last_activity FROM accounts WHERE last_activity < ? '
+                'ORDER BY last_activity LIMIT ?', (before, limit)
+            ).fetchall()
+    
+    def temporary_balances(self, name: str) -> SQLiteColumnMap:
+        """Soldes recalculés {adresse: solde} dans une table TEMP vide
+        
+        Les tables TEMP sont propres à la connexion, stockées dans un fichier
+        temporaire (temp_store=FILE) et jamais écrites dans la base: rejouer la
+        chaîne ne charge pas toutes les adresses en mémoire.
+        """
+        with self.lock:
+            self.conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {name} "
+                              f"(address TEXT PRIMARY KEY, balance REAL)")
+            self.conn.execute(f"DELETE FROM temp.{name}")
+        return SQLiteColumnMap(self, f"temp.{name}", 'balance')
+    
+    def balance_mismatches(self, replayed: SQLiteColumnMap, tolerance: float) -> set:
+        """Adresses dont le solde diffère de replayed (table temporaire), comparées en SQL"""
+        table = replayed._table
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT r.address FROM {table} r LEFT JOIN accounts a ON a.address = r.address "
+                f"WHERE ABS(IFNULL(r.balance, 0) - IFNULL(a.balance, 0)) > ? "
+                f"UNION "
+                f"SELECT a.address FROM accounts a LEFT JOIN {table} r ON r.address = a.address "
+                f"WHERE r.address IS NULL AND ABS(IFNULL(a.balance, 0)) > ?",
+                (tolerance, tolerance)
+            ).fetchall()
+        return {row[0] for row in rows}
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+# ============================================================================
+# VÉRIFICATION DES TRANSACTIONS PAR LOTS
+# ============================================================================
+
+def init_verification_process(legacy_cutoff: float = LEGACY_SIGNATURES_CUTOFF,
+                              migrations: Dict[str, str] = None):
+    """Processus de vérification: les verdicts sont gardés par le processus principal
+    (qui les reçoit en retour), pas en double dans chaque processus. Les règles
+    des anciennes signatures sont celles du processus principal à la création du pool."""
+    global SIGNATURE_CACHE, LEGACY_SIGNATURES_CUTOFF
+    SIGNATURE_CACHE = VerifiedSignatureCache(0)
+    LEGACY_SIGNATURES_CUTOFF = legacy_cutoff
+    LEGACY_MIGRATIONS.update(migrations or {})
+
+def verify_transaction_chunk(items: List[Tuple[Dict, Optional[float]]]) -> List[bool]:
+    """Contrôles sans état d'un morceau de lot (exécuté dans un processus de vérification)"""
+    return [Transaction.from_dict(data).is_valid(now=now) for data, now in items]
+
+class TransactionVerifier:
+    """Contrôles sans état (Transaction.is_valid) d'un lot de transactions, répartis
+    sur un pool de processus
+    
+    Un lot de moins de VERIFY_PARALLEL_MIN signatures inconnues de
+    SIGNATURE_CACHE, ou sans plus d'un processus, est vérifié sur place:
+    l'aller-retour vers les processus coûterait plus que les contrôles. Les
+    autres lots sont découpés en un morceau par processus (au moins
+    VERIFY_CHUNK_MIN transactions), pour un seul échange par processus. Le pool n'est créé qu'au premier lot qui en a
+    besoin; ses processus sont lancés par 'spawn' (sûr dans un nœud multi-thread).
+    
+    Le coût par transaction de chaque voie est mesuré (moyenne glissante):
+    tant que les contrôles restent moins chers que la sérialisation vers les
+    processus, les lots sont vérifiés sur place (adaptive=False: toujours le
+    pool au-delà du seuil).
+    """
+    
+    def __init__(self, workers: int = VERIFY_WORKERS, parallel_min: int = VERIFY_PARALLEL_MIN,
+                 adaptive: bool = True):
+        self.workers = workers
+        self.parallel_min = parallel_min
+        self.adaptive = adaptive
+        self.costs: Dict[str, Optional[float]] = {'inline': None, 'pool': None}  # Secondes par transaction
+        self.lock = threading.Lock()
+        self.pool: Optional[ProcessPoolExecutor] = None
+    
+    def verify(self, transactions: List[Transaction], now: float = None) -> List[bool]:
+        """Résultat de tx.is_valid(now) pour chaque transaction, dans l'ordre"""
+        return self._verify(transactions, [now] * len(transactions))
+    
+    def verify_blocks(self, blocks: List[Block]) -> List[List[bool]]:
+        """Transactions de plusieurs blocs, chacune jugée à la date de son bloc"""
+        transactions = [tx for block in blocks for tx in block.transactions]
+        nows = [block.timestamp for block in blocks for _ in block.transactions]
+        results = iter(self._verify(transactions, nows))
+        return [[next(results) for _ in block.transactions] for block in blocks]
+    
+    def use_pool(self, count: int) -> bool:
+        if self.workers <= 1 or count < self.parallel_min or not count:
+            return False
+        if not self.adaptive:
+            return True
+        inline, pool = self.costs['inline'], self.costs['pool']
+        if inline is None:
+            return False  # Mesurer d'abord la voie sur place
+        return pool is None or pool < inline
+    
+    def _record(self, path: str, elapsed: float, count: int):
+        cost = elapsed / count
+        previous = self.costs[path]
+        self.costs[path] = cost if previous is None else 0.8 * previous + 0.2 * cost
+    
+    def _verify(self, transactions: List[Transaction], nows: List[Optional[float]]) -> List[bool]:
+        # Seules les signatures encore inconnues du cache (ni anciennes, ni déjà
+        # vérifiées: pool locale, bloc déjà vu) coûtent: elles seules sont envoyées aux processus
+        unknown = [index for index, tx in enumerate(transactions)
+                   if isinstance(tx.signature, str) and not QuantumAddress.is_legacy_address(tx.sender)
+                   and not SIGNATURE_CACHE.contains(tx.get_hash(), tx.signature, tx.sender)]
+        results: List[Optional[bool]] = [None] * len(transactions)
+        pooled = False
+        if self.use_pool(len(unknown)):
+            started = time.perf_counter()
+            items = [(transactions[index].to_dict(), nows[index]) for index in unknown]
+            size = max(VERIFY_CHUNK_MIN, -(-len(items) // self.workers))
+            chunks = [items[start:start + size] for start in range(0, len(items), size)]
+            try:
+                verdicts = [valid for chunk in self._get_pool().map(verify_transaction_chunk, chunks)
+                            for valid in chunk]
+                self._record('pool', time.perf_counter() - started, len(unknown))
+                pooled = True
+                for index, valid in zip(unknown, verdicts):
+                    results[index] = valid
+                    if valid:  # Un refus peut venir de l'expiration: seul un succès juge la signature
+                        tx = transactions[index]
+                        SIGNATURE_CACHE.add(tx.get_hash(), tx.signature, tx.sender)
+            except BrokenProcessPool:
+                with self.lock:
+                    self.pool = None  # Recréé au prochain lot
+        started = time.perf_counter()
+        for index, (tx, now) in enumerate(zip(transactions, nows)):
+            if results[index] is None:
+                results[index] = tx.is_valid(now=now)
+        if unknown and not pooled:
+            self._record('inline', time.perf_counter() - started, len(unknown))
+        return results
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=init_verification_process,
+                                                initargs=(LEGACY_SIGNATURES_CUTOFF, dict(LEGACY_MIGRATIONS)))
+            return self.pool
+    
+    def close(self):
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = None
+
+# ============================================================================
+# BLOCKCHAIN
+# ============================================================================
+
+class SimplePoSBlockchain:
+    def __init__(self, min_stake: float = 100, treasury_address: str = None,
+                 store: ChainStore = None, state=None):
+        self.chain: List[Block] = []
+        self.store = store
+        self.pending_transactions = Mempool()
+        
+        # État des comptes: en mémoire par défaut, ou SQLiteState
+        self.state = state if state is not None else MemoryState()
+        self.validators: Dict[str, float] = self.state.validators
+        self.balances: Dict[str, float] = self.state.balances
+        self.last_activity: Dict[str, float] = self.state.last_activity  # Suivi de la dernière activité
+        self.min_stake = min_stake
+        self.block_reward = 10
+        self.treasury_address = treasury_address  # Adresse du trésor
+        self.inactivity_threshold = INACTIVITY_THRESHOLD
+        
+        # PROTECTION 1: Suivi des nonces pour prévenir les doubles dépenses
+        self.nonces_used: Dict[str, int] = self.state.nonces_used  # {address: dernier_nonce_utilisé}
+        
+        # PROTECTION 3: Limites anti-spam
+        self.max_pending_per_address = 10  # Maximum de transactions en attente par adresse
+        self.max_block_size = 100  # Maximum de transactions par bloc
+        
+        # PROTECTION 6: Suivi des transactions pour vérification de cohérence
+        self.transaction_history = TransactionHistory()  # Hash des transactions traitées
+        
+        # PROTECTION 6: Validation incrémentale (seuls les blocs ajoutés depuis le
+        # dernier contrôle sont revérifiés)
+        self.verified_height = 0  # Nombre de blocs déjà vérifiés
+        self.verified_tip_hash = None  # Hash du dernier bloc vérifié
+        self.state_digest = ''  # Empreinte cumulée des blocs vérifiés
+        self._replayed_height = 0  # Nombre de blocs rejoués sur les soldes recalculés
+        self._replayed_tip_hash = None
+        # Soldes recalculés depuis le genesis (table temporaire pour un état SQLite)
+        self._replayed_balances: Dict[str, float] = self.state.temporary_balances('replayed_balances')
+        self._unverified_addresses = set()  # Adresses modifiées depuis le dernier contrôle
+        # Comptes modifiés depuis la dernière publication d'un instantané (None: tous)
+        self.changed_accounts: Optional[set] = set()
+        self._full_comparison = True
+        
+        # Incrémenté à chaque modification de la chaîne, des comptes ou de la mempool
+        # (invalide le statut mis en cache par le Node)
+        self.version = 0
+        
+        # Index hash de bloc -> position, construit à la première recherche par hash
+        self._block_positions: Optional[Dict[str, int]] = None
+        
+        if store is not None and len(store) > 0:
+            self.load_from_store()
+        else:
+            # Un état persistant sans la chaîne correspondante est obsolète
+            self.state.reset()
+            if store is not None:
+                self.chain = StoredChain(store)
+            self.create_genesis_block()
+    
+    def create_genesis_block(self):
+        genesis_tx = Transaction("SYSTEM", "GENESIS", 0)
+        genesis_block = Block(0, [genesis_tx], "0", "SYSTEM", 0)
+        self.chain.append(genesis_block)
+    
+    # ------------------------------------------------------------------
+    # Persistance (ChainStore)
+    # ------------------------------------------------------------------
+    
+    def snapshot_state(self) -> Dict:
+        """État complet à la hauteur courante, sans les blocs (déjà dans le journal)
+        
+        Avec un état des comptes persistant (SQLite), les comptes restent dans la base.
+        """
+        state = {
+            'height': len(self.chain),
+            'tip_hash': self.get_latest_block().hash,
+            'transaction_history': list(self.transaction_history.items()),
+            'pending_transactions': [tx.to_dict() for tx in self.pending_transactions],
+            'min_stake': self.min_stake,
+            'block_reward': self.block_reward,
+            'treasury_address': self.treasury_address,
+            'inactivity_threshold': self.inactivity_threshold
+        }
+        if not self.state.persistent:
+            state.update({
+                'validators': self.validators,
+                'balances': self.balances,
+                'last_activity': self.last_activity,
+                'nonces_used': self.nonces_used
+            })
+        return state
+    
+    def save_snapshot(self):
+        if self.store is not None:
+            self.store.save_snapshot(self.snapshot_state())
+    
+    def load_from_store(self):
+        """Redémarrage: dernier snapshot puis rejeu des seuls blocs écrits après lui"""
+        self.chain = StoredChain(self.store)
+        self._block_positions = None
+        state = self.store.load_latest_snapshot()
+        snapshot_height = 0
+        if state is not None:
+            snapshot_height = state['height']
+            self.changed_accounts = None
+            if not self.state.persistent:
+                self.state.reset()
+                self.validators.update(state['validators'])
+                self.balances.update(state['balances'])
+                self.last_activity.update(state['last_activity'])
+                self.nonces_used.update(state['nonces_used'])
+            for tx_hash, timestamp in state['transaction_history']:
+                self.transaction_history.add(tx_hash, timestamp)
+            for tx_data in state['pending_transactions']:
+                self.pending_transactions.add(Transaction.from_dict(tx_data))
+            self.block_reward = state['block_reward']
+            self.inactivity_threshold = state['inactivity_threshold']
+        
+        # Une base SQLite connaît sa propre hauteur, validée bloc par bloc
+        accounts_height = self.state.height if self.state.persistent else snapshot_height
+        if accounts_height > len(self.store):
+            self.state.reset()
+            accounts_height = 0
+        
+        for height in range(min(snapshot_height, accounts_height), len(self.store)):
+            block = self.store.read_block(height)
+            if height >= accounts_height:
+                with self.state.batch():
+                    self._apply_block_state(block, history=False)
+                    self.state.height = height + 1
+            if height >= snapshot_height:
+                self._apply_block_state(block, accounts=False)
+                self.pending_transactions.remove_many(tx.get_hash() for tx in block.transactions)
+    
+    @property
+    def transaction_fees_pool(self) -> float:
+        """Frais des transactions en attente (maintenus par la Mempool)"""
+        return self.pending_transactions.fee_total
+    
+    def get_latest_block(self) -> Block:
+        return self.chain[-1]
+    
+    def get_block_index(self, block_hash: str) -> Optional[int]:
+        """Position d'un bloc de la chaîne à partir de son hash"""
+        if self._block_positions is None:
+            self._block_positions = {block.hash: i for i, block in enumerate(self.chain)}
+        return self._block_positions.get(block_hash)
+    
+    def get_block_by_hash(self, block_hash: str) -> Optional[Block]:
+        index = self.get_block_index(block_hash)
+        return self.chain[index] if index is not None else None
+    
+    def update_activity(self, address: str):
+        """Met à jour la dernière activité d'une adresse"""
+        self.last_activity[address] = time.time()
+        self._mark_changed(address)
+    
+    def get_inactive_time(self, address: str) -> float:
+        """Retourne le temps d'inactivité en secondes"""
+        if address not in self.last_activity:
+            # Si jamais d'activité, on considère la création du wallet
+            return 0
+        return time.time() - self.last_activity[address]
+    
+    def register_validator(self, address: str, stake: float) -> bool:
+        if stake < self.min_stake:
+            return False
+        if self.get_balance(address) < stake:
+            return False
+        
+        self._set_balance(address, self.get_balance(address) - stake)
+        self.validators[address] = self.validators.get(address, 0) + stake
+        self._mark_changed(address)
+        self.version += 1
+        self.update_activity(address)  # L'enregistrement compte comme activité
+        return True
+    
+    def select_validator(self) -> Optional[str]:
+        if not self.validators:
+            return None
+        
+        total_stake = sum(self.validators.values())
+        if total_stake == 0:
+            return None
+        
+        rand_val = random.uniform(0, total_stake)
+        cumulative = 0
+        
+        for address, stake in self.validators.items():
+            cumulative += stake
+            if rand_val <= cumulative:
+                return address
+        
+        return list(self.validators.keys())[0]
+    
+    def get_next_expected_nonce(self, address: str) -> int:
+        """Retourne le prochain nonce attendu pour une adresse (O(1) via l'index des nonces)"""
+        if address in ["SYSTEM"]:
+            return 0
+        # Nonces confirmés dans la blockchain
+        expected_nonce = self.nonces_used.get(address, -1) + 1
+        # Ajouter les transactions en attente
+        pending_nonce = self.pending_transactions.max_nonce(address)
+        if pending_nonce is not None:
+            expected_nonce = max(expected_nonce, pending_nonce + 1)
+        return expected_nonce
+    
+    def _index_confirmed_nonce(self, tx: Transaction):
+        """PROTECTION 1: Enregistre le nonce d'une transaction incluse dans un bloc"""
+        if tx.sender in ["SYSTEM"]:
+            return
+        if tx.nonce > self.nonces_used.get(tx.sender, -1):
+            self.nonces_used[tx.sender] = tx.nonce
+    
+    def rebuild_indexes(self):
+        """Reconstruit les index dérivés de la chaîne (après /sync ou from_dict)"""
+        self.nonces_used.clear()
+        self.transaction_history.clear()
+        self._block_positions = None
+        for block in self.chain:
+            for tx in block.transactions:
+                self._index_confirmed_nonce(tx)
+                self.transaction_history.add(tx.get_hash(), tx.timestamp)
+    
+    def add_transaction(self, tx: Transaction, checked: bool = False) -> bool:
+        """checked=True: tx.is_valid() déjà vérifié par l'appelant (TransactionVerifier)"""
+        if not checked and not tx.is_valid():
+            return False
+        
+        if tx.sender in ["SYSTEM"]:
+            self.pending_transactions.add(tx)
+            return True
+        
+        tx_hash = tx.get_hash()
+        
+        # PROTECTION 7: Vérifier que la transaction n'est pas expirée (attaque de rejeu)
+        if tx.is_expired():
+            return False
+        
+        # PROTECTION 1: Vérification du nonce pour prévenir les doubles dépenses
+        expected_nonce = self.get_next_expected_nonce(tx.sender)
+        if tx.nonce < expected_nonce:
+            # Nonce déjà utilisé - tentative de double dépense
+            return False
+        
+        # PROTECTION 6: Vérifier que la transaction n'a pas déjà été traitée (dans l'historique)
+        if tx_hash in self.transaction_history:
+            return False  # Transaction déjà traitée - attaque de rejeu
+        
+        # PROTECTION 3: Limite anti-spam - vérifier le nombre de transactions en attente par adresse
+        if self.pending_transactions.count_for(tx.sender) >= self.max_pending_per_address:
+            # Trop de transactions en attente pour cette adresse
+            return False
+        
+        # Vérifier que la transaction n'est pas déjà dans la pool (doublon)
+        if tx_hash in self.pending_transactions:
+            return False  # Transaction déjà présente
+        
+        sender_balance = self.get_balance(tx.sender)
         total_needed = tx.amount + tx.fee
         
         if sender_balance < total_needed:
             return False
         
-        self.pending_transactions.append(tx)
-        self.transaction_fees_pool += tx.fee
+        self.pending_transactions.add(tx, tx_hash)
+        self.version += 1
         self.update_activity(tx.sender)  # Envoyer une transaction = activité
         return True
     
+    def add_transactions(self, transactions: List[Transaction],
+                         valid: List[bool] = None) -> List[Optional[str]]:
+        """Ajoute un lot de transactions en une passe; retourne une erreur par transaction (None si acceptée)
+        
+        Mêmes règles que add_transaction, appliquées dans l'ordre du lot: le nonce
+        attendu, le nombre de transactions en attente et le solde de chaque
+        expéditeur ne sont lus qu'une fois puis tenus à jour au fil du lot.
+        valid: résultats de tx.is_valid() déjà calculés (TransactionVerifier).
+        """
+        now = time.time()
+        expected_nonces: Dict[str, int] = {}
+        pending_counts: Dict[str, int] = {}
+        balances: Dict[str, float] = {}
+        errors: List[Optional[str]] = []
+        senders = set()
+        
+        for position, tx in enumerate(transactions):
+            if not (valid[position] if valid is not None else tx.is_valid(now=now)):
+                errors.append('Transaction invalide: signature ou montants invalides')
+                continue
+            if tx.sender in ["SYSTEM"]:
+                self.pending_transactions.add(tx)
+                errors.append(None)
+                continue
+            
+            sender = tx.sender
+            if sender not in expected_nonces:
+                expected_nonces[sender] = self.get_next_expected_nonce(sender)
+                pending_counts[sender] = self.pending_transactions.count_for(sender)
+                balances[sender] = self.get_balance(sender)
+            
+            tx_hash = tx.get_hash()
+            if tx.nonce < expected_nonces[sender]:
+                errors.append(f'Nonce déjà utilisé (attendu: {expected_nonces[sender]})')
+            elif tx_hash in self.transaction_history:
+                errors.append('Transaction déjà traitée')
+            elif pending_counts[sender] >= self.max_pending_per_address:
+                errors.append('Trop de transactions en attente pour cette adresse')
+            elif tx_hash in self.pending_transactions:
+                errors.append('Transaction déjà présente dans la pool')
+            elif balances[sender] < tx.amount + tx.fee:
+                errors.append('Solde insuffisant')
+            else:
+                self.pending_transactions.add(tx, tx_hash)
+                expected_nonces[sender] = max(expected_nonces[sender], tx.nonce + 1)
+                pending_counts[sender] += 1
+                senders.add(sender)
+                errors.append(None)
+        
+        if any(error is None for error in errors):
+            self.version += 1
+        for sender in senders:
+            self.update_activity(sender)  # Envoyer une transaction = activité
+        return errors
+    
     def create_block(self) -> Optional[Block]:
         if not self.pending_transactions:
             return None
@@ -353,20 +2109,17 @@ class SimplePoSBlockchain:
         
         validator_stake = self.validators[validator]
         
-        # PROTECTION 3: Limiter le nombre de transactions par bloc
-        transactions_to_include = self.pending_transactions[:self.max_block_size]
-        
         # PROTECTION 4: Valider toutes les transactions avant de créer le bloc
-        valid_transactions = []
-        for tx in transactions_to_include:
-            if tx.is_valid():
-                # Vérifier à nouveau le solde (peut avoir changé)
-                if tx.sender in ["SYSTEM"]:
-                    valid_transactions.append(tx)
-                else:
-                    sender_balance = self.get_balance(tx.sender)
-                    if sender_balance >= (tx.amount + tx.fee):
-                        valid_transactions.append(tx)
+        # Chaque transaction retenue est appliquée sur une surcouche des comptes:
+        # les dépenses et réceptions précédentes du bloc comptent pour les suivantes
+        overlay = self.new_block_overlay()
+        
+        def can_include(tx: Transaction) -> bool:
+            return tx.is_valid() and overlay.stage(tx) is None
+        
+        # PROTECTION 3: Limiter le nombre de transactions par bloc
+        # Les transactions les mieux rémunérées passent en premier
+        valid_transactions = self.pending_transactions.select(self.max_block_size, can_include)
         
         if not valid_transactions:
             return None
@@ -380,143 +2133,1134 @@ class SimplePoSBlockchain:
         )
         
         # Traiter uniquement les transactions valides incluses dans le bloc
-        for tx in valid_transactions:
-            if tx.sender not in ["SYSTEM"]:
-                self.balances[tx.sender] = self.get_balance(tx.sender) - (tx.amount + tx.fee)
-            self.balances[tx.recipient] = self.get_balance(tx.recipient) + tx.amount
-            
-            # PROTECTION 6: Ajouter à l'historique des transactions traitées
+        # (la surcouche contient exactement leurs effets: pas de second calcul)
+        self.apply_block(block, overlay)
+        return block
+    
+    def new_block_overlay(self) -> BlockOverlay:
+        return BlockOverlay(self.balances, self.nonces_used)
+    
+    def apply_block(self, block: Block, overlay: BlockOverlay = None):
+        """Ajoute un bloc déjà validé (créé localement ou reçu d'un autre nœud)
+        
+        overlay: effets des transactions du bloc déjà calculés pendant sa
+        validation, sur l'état courant; ils sont alors écrits tels quels.
+        """
+        self.chain.append(block)
+        if self._block_positions is not None:
+            self._block_positions[block.hash] = len(self.chain) - 1
+        # Les effets du bloc sont écrits en une seule transaction (backend SQLite)
+        with self.state.batch():
+            self._apply_block_state(block, overlay=overlay)
+            self.state.height = len(self.chain)
+        
+        # Retirer les transactions du bloc de la pool en attente
+        # (les frais en attente sont mis à jour par la Mempool)
+        self.pending_transactions.remove_many(tx.get_hash() for tx in block.transactions)
+        self.version += 1
+        
+        if self.store is not None and len(self.chain) % self.store.snapshot_interval == 0:
+            self.save_snapshot()
+    
+    def _apply_block_state(self, block: Block, accounts: bool = True, history: bool = True,
+                           overlay: BlockOverlay = None):
+        """Effets d'un bloc sur les comptes (soldes, nonces, activité) et sur l'historique
+        
+        Au redémarrage, les deux parties peuvent être rejouées séparément selon la
+        hauteur à laquelle chacune a été sauvegardée.
+        """
+        # PROTECTION 6: Ajouter à l'historique des transactions traitées
+        if history:
+            for tx in block.transactions:
+                self.transaction_history.add(tx.get_hash(), tx.timestamp)
+        
+        if accounts:
+            if overlay is None:
+                overlay = self.new_block_overlay()
+                for tx in block.transactions:
+                    overlay.stage(tx, check_nonce=False, check_balance=False)
+            # Une écriture par compte touché; PROTECTION 1: index des nonces confirmés
+            overlay.balances.commit(self._set_balance)
+            overlay.nonces.commit()
+        
+        # Récompense du validateur
+        validator = block.validator
+        if accounts and validator and validator != "SYSTEM":
+            # Le validateur perçoit les frais des transactions incluses dans le bloc
+            block_fees = sum(tx.fee for tx in block.transactions if tx.sender not in ["SYSTEM"])
+            reward = self.block_reward + block_fees
+            self._set_balance(validator, self.get_balance(validator) + reward)
+            self.update_activity(validator)  # Valider = activité
+    
+    # ------------------------------------------------------------------
+    # Import de blocs par étapes
+    # ------------------------------------------------------------------
+    # Un rejet est un tuple (message d'erreur, type d'activité suspecte ou None, détails)
+    
+    def check_block_structure(self, block: Block) -> Optional[tuple]:
+        """Contrôles sans signature: taille, date, hash et racine de Merkle
+        
+        Peu coûteux et bornés par max_block_size: à faire avant de confier les
+        signatures d'un bloc reçu au TransactionVerifier, pour qu'un bloc mal
+        formé ne coûte aucune vérification de signature.
+        """
+        if len(block.transactions) > self.max_block_size:
+            return f'Bloc trop grand: {len(block.transactions)} transactions (max: {self.max_block_size})', None, {}
+        if block.timestamp > time.time() + BLOCK_MAX_FUTURE_DRIFT:
+            return 'Bloc daté dans le futur', None, {}
+        if block.hash != block.calculate_hash():
+            return 'Hash du bloc invalide', None, {}
+        if not block.has_valid_merkle_root():
+            return 'Racine de Merkle invalide', None, {}
+        for tx in block.transactions:
+            if tx.timestamp > block.timestamp + BLOCK_MAX_FUTURE_DRIFT:
+                tx_hash = tx.get_hash()
+                return (f'Transaction postérieure au bloc: {tx_hash[:16]}...', None,
+                        {'block_index': block.index, 'tx_hash': tx_hash[:16]})
+        return None
+    
+    def check_block_contents(self, block: Block, now: float = None, valid: List[bool] = None,
+                             verifier: 'TransactionVerifier' = None) -> Optional[tuple]:
+        """Étape sans état: structure du bloc (check_block_structure) puis transactions
+        
+        Ne lit ni la chaîne ni les comptes: peut s'exécuter hors du fil
+        d'écriture, en parallèle pour des blocs différents. Calcule au passage
+        les hash des transactions (mis en cache pour l'étape suivante).
+        valid: résultats de tx.is_valid() déjà calculés; verifier: les calcule,
+        seulement si la structure du bloc est correcte.
+        """
+        rejection = self.check_block_structure(block)
+        if rejection is not None:
+            return rejection
+        if verifier is not None:
+            valid = verifier.verify(block.transactions)
+        
+        seen = set()
+        for position, tx in enumerate(block.transactions):
             tx_hash = tx.get_hash()
-            if tx_hash not in self.transaction_history:
-                self.transaction_history.append(tx_hash)
+            if not (valid[position] if valid is not None else tx.is_valid(now=now)):
+                return (f'Transaction invalide dans le bloc: {tx_hash[:16]}...', 'invalid_block_transaction',
+                        {'block_index': block.index, 'tx_hash': tx_hash[:16]})
+            if tx_hash in seen:
+                return (f'Transaction déjà traitée (attaque de rejeu): {tx_hash[:16]}...', 'replay_attack_attempt',
+                        {'block_index': block.index, 'tx_hash': tx_hash[:16]})
+            seen.add(tx_hash)
+        return None
+    
+    def check_block_state(self, block: Block, balances: bool = True,
+                          overlay: BlockOverlay = None) -> Optional[tuple]:
+        """Étape avec état: position dans la chaîne, validateur, rejeux, nonces et soldes
         
-        total_reward = self.block_reward + self.transaction_fees_pool
-        self.balances[validator] = self.get_balance(validator) + total_reward
-        self.update_activity(validator)  # Valider = activité
+        Les transactions sont rejouées sur une surcouche (soldes et derniers
+        nonces modifiés par les transactions précédentes du bloc) sans toucher
+        à l'état: deux dépenses qui passent chacune mais pas ensemble sont
+        refusées. Les nonces sont comparés aux nonces confirmés (la pool locale
+        peut déjà contenir les transactions du bloc). balances=False: soldes non
+        vérifiés et stake au plus égal au stake enregistré (blocs synchronisés,
+        voir check_synced_block). Si le bloc est accepté, overlay (fournie vide)
+        contient ses effets, prêts pour apply_block.
+        """
+        if block.index != len(self.chain):
+            return 'Index du bloc incorrect', None, {}
+        if block.index > 0:
+            previous = self.get_latest_block()
+            if block.previous_hash != previous.hash:
+                return 'Previous hash incorrect', None, {}
+            if block.timestamp < previous.timestamp:
+                return 'Bloc daté avant le bloc précédent', None, {}
+        if block.validator not in ["SYSTEM"]:
+            # Les stakes viennent des enregistrements locaux, jamais des en-têtes reçus
+            stake = self.validators.get(block.validator)
+            if stake is None:
+                return 'Validator inconnu', None, {}
+            # Un bloc ancien peut précéder un complément de stake (les stakes ne font que croître)
+            if (stake != block.stake) if balances else (block.stake > stake):
+                return 'Stake du validator incorrect', None, {}
         
-        self.chain.append(block)
+        if overlay is None:
+            overlay = self.new_block_overlay()
+        for tx in block.transactions:
+            tx_hash = tx.get_hash()
+            if tx_hash in self.transaction_history:
+                return (f'Transaction déjà traitée (attaque de rejeu): {tx_hash[:16]}...', 'replay_attack_attempt',
+                        {'block_index': block.index, 'tx_hash': tx_hash[:16]})
+            refusal = overlay.stage(tx, check_balance=balances)
+            if refusal == 'nonce':
+                last_nonce = overlay.nonces.get(tx.sender, -1)
+                return (f'Nonce invalide dans la transaction: {tx_hash[:16]}...', 'invalid_nonce_in_block',
+                        {'block_index': block.index, 'sender': tx.sender,
+                         'expected_nonce': last_nonce + 1, 'received_nonce': tx.nonce})
+            if refusal == 'balance':
+                return f'Solde insuffisant dans la transaction: {tx_hash[:16]}...', None, {}
+        return None
+    
+    def import_block(self, block: Block, timings: Dict[str, float] = None) -> Optional[tuple]:
+        """Étapes avec état puis application: tout ou rien (commande d'écriture)
         
-        # Retirer les transactions traitées de la pool
-        processed_hashes = {tx.get_hash() for tx in valid_transactions}
-        self.pending_transactions = [tx for tx in self.pending_transactions 
-                                     if tx.get_hash() not in processed_hashes]
+        check_block_contents doit avoir été appelé avant. Rien n'est écrit
+        tant que toutes les transactions ne sont pas validées. timings reçoit
+        la durée (ms) des étapes 'state' et 'commit'.
+        """
+        started = time.perf_counter()
+        overlay = self.new_block_overlay()
+        rejection = self.check_block_state(block, overlay=overlay)
+        checked = time.perf_counter()
+        if timings is not None:
+            timings['state'] = (checked - started) * 1000
+        if rejection is not None:
+            return rejection  # La surcouche est abandonnée: rien n'a été écrit
+        self.apply_block(block, overlay)
+        if timings is not None:
+            timings['commit'] = (time.perf_counter() - checked) * 1000
+        return None
+    
+    # ------------------------------------------------------------------
+    # Synchronisation par en-têtes
+    # ------------------------------------------------------------------
+    
+    def get_block_locator(self) -> List[str]:
+        """Hash de blocs de la pointe vers le genesis, espacés exponentiellement
         
-        # Recalculer les frais de transaction (seulement pour les transactions restantes)
-        self.transaction_fees_pool = sum(tx.fee for tx in self.pending_transactions)
+        Les 10 derniers blocs puis un bloc sur 2, 4, 8...: O(log n) hash suffisent
+        au peer pour trouver le dernier ancêtre commun.
+        """
+        locator = []
+        index = len(self.chain) - 1
+        step = 1
+        while index > 0:
+            locator.append(self.chain[index].hash)
+            if len(locator) >= 10:
+                step *= 2
+            index -= step
+        locator.append(self.chain[0].hash)
+        return locator
+    
+    def find_common_ancestor(self, locator: List[str]) -> Optional[int]:
+        """Index du premier bloc du locator présent dans la chaîne locale"""
+        for block_hash in locator:
+            index = self.get_block_index(block_hash)
+            if index is not None:
+                return index
+        return None
+    
+    def rollback(self, height: int):
+        """Réorganisation: ne conserve que les height premiers blocs (0: chaîne vide)
         
-        return block
+        L'état des comptes est reconstruit en rejouant les blocs conservés (O(height)).
+        Les validateurs, enregistrés hors chaîne, sont conservés et leurs stakes
+        de nouveau déduits des soldes rejoués (restake_validators); les transactions
+        en attente encore valides sont remises dans la pool. Les blocs de la
+        branche qui remplace la chaîne doivent avoir été validés avant
+        (check_branch): les blocs supprimés ne sont pas récupérables.
+        """
+        kept = [self.chain[i] for i in range(height)]
+        validators = dict(self.validators)
+        pending = list(self.pending_transactions)
+        
+        if self.store is not None:
+            self.store.reset()
+            self.chain = StoredChain(self.store)
+        else:
+            self.chain = []
+        self._block_positions = None
+        self.changed_accounts = None  # État reconstruit: instantané complet
+        with self.state.batch():
+            self.state.reset()
+            self.validators.update(validators)
+        self.transaction_history.clear()
+        self.pending_transactions.clear()
+        
+        for block in kept:
+            if block.index == 0:
+                self.chain.append(block)  # Le genesis n'a pas d'effet sur les comptes
+            else:
+                self.apply_block(block)
+        self.restake_validators(validators)
+        for tx in pending:
+            self.add_transaction(tx)
+        self.version += 1
+    
+    def restake_validators(self, validators: Dict[str, float]):
+        """Déduit les stakes des soldes reconstruits par rejeu de la chaîne
+        
+        register_validator bloque le stake hors chaîne: sans cette déduction, un
+        état rejoué (rollback, check_branch) rendrait le stake disponible en plus
+        du stake lui-même.
+        """
+        with self.state.batch():
+            for address, stake in validators.items():
+                self._set_balance(address, self.get_balance(address) - stake)
+    
+    def check_synced_block(self, block: Block, valid: List[bool] = None) -> Optional[str]:
+        """Validation d'un bloc téléchargé pendant une synchronisation
+        
+        Mêmes contrôles que /block/receive pour la structure, les transactions et
+        les rejeux. Les transactions sont jugées à la date du bloc (un bloc ancien
+        reste valide), elle-même bornée par le bloc précédent et l'horloge locale.
+        Les soldes dépendent d'opérations hors chaîne (enregistrement des
+        validateurs) et ne sont pas revérifiés; le validateur doit être enregistré
+        localement, avec un stake au moins égal à celui annoncé par le bloc.
+        valid: résultats de tx.is_valid(block.timestamp) déjà calculés.
+        Retourne le message d'erreur, ou None si le bloc est acceptable.
+        """
+        rejection = self.check_block_state(block, balances=False) or \
+            self.check_block_contents(block, now=block.timestamp, valid=valid)
+        return rejection[0] if rejection is not None else None
+    
+    def apply_synced_block(self, block: Block, valid: List[bool] = None) -> Optional[str]:
+        """Valide puis ajoute un bloc téléchargé; retourne l'erreur éventuelle"""
+        error = self.check_synced_block(block, valid)
+        if error is not None:
+            return error
+        
+        if block.index == 0:
+            self.chain.append(block)  # Genesis du peer (chaînes sans ancêtre commun)
+            self._block_positions = None
+            self.version += 1
+            return None
+        
+        self.apply_block(block)
+        return None
+    
+    @contextmanager
+    def scratch_state(self):
+        """État des comptes temporaire, du même type que self.state
+        
+        En mémoire pour MemoryState; pour un état persistant, base SQLite dans un
+        répertoire temporaire supprimé ensuite (la mémoire ne dépend toujours pas
+        du nombre d'adresses).
+        """
+        if not self.state.persistent:
+            yield MemoryState()
+            return
+        with tempfile.TemporaryDirectory(prefix='state-') as directory:
+            state = SQLiteState(os.path.join(directory, 'state.db'))
+            try:
+                yield state
+            finally:
+                state.close()
+    
+    def check_branch(self, height: int, blocks: List[Block],
+                     valid: List[List[bool]] = None) -> Tuple[int, Optional[str]]:
+        """Valide une branche concurrente sans toucher à la chaîne, à l'état ni au stockage
+        
+        Les height premiers blocs locaux sont rejoués sur un état temporaire
+        (scratch_state), puis les blocs de la branche y sont ajoutés comme par
+        apply_synced_block. Retourne (blocs acceptés, erreur ou None): rollback
+        ne doit être appelé que si toute la branche est acceptée.
+        """
+        with self.scratch_state() as state:
+            scratch = SimplePoSBlockchain(self.min_stake, self.treasury_address, state=state)
+            scratch.chain = BranchChain(self.chain, height)
+            scratch.block_reward = self.block_reward
+            scratch.max_block_size = self.max_block_size
+            scratch.inactivity_threshold = self.inactivity_threshold
+            with state.batch():
+                state.validators.update(self.validators)
+                for index in range(1, height):
+                    scratch._apply_block_state(self.chain[index])
+                scratch.restake_validators(self.validators)
+            for count, block in enumerate(blocks):
+                error = scratch.apply_synced_block(block, valid[count] if valid is not None else None)
+                if error is not None:
+                    return count, error
+        return len(blocks), None
+    
+    def get_balance(self, address: str) -> float:
+        return self.balances.get(address, 0)
+    
+    def _mark_changed(self, address: str):
+        """Compte à recopier dans le prochain instantané de lecture"""
+        if self.changed_accounts is not None:
+            self.changed_accounts.add(address)
+    
+    def take_changed_accounts(self) -> Optional[set]:
+        """Comptes modifiés depuis l'appel précédent (None: tout l'état a pu changer)"""
+        changed, self.changed_accounts = self.changed_accounts, set()
+        return changed
+    
+    def _set_balance(self, address: str, balance: float):
+        """Écrit un solde en le marquant à recomparer au prochain contrôle de cohérence"""
+        self.balances[address] = balance
+        self._mark_changed(address)
+        self._unverified_addresses.add(address)
+        self.version += 1
+    
+    def mint_tokens(self, address: str, amount: float):
+        tx = Transaction("SYSTEM", address, amount, tx_type="MINT")
+        self.add_transaction(tx)
+        self._set_balance(address, self.get_balance(address) + amount)
+        self.update_activity(address)
+    
+    def is_valid(self, deep: bool = False) -> bool:
+        """Valide la chaîne de façon incrémentale
+        
+        Seuls les blocs ajoutés depuis le dernier contrôle sont vérifiés. Avec
+        deep=True (audit complet), toute la chaîne est revérifiée et les balances
+        sont recalculées depuis le genesis.
+        """
+        if deep:
+            return self._verify_blocks(1) and self.verify_balance_consistency()
+        
+        self._check_verified_prefix()
+        height = len(self.chain)
+        if not self._verify_blocks(max(1, self.verified_height)):
+            return False
+        for i in range(self.verified_height, height):
+            self.state_digest = hashlib.sha3_256(
+                f"{self.state_digest}{self.chain[i].hash}".encode()
+            ).hexdigest()
+        self.verified_height = height
+        self.verified_tip_hash = self.get_latest_block().hash
+        
+        # PROTECTION 6: Vérifier la cohérence des balances
+        return self.check_balance_consistency()
+    
+    def _verify_blocks(self, start: int) -> bool:
+        """Hash, racine de Merkle, chaînage et transactions des blocs à partir de start"""
+        for i in range(start, len(self.chain)):
+            current = self.chain[i]
+            previous = self.chain[i-1]
+            
+            if current.hash != current.calculate_hash():
+                return False
+            if not current.has_valid_merkle_root():
+                return False
+            if current.previous_hash != previous.hash:
+                return False
+            # Transactions jugées à la date de leur bloc (sinon toute transaction de
+            # plus d'une heure serait expirée et l'audit d'une vraie chaîne échouerait)
+            for tx in current.transactions:
+                if not tx.is_valid(now=current.timestamp):
+                    return False
+        return True
+    
+    def _check_verified_prefix(self):
+        """Repart de zéro si des blocs déjà vérifiés ou rejoués ont été remplacés"""
+        for height, tip_hash in ((self.verified_height, self.verified_tip_hash),
+                                 (self._replayed_height, self._replayed_tip_hash)):
+            if height and (height > len(self.chain) or self.chain[height - 1].hash != tip_hash):
+                self.verified_height = 0
+                self.verified_tip_hash = None
+                self.state_digest = ''
+                self._replayed_height = 0
+                self._replayed_tip_hash = None
+                self._replayed_balances = self.state.temporary_balances('replayed_balances')
+                self._full_comparison = True
+                return
+    
+    @staticmethod
+    def _replay_block_balances(block: Block, balances: Dict[str, float], block_reward: float,
+                               touched: set = None):
+        """Effets d'un bloc sur des soldes recalculés (transactions et récompense)"""
+        changed = []
+        for tx in block.transactions:
+            if tx.sender not in ["SYSTEM"]:
+                balances[tx.sender] = balances.get(tx.sender, 0) - (tx.amount + tx.fee)
+                changed.append(tx.sender)
+            balances[tx.recipient] = balances.get(tx.recipient, 0) + tx.amount
+            changed.append(tx.recipient)
+        
+        # Ajouter la récompense du validateur
+        if block.validator and block.validator != "SYSTEM":
+            block_fees = sum(tx.fee for tx in block.transactions if tx.sender not in ["SYSTEM"])
+            reward = block_reward + block_fees
+            balances[block.validator] = balances.get(block.validator, 0) + reward
+            changed.append(block.validator)
+        
+        if touched is not None:
+            touched.update(changed)
+    
+    def check_balance_consistency(self) -> bool:
+        """PROTECTION 6: Cohérence des balances, limitée aux changements depuis le dernier contrôle
+        
+        Les blocs ajoutés sont rejoués sur les soldes recalculés déjà connus; seules
+        les adresses touchées par ces blocs ou modifiées depuis sont comparées.
+        Les adresses incohérentes restent à recomparer au contrôle suivant.
+        """
+        self._check_verified_prefix()
+        height = len(self.chain)
+        with self.state.batch():
+            for i in range(self._replayed_height, height):
+                self._replay_block_balances(self.chain[i], self._replayed_balances, self.block_reward,
+                                            self._unverified_addresses)
+        self._replayed_height = height
+        self._replayed_tip_hash = self.get_latest_block().hash
+        
+        # Tolérance de 0.0001 pour les erreurs d'arrondi
+        if self._full_comparison:
+            self._unverified_addresses = self.state.balance_mismatches(self._replayed_balances, 0.0001)
+        else:
+            self._unverified_addresses = {
+                address for address in self._unverified_addresses
+                if abs(self._replayed_balances.get(address, 0) - self.balances.get(address, 0)) > 0.0001
+            }
+        self._full_comparison = False
+        return not self._unverified_addresses
+    
+    def verify_balance_consistency(self) -> bool:
+        """PROTECTION 6: Vérifie la cohérence des balances en recalculant depuis le genesis
+        
+        Pour un état SQLite, les soldes recalculés sont rangés dans une table
+        temporaire et comparés en SQL (mémoire indépendante du nombre d'adresses).
+        """
+        calculated_balances = self.state.temporary_balances('calculated_balances')
+        
+        # Parcourir tous les blocs et recalculer les balances
+        with self.state.batch():
+            for block in self.chain:
+                self._replay_block_balances(block, calculated_balances, self.block_reward)
+        
+        # Comparer avec les balances actuelles (tolérance de 0.0001 pour les erreurs d'arrondi)
+        return not self.state.balance_mismatches(calculated_balances, 0.0001)
+    
+    def get_account_info(self, address: str, accounts: 'AccountsSnapshot' = None) -> Dict:
+        """Informations complètes sur un compte (état courant, ou instantané accounts)"""
+        if accounts is not None:
+            balance, stake, last_activity = accounts.get(address)
+        else:
+            balance = self.balances.get(address)
+            stake = self.validators.get(address)
+            last_activity = self.last_activity.get(address)
+        inactive_time = time.time() - last_activity if last_activity is not None else 0
+        
+        return {
+            'address': address,
+            'balance': balance or 0,
+            'staked': stake or 0,
+            'total': (balance or 0) + (stake or 0),
+            'is_validator': stake is not None,
+            'last_activity': last_activity or 0,
+            'inactive_time': inactive_time,
+            'inactive_days': inactive_time / (24 * 3600)
+        }
+    
+    def get_top_balances(self, limit: int = 10, accounts: 'AccountsSnapshot' = None) -> List[Dict]:
+        source = accounts if accounts is not None else self.state
+        return [{'address': a, 'balance': b} for a, b in source.top_balances(limit)]
+    
+    def get_validators_by_stake(self, limit: int = 10, accounts: 'AccountsSnapshot' = None) -> List[Dict]:
+        source = accounts if accounts is not None else self.state
+        return [{'address': a, 'stake': s} for a, s in source.validators_by_stake(limit)]
+    
+    def get_inactive_accounts(self, limit: int = 100, accounts: 'AccountsSnapshot' = None) -> List[Dict]:
+        """Comptes inactifs depuis plus de inactivity_threshold, les plus anciens d'abord"""
+        source = accounts if accounts is not None else self.state
+        now = time.time()
+        return [
+            {'address': a, 'last_activity': t, 'inactive_days': (now - t) / (24 * 3600)}
+            for a, t in source.inactive_accounts(now - self.inactivity_threshold, limit)
+        ]
+    
+    def to_dict(self) -> Dict:
+        return {
+            'chain': [block.to_dict() for block in self.chain],
+            'pending_transactions': [tx.to_dict() for tx in self.pending_transactions],
+            'validators': dict(self.validators),
+            'balances': dict(self.balances),
+            'last_activity': dict(self.last_activity),
+            'min_stake': self.min_stake,
+            'block_reward': self.block_reward,
+            'transaction_fees_pool': self.transaction_fees_pool,
+            'treasury_address': self.treasury_address,
+            'inactivity_threshold': self.inactivity_threshold
+        }
+    
+    @staticmethod
+    def from_dict(data: Dict) -> 'SimplePoSBlockchain':
+        blockchain = SimplePoSBlockchain(
+            data['min_stake'],
+            data.get('treasury_address')
+        )
+        blockchain.chain = [Block.from_dict(b) for b in data['chain']]
+        for tx_data in data['pending_transactions']:
+            blockchain.pending_transactions.add(Transaction.from_dict(tx_data))
+        blockchain.validators.update(data['validators'])
+        blockchain.balances.update(data['balances'])
+        blockchain.last_activity.update(data.get('last_activity', {}))
+        blockchain.block_reward = data['block_reward']
+        blockchain.inactivity_threshold = data.get('inactivity_threshold', INACTIVITY_THRESHOLD)
+        blockchain.rebuild_indexes()
+        return blockchain
+
+# ============================================================================
+# DIFFUSION AUX PEERS (GOSSIP)
+# ============================================================================
+
+class InventorySet:
+    """Ensemble borné de hash (les plus anciens sont oubliés), avec leur date d'ajout"""
+    
+    def __init__(self, max_size: int = INVENTORY_SIZE):
+        self.max_size = max_size
+        self._items: OrderedDict = OrderedDict()
+    
+    def add(self, item_hash: str):
+        self._items[item_hash] = time.time()
+        self._items.move_to_end(item_hash)
+        if len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+    
+    def added_at(self, item_hash: str) -> Optional[float]:
+        return self._items.get(item_hash)
+    
+    def __contains__(self, item_hash: str) -> bool:
+        return item_hash in self._items
+    
+    def __len__(self) -> int:
+        return len(self._items)
+
+class GossipDispatcher:
+    """Diffusion asynchrone des transactions et des blocs aux peers
+    
+    send() ne fait que mettre le message dans la file du peer et rend la main:
+    la requête HTTP qui l'a déclenché n'attend plus les peers. Un pool de
+    GOSSIP_CONCURRENCY threads vide les files en parallèle, un seul envoi à la
+    fois par peer (l'ordre des blocs est conservé) avec une session HTTP
+    keep-alive par peer. Une file pleine (peer lent ou injoignable) perd ses
+    messages les plus anciens.
+    
+    announce() met en file un simple hash: les annonces consécutives d'un peer
+    partent en un seul POST /inv, et seuls les objets que le peer déclare
+    manquants lui sont ensuite envoyés (corps obtenus par getdata). Les annonces
+    sont regroupées par fenêtres de GOSSIP_BATCH_WINDOW secondes ou de
+    INV_BATCH_SIZE hash, et les transactions manquantes partent en un seul
+    POST /transactions/receive_batch.
+    """
+    
+    def __init__(self, concurrency: int = GOSSIP_CONCURRENCY, queue_size: int = GOSSIP_QUEUE_SIZE,
+                 timeout=GOSSIP_TIMEOUT, getdata=None, origin: str = None,
+                 batch_window: float = GOSSIP_BATCH_WINDOW):
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.batch_window = batch_window
+        self.getdata = getdata  # (type, hash) -> (chemin, corps) ou None
+        self.origin = origin  # URL publique de ce nœud, transmise dans les annonces
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='gossip')
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.queues: Dict[str, deque] = {}
+        self.sessions: Dict[str, requests.Session] = {}
+        self.active = set()  # Peers dont la file est en cours d'envoi
+        self.stats = {'sent': 0, 'failed': 0, 'dropped': 0, 'announced': 0, 'bodies': 0}
+    
+    def announce(self, peer: str, item_type: str, item_hash: str):
+        """Met en file l'annonce d'un objet ('tx' ou 'block') pour un peer (non bloquant)"""
+        self.send(peer, '/inv', {'type': item_type, 'hash': item_hash})
+    
+    def send(self, peer: str, path: str, payload: Dict):
+        """Met un message en file pour un peer (non bloquant)"""
+        with self.lock:
+            queue = self.queues.setdefault(peer, deque())
+            if len(queue) >= self.queue_size:
+                queue.popleft()
+                self.stats['dropped'] += 1
+            queue.append((path, payload, time.time()))
+            if peer not in self.active:
+                self.active.add(peer)
+                self.pool.submit(self._drain, peer)
+    
+    def _drain(self, peer: str):
+        """Vide la file d'un peer (un seul worker par peer)
+        
+        Quelle que soit l'issue, le peer quitte self.active: un worker mort
+        n'empêche pas le prochain message de relancer l'envoi.
+        """
+        session = self.sessions.get(peer)
+        if session is None:
+            session = self.sessions[peer] = requests.Session()
+        finished = False
+        try:
+            while True:
+                with self.lock:
+                    queue = self.queues[peer]
+                    if not queue:
+                        self.active.discard(peer)
+                        self.idle.notify_all()
+                        finished = True
+                        return
+                    path, payload, queued_at = queue[0]
+                    # Fenêtre de regroupement: laisser d'autres annonces rejoindre la première
+                    wait = queued_at + self.batch_window - time.time()
+                    if path == '/inv' and wait > 0 and len(queue) < INV_BATCH_SIZE:
+                        pass
+                    else:
+                        wait = 0
+                        queue.popleft()
+                        if path == '/inv':
+                            # Regrouper les annonces consécutives en un seul message
+                            inventory = [payload]
+                            while queue and queue[0][0] == '/inv' and len(inventory) < INV_BATCH_SIZE:
+                                inventory.append(queue.popleft()[1])
+                            payload = {'origin': self.origin, 'inventory': inventory}
+                if wait > 0:
+                    time.sleep(wait)
+                    continue
+                try:
+                    response = session.post(f"{peer}{path}", json=payload, timeout=self.timeout)
+                    outcome = 'sent'
+                    if path == '/inv':
+                        answer = response.json()
+                        if not isinstance(answer, dict) or not isinstance(answer.get('missing', []), list):
+                            raise ValueError('Réponse /inv malformée')
+                        self._send_missing(session, peer, answer.get('missing', []))
+                except (requests.RequestException, ValueError, TypeError, KeyError):
+                    outcome = 'failed'  # Peer injoignable ou réponse malformée
+                with self.lock:
+                    self.stats[outcome] += 1
+                    if path == '/inv':
+                        self.stats['announced'] += len(payload['inventory'])
+        finally:
+            if not finished:
+                with self.lock:
+                    self.active.discard(peer)
+                    self.idle.notify_all()
+    
+    def _send_missing(self, session: requests.Session, peer: str, missing: List[Dict]):
+        """Envoie les corps des objets que le peer a déclarés manquants
+        
+        Les transactions partent en un seul lot, les blocs un par un dans l'ordre.
+        """
+        transactions = []
+        blocks = []
+        for item in missing:
+            body = self.getdata(item['type'], item['hash']) if self.getdata else None
+            if body is None:
+                continue  # Objet disparu entre-temps (transaction minée par exemple)
+            (transactions if item['type'] == 'tx' else blocks).append(body)
+        
+        if transactions:
+            session.post(f"{peer}/transactions/receive_batch",
+                         json={'transactions': [payload for _, payload in transactions]},
+                         timeout=self.timeout)
+        for path, payload in blocks:
+            session.post(f"{peer}{path}", json=payload, timeout=self.timeout)
+        with self.lock:
+            self.stats['bodies'] += len(transactions) + len(blocks)
+    
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Attend que toutes les files soient vides (tests, arrêt du nœud)"""
+        with self.lock:
+            return self.idle.wait_for(lambda: not self.active, timeout)
+    
+    def close(self):
+        self.pool.shutdown(wait=False)
+        for session in list(self.sessions.values()):
+            session.close()
+
+# ============================================================================
+# SURVEILLANCE DES PEERS
+# ============================================================================
+
+class PeerManager:
+    """Sonde les peers en arrière-plan (GET /health) et les classe
+    
+    Chaque sonde relève la latence (moyenne glissante), la hauteur et le trésor
+    annoncés par le peer. États:
+    - 'pending': pas encore sondé avec succès
+    - 'healthy': a répondu à la dernière sonde
+    - 'down': PEER_MAX_FAILURES échecs consécutifs (sondes ou téléchargements),
+      écarté de la diffusion et du rattrapage jusqu'à la prochaine sonde réussie
+    - 'malicious': trésor différent de l'adresse officielle, signalé via on_malicious
+    """
+    
+    def __init__(self, get_peers, on_malicious=None, interval: float = PEER_PROBE_INTERVAL,
+                 timeout: float = PEER_PROBE_TIMEOUT, workers: int = PEER_PROBE_WORKERS):
+        self.get_peers = get_peers  # Liste courante des peers à sonder
+        self.on_malicious = on_malicious
+        self.interval = interval
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.info: Dict[str, Dict] = {}
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+    
+    def _entry(self, peer: str) -> Dict:
+        return self.info.setdefault(peer, {
+            'state': 'pending', 'latency_ms': None, 'height': None, 'treasury': None,
+            'failures': 0, 'last_seen': None, 'last_probe': None
+        })
+    
+    def _record_failure(self, entry: Dict):
+        entry['failures'] += 1
+        if entry['failures'] >= PEER_MAX_FAILURES and entry['state'] != 'malicious':
+            entry['state'] = 'down'
+    
+    def probe(self, peer: str) -> Dict:
+        """Sonde un peer et met à jour son état; retourne une copie de ses informations"""
+        start = time.perf_counter()
+        try:
+            response = requests.get(f"{peer}/health", timeout=self.timeout)
+            data = response.json() if response.status_code == 200 else None
+        except (requests.RequestException, ValueError):
+            data = None
+        latency = (time.perf_counter() - start) * 1000
+        
+        detected = False
+        with self.lock:
+            entry = self._entry(peer)
+            entry['last_probe'] = time.time()
+            if not isinstance(data, dict):
+                self._record_failure(entry)
+            else:
+                previous = entry['latency_ms']
+                entry['latency_ms'] = latency if previous is None else 0.7 * previous + 0.3 * latency
+                entry['height'] = data.get('height')
+                entry['treasury'] = data.get('treasury')
+                entry['failures'] = 0
+                entry['last_seen'] = entry['last_probe']
+                # Un peer sans trésor ou avec un trésor différent est malveillant
+                if entry['treasury'] != DEFAULT_TREASURY_ADDRESS:
+                    detected = entry['state'] != 'malicious'
+                    entry['state'] = 'malicious'
+                else:
+                    entry['state'] = 'healthy'
+            result = dict(entry)
+        
+        if detected and self.on_malicious is not None:
+            self.on_malicious(peer)
+        return result
+    
+    def probe_all(self, peers: List[str] = None) -> Dict[str, Dict]:
+        """Sonde les peers simultanément"""
+        peers = list(self.get_peers() if peers is None else peers)
+        return dict(zip(peers, self.pool.map(self.probe, peers)))
+    
+    def report_failure(self, peer: str):
+        """Échec constaté hors sonde (téléchargement de blocs par exemple)"""
+        with self.lock:
+            self._record_failure(self._entry(peer))
+    
+    def forget(self, peer: str):
+        with self.lock:
+            self.info.pop(peer, None)
+    
+    def score(self, peer: str) -> float:
+        """Score dans [0, 1]: élevé pour un peer sain et rapide, nul s'il est écarté"""
+        entry = self.info.get(peer)
+        if entry is None or entry['state'] == 'pending':
+            return 0.25
+        if entry['state'] != 'healthy':
+            return 0.0
+        return 1 / (1 + entry['latency_ms'] / 100) / (1 + entry['failures'])
+    
+    def ranked(self, peers: List[str]) -> List[str]:
+        """Peers utilisables (ni écartés ni malveillants), les meilleurs scores en premier"""
+        with self.lock:
+            usable = [peer for peer in peers
+                      if self.info.get(peer, {}).get('state', 'pending') in ('pending', 'healthy')]
+            return sorted(usable, key=self.score, reverse=True)
+    
+    def best_peer(self, peers: List[str], min_height: int) -> Optional[str]:
+        """Peer sain le plus haut au-delà de min_height (à hauteur égale, le meilleur score)"""
+        with self.lock:
+            candidates = [peer for peer in peers
+                          if self.info.get(peer, {}).get('state') == 'healthy'
+                          and (self.info[peer]['height'] or 0) > min_height]
+            if not candidates:
+                return None
+            return max(candidates, key=lambda peer: (self.info[peer]['height'], self.score(peer)))
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        with self.lock:
+            return {peer: dict(entry, score=round(self.score(peer), 3))
+                    for peer, entry in self.info.items()}
+    
+    def start(self):
+        """Lance les sondes périodiques (thread de fond)"""
+        if self.thread is not None:
+            return
+        
+        def loop():
+            while True:
+                try:
+                    self.probe_all()
+                except Exception:
+                    pass  # Une sonde ratée ne doit pas arrêter la surveillance
+                if self.stopped.wait(self.interval):
+                    return
+        
+        self.thread = threading.Thread(target=loop, name='peer-manager', daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stopped.set()
+        self.pool.shutdown(wait=False)
+
+# ============================================================================
+# FIL D'ÉCRITURE UNIQUE ET INSTANTANÉS DE LECTURE
+# ============================================================================
+
+class SerialWriter:
+    """Fil d'écriture unique: les commandes qui modifient la blockchain s'y exécutent une à une
+    
+    call() met une commande en file et attend son résultat (ou son exception);
+    appelée depuis le fil d'écriture lui-même, la commande s'exécute directement.
+    after_command est appelé après chaque commande, avant d'en rendre le
+    résultat (publication de l'instantané de lecture); s'il échoue, l'erreur est
+    journalisée et rendue à l'appelant de cette commande, le fil continue.
+    """
+    
+    def __init__(self, after_command=None, name: str = 'chain-writer'):
+        self.after_command = after_command
+        self.commands: Queue = Queue()
+        self.stats = {'commands': 0, 'failed': 0}
+        self.running = False
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+    
+    def call(self, command, *args, **kwargs):
+        if threading.current_thread() is self.thread:
+            return command(*args, **kwargs)
+        future = Future()
+        self.commands.put((future, command, args, kwargs))
+        return future.result()
+    
+    def _run(self):
+        while True:
+            item = self.commands.get()
+            if item is None:
+                return
+            future, command, args, kwargs = item
+            self.running = True
+            try:
+                result = command(*args, **kwargs)
+            except BaseException as e:
+                self.stats['failed'] += 1
+                result, error = None, e
+            else:
+                error = None
+            self.stats['commands'] += 1
+            if self.after_command is not None:
+                # Une publication en échec ne doit pas arrêter le fil (toutes les
+                # commandes suivantes attendraient indéfiniment): seule la commande
+                # courante échoue
+                try:
+                    self.after_command()
+                except Exception as e:
+                    logging.getLogger(self.thread.name).exception("Publication de l'instantané en échec")
+                    if error is None:
+                        self.stats['failed'] += 1
+                        result, error = None, e
+            self.running = False
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+    
+    def is_idle(self) -> bool:
+        return not self.running and self.commands.empty()
+    
+    def close(self):
+        self.commands.put(None)
+
+class AccountsSnapshot:
+    """Copie figée des comptes {adresse: (solde, stake, dernière activité)}
+    
+    Copie sur écriture: update() ne touche pas l'instantané courant, il en
+    renvoie un nouveau qui partage la même base et ne recopie que les comptes
+    modifiés (delta). Le delta est fusionné dans une nouvelle base quand il
+    dépasse SNAPSHOT_DELTA_SIZE comptes. None signifie absent du dictionnaire.
+    """
+    __slots__ = ('base', 'delta')
+    
+    def __init__(self, base: Dict[str, tuple], delta: Dict[str, tuple] = None):
+        self.base = base
+        self.delta = delta or {}
+    
+    @staticmethod
+    def entry(state, address: str) -> tuple:
+        return (state.balances.get(address), state.validators.get(address),
+                state.last_activity.get(address))
+    
+    @staticmethod
+    def capture(state) -> 'AccountsSnapshot':
+        addresses = set(state.balances) | set(state.validators) | set(state.last_activity)
+        return AccountsSnapshot({a: AccountsSnapshot.entry(state, a) for a in addresses})
+    
+    def update(self, state, addresses) -> 'AccountsSnapshot':
+        delta = dict(self.delta)
+        for address in addresses:
+            delta[address] = self.entry(state, address)
+        if len(delta) > SNAPSHOT_DELTA_SIZE:
+            base = dict(self.base)
+            base.update(delta)
+            return AccountsSnapshot(base)
+        return AccountsSnapshot(self.base, delta)
+    
+    def get(self, address: str) -> tuple:
+        entry = self.delta.get(address)
+        if entry is None:
+            entry = self.base.get(address)
+        return entry if entry is not None else (None, None, None)
+    
+    def items(self):
+        for address, entry in self.base.items():
+            if address not in self.delta:
+                yield address, entry
+        yield from self.delta.items()
+    
+    def column(self, index: int):
+        return ((a, entry[index]) for a, entry in self.items() if entry[index] is not None)
+    
+    # Même interface de requêtes que MemoryState / SQLiteState
+    def top_balances(self, limit: int) -> List[tuple]:
+        return heapq.nlargest(limit, self.column(0), key=lambda item: item[1])
+    
+    def validators_by_stake(self, limit: int) -> List[tuple]:
+        return heapq.nlargest(limit, self.column(1), key=lambda item: item[1])
+    
+    def inactive_accounts(self, before: float, limit: int) -> List[tuple]:
+        inactive = ((a, t) for a, t in self.column(2) if t < before)
+        return heapq.nsmallest(limit, inactive, key=lambda item: item[1])
+    
+    def count_validators(self) -> int:
+        return sum(1 for _ in self.column(1))
+
+class ReadSnapshot:
+    """Vue figée de la chaîne et des comptes, publiée par le fil d'écriture après chaque commande
+    
+    La chaîne ne change que par ajout en fin, et une réorganisation la remplace
+    par un nouvel objet: les height premiers blocs de chain ne bougent plus.
+    accounts vaut None avec un état SQLite (les comptes ne sont pas recopiés
+    en mémoire): les lectures de comptes passent alors par le fil d'écriture.
+    """
+    __slots__ = ('version', 'chain', 'height', 'accounts')
+    
+    def __init__(self, version: int, chain, height: int, accounts: Optional[AccountsSnapshot] = None):
+        self.version = version
+        self.chain = chain
+        self.height = height
+        self.accounts = accounts
+
+class ChainEngine:
+    """Moteur d'accès à la blockchain: un seul écrivain, des lecteurs sans verrou
+    
+    Toute modification (transactions, blocs, validateurs, synchronisation,
+    remplacement de la blockchain) passe par execute(), qui la met dans la file
+    du fil d'écriture. Après chaque commande, le fil d'écriture publie un
+    nouveau ReadSnapshot; read() renvoie le dernier publié sans attendre.
+    """
+    
+    def __init__(self, blockchain: SimplePoSBlockchain):
+        self.blockchain = blockchain
+        self.snapshot: Optional[ReadSnapshot] = None
+        self._published_for = None  # Blockchain décrite par self.snapshot
+        self.publish()
+        self.writer = SerialWriter(after_command=self.publish)
     
-    def get_balance(self, address: str) -> float:
-        return self.balances.get(address, 0)
+    def execute(self, command, *args, **kwargs):
+        """Exécute command sur le fil d'écriture et renvoie son résultat"""
+        return self.writer.call(command, *args, **kwargs)
     
-    def mint_tokens(self, address: str, amount: float):
-        tx = Transaction("SYSTEM", address, amount, tx_type="MINT")
-        self.add_transaction(tx)
-        self.balances[address] = self.get_balance(address) + amount
-        self.update_activity(address)
+    def command(self, name: str, *args, **kwargs):
+        """Exécute blockchain.<name>(...) sur le fil d'écriture; la blockchain est
+        résolue au moment de l'exécution (elle a pu être remplacée entre-temps)"""
+        return self.execute(lambda: getattr(self.blockchain, name)(*args, **kwargs))
     
-    def is_valid(self) -> bool:
-        for i in range(1, len(self.chain)):
-            current = self.chain[i]
-            previous = self.chain[i-1]
-            
-            if current.hash != current.calculate_hash():
-                return False
-            if current.previous_hash != previous.hash:
-                return False
-            for tx in current.transactions:
-                if not tx.is_valid():
-                    return False
-        
-        # PROTECTION 6: Vérifier la cohérence des balances
-        return self.verify_balance_consistency()
+    def replace(self, blockchain: SimplePoSBlockchain):
+        """Remplace la blockchain entière (commande d'écriture)"""
+        def swap():
+            self.blockchain = blockchain
+        self.execute(swap)
     
-    def verify_balance_consistency(self) -> bool:
-        """PROTECTION 6: Vérifie la cohérence des balances en recalculant depuis le genesis"""
-        calculated_balances: Dict[str, float] = {}
-        
-        # Parcourir tous les blocs et recalculer les balances
-        for block in self.chain:
-            for tx in block.transactions:
-                if tx.sender not in ["SYSTEM"]:
-                    calculated_balances[tx.sender] = calculated_balances.get(tx.sender, 0) - (tx.amount + tx.fee)
-                calculated_balances[tx.recipient] = calculated_balances.get(tx.recipient, 0) + tx.amount
-            
-            # Ajouter la récompense du validateur
-            if block.validator and block.validator != "SYSTEM":
-                block_fees = sum(tx.fee for tx in block.transactions if tx.sender not in ["SYSTEM"])
-                reward = self.block_reward + block_fees
-                calculated_balances[block.validator] = calculated_balances.get(block.validator, 0) + reward
-        
-        # Comparer avec les balances actuelles
-        all_addresses = set(calculated_balances.keys()) | set(self.balances.keys())
-        for address in all_addresses:
-            calculated = calculated_balances.get(address, 0)
-            actual = self.balances.get(address, 0)
-            # Tolérance de 0.0001 pour les erreurs d'arrondi
-            if abs(calculated - actual) > 0.0001:
-                return False
-        
-        return True
+    def is_stale(self) -> bool:
+        blockchain = self.blockchain
+        snapshot = self.snapshot
+        return (self._published_for is not blockchain or snapshot.version != blockchain.version
+                or snapshot.chain is not blockchain.chain or blockchain.changed_accounts != set())
     
-    def get_account_info(self, address: str) -> Dict:
-        """Informations complètes sur un compte"""
-        inactive_time = self.get_inactive_time(address)
-        
-        return {
-            'address': address,
-            'balance': self.get_balance(address),
-            'staked': self.validators.get(address, 0),
-            'total': self.get_balance(address) + self.validators.get(address, 0),
-            'is_validator': address in self.validators,
-            'last_activity': self.last_activity.get(address, 0),
-            'inactive_time': inactive_time,
-            'inactive_days': inactive_time / (24 * 3600)
-        }
+    def publish(self):
+        """Publie la vue de lecture (appelé par le fil d'écriture)"""
+        if self.snapshot is not None and not self.is_stale():
+            return
+        blockchain = self.blockchain
+        changed = blockchain.take_changed_accounts()
+        accounts = None
+        if not blockchain.state.persistent:
+            previous = self.snapshot.accounts if self.snapshot is not None else None
+            if previous is None or changed is None or self._published_for is not blockchain:
+                accounts = AccountsSnapshot.capture(blockchain)
+            else:
+                accounts = previous.update(blockchain, changed)
+        blockchain.get_block_index('')  # Index hash -> position prêt pour les lectures
+        self.snapshot = ReadSnapshot(blockchain.version, blockchain.chain, len(blockchain.chain), accounts)
+        self._published_for = blockchain
     
-    def to_dict(self) -> Dict:
-        return {
-            'chain': [block.to_dict() for block in self.chain],
-            'pending_transactions': [tx.to_dict() for tx in self.pending_transactions],
-            'validators': self.validators,
-            'balances': self.balances,
-            'last_activity': self.last_activity,
-            'min_stake': self.min_stake,
-            'block_reward': self.block_reward,
-            'transaction_fees_pool': self.transaction_fees_pool,
-            'treasury_address': self.treasury_address,
-            'inactivity_threshold': self.inactivity_threshold
-        }
+    def read(self) -> ReadSnapshot:
+        """Dernière vue publiée; sans commande en cours, rattrape les modifications
+        faites hors du fil d'écriture (initialisation, scripts)"""
+        if self.writer.is_idle() and self.is_stale():
+            self.execute(lambda: None)  # La publication suit chaque commande
+        return self.snapshot
     
-    @staticmethod
-    def from_dict(data: Dict) -> 'SimplePoSBlockchain':
-        blockchain = SimplePoSBlockchain(
-            data['min_stake'],
-            data.get('treasury_address')
-        )
-        blockchain.chain = [Block.from_dict(b) for b in data['chain']]
-        blockchain.pending_transactions = [Transaction.from_dict(tx) for tx in data['pending_transactions']]
-        blockchain.validators = data['validators']
-        blockchain.balances = data['balances']
-        blockchain.last_activity = data.get('last_activity', {})
-        blockchain.block_reward = data['block_reward']
-        blockchain.transaction_fees_pool = data['transaction_fees_pool']
-        blockchain.inactivity_threshold = data.get('inactivity_threshold', INACTIVITY_THRESHOLD)
-        return blockchain
+    def close(self):
+        self.writer.close()
+
+class StageTimings:
+    """Latences d'un traitement par étapes (ms): moyenne, p50, p99 et maximum
+    de chaque étape sur les IMPORT_STATS_WINDOW derniers passages"""
+    
+    def __init__(self, window: int = IMPORT_STATS_WINDOW):
+        self.lock = threading.Lock()
+        self.counts = {'accepted': 0, 'rejected': 0}
+        self.recent: deque = deque(maxlen=window)
+    
+    def record(self, timings: Dict[str, float], accepted: bool):
+        with self.lock:
+            self.counts['accepted' if accepted else 'rejected'] += 1
+            self.recent.append(timings)
+    
+    def summary(self) -> Dict:
+        with self.lock:
+            recent = list(self.recent)
+            summary = dict(self.counts)
+        stages: Dict[str, List[float]] = {}
+        for timings in recent:
+            for stage, duration in timings.items():
+                stages.setdefault(stage, []).append(duration)
+        summary['stages_ms'] = {}
+        for stage, durations in stages.items():
+            durations.sort()
+            summary['stages_ms'][stage] = {
+                'mean': round(sum(durations) / len(durations), 3),
+                'p50': round(durations[len(durations) // 2], 3),
+                'p99': round(durations[int(len(durations) * 0.99)], 3),
+                'max': round(durations[-1], 3)
+            }
+        return summary
+
+class WaitressServer:
+    """Serveur waitress avec la même interface que celui de werkzeug
+    (serve_forever, shutdown, server_port)"""
+    
+    def __init__(self, app, host: str, port: int, threads: int):
+        self.server = waitress.create_server(app, host=host, port=port, threads=threads)
+        self.server_port = self.server.effective_port
+    
+    def serve_forever(self):
+        self.server.run()
+    
+    def shutdown(self):
+        self.server.close()
 
 # ============================================================================
 # NODE - API REST
 # ============================================================================
 
 class Node:
-    def __init__(self, port: int, treasury_address: str = None):
+    def __init__(self, port: int, treasury_address: str = None, store: ChainStore = None,
+                 state=None, public_url: str = None):
         self.port = port
-        self.blockchain = SimplePoSBlockchain(treasury_address=treasury_address)
+        self.public_url = public_url  # URL sous laquelle les peers joignent ce nœud
+        # Un seul fil modifie la blockchain; les lectures passent par les instantanés du moteur
+        self.engine = ChainEngine(SimplePoSBlockchain(treasury_address=treasury_address, store=store, state=state))
         self.peers: List[str] = []
         self.malicious_peers: List[str] = []  # Liste des nœuds malveillants (trésor différent)
         
         # PROTECTION 5: Rate limiting - suivi des requêtes par IP
         self.rate_limit: Dict[str, List[float]] = {}  # {ip: [timestamps]}
+        self.rate_limit_lock = threading.Lock()
         self.rate_limit_window = 60  # Fenêtre de 60 secondes
         self.rate_limit_max_requests = 100  # Maximum de requêtes par fenêtre
         
@@ -524,6 +3268,24 @@ class Node:
         self.setup_logging()
         self.suspicious_activities: List[Dict] = []  # Historique des activités suspectes
         
+        # Diffusion asynchrone aux peers, par annonce d'inventaire
+        self.gossip = GossipDispatcher(getdata=self.get_inventory_body, origin=public_url)
+        self.inventory_lock = threading.Lock()
+        self.known_inventory: Dict[str, InventorySet] = {}  # {peer: hash qu'il connaît déjà}
+        self.requested_inventory = InventorySet()  # Objets demandés récemment à un peer
+        
+        # Surveillance des peers en arrière-plan: latence, hauteur, trésor
+        self.peer_manager = PeerManager(lambda: self.peers, on_malicious=self.mark_peer_malicious)
+        
+        # Contrôles sans état des lots de transactions, répartis sur des processus
+        self.verifier = TransactionVerifier()
+        
+        # Latences de l'import des blocs reçus, par étape
+        self.import_timings = StageTimings()
+        
+        # Statut mis en cache: (clé de version, corps JSON, ETag)
+        self._status_cache: Optional[Tuple[tuple, bytes, str]] = None
+        
         self.app = Flask(__name__)
         self.setup_routes()
     
@@ -560,7 +3322,10 @@ class Node:
     def check_rate_limit(self, ip: str) -> bool:
         """Vérifie si une IP respecte les limites de taux"""
         now = time.time()
-        
+        with self.rate_limit_lock:
+            return self._check_rate_limit(ip, now)
+    
+    def _check_rate_limit(self, ip: str, now: float) -> bool:
         # Nettoyer les anciennes requêtes
         if ip in self.rate_limit:
             self.rate_limit[ip] = [
@@ -578,22 +3343,392 @@ class Node:
         self.rate_limit[ip].append(now)
         return True
     
-    def is_peer_malicious(self, peer_url: str) -> bool:
-        """Vérifie si un peer est malveillant (trésor différent)"""
+    @property
+    def blockchain(self) -> SimplePoSBlockchain:
+        return self.engine.blockchain
+    
+    @blockchain.setter
+    def blockchain(self, blockchain: SimplePoSBlockchain):
+        self.engine.replace(blockchain)
+    
+    def serialized(self, handler):
+        """Décorateur de route: le handler s'exécute sur le fil d'écriture (avec sa requête)"""
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            return self.engine.execute(copy_current_request_context(handler), *args, **kwargs)
+        return wrapper
+    
+    def read_accounts(self, query, *args):
+        """Requête sur les comptes: sur l'instantané publié, ou sur le fil
+        d'écriture quand les comptes ne sont pas recopiés en mémoire (SQLite)"""
+        accounts = self.engine.read().accounts
+        if accounts is not None:
+            return query(*args, accounts=accounts)
+        return self.engine.execute(query, *args)
+    
+    def mark_peer_malicious(self, peer: str):
+        """Exclut un peer dont le trésor diffère de l'adresse officielle"""
+        if peer not in self.malicious_peers:
+            self.malicious_peers.append(peer)
+        self.peers = [p for p in self.peers if p != peer]
+        print(f"\n{'='*70}")
+        print("🚨 NOEUD MALVEILLANT DÉTECTÉ")
+        print(f"{'='*70}")
+        print(f"Peer rejeté: {peer}")
+        print(f"Raison: Adresse de trésor différente de l'adresse officielle")
+        print(f"Adresse officielle: {DEFAULT_TREASURY_ADDRESS}")
+        print(f"Ce nœud est exclu du consensus et ne sera pas connecté.")
+        print(f"{'='*70}\n")
+    
+    def build_status(self) -> Dict:
+        # PROTECTION 6: Vérifier la cohérence des balances (blocs récents uniquement)
+        valid = self.blockchain.is_valid()
+        balance_consistent = self.blockchain.check_balance_consistency()
+        
+        return {
+            'blocks': len(self.blockchain.chain),
+            'pending_transactions': len(self.blockchain.pending_transactions),
+            'validators': len(self.blockchain.validators),
+            'validator_list': list(self.blockchain.validators.keys()),
+            'min_stake': self.blockchain.min_stake,
+            'block_reward': self.blockchain.block_reward,
+            'valid': valid,
+            'verified_height': self.blockchain.verified_height,
+            'state_digest': self.blockchain.state_digest,
+            'treasury': self.blockchain.treasury_address,
+            'treasury_balance': self.blockchain.get_balance(self.blockchain.treasury_address) if self.blockchain.treasury_address else 0,
+            'inactivity_threshold_days': self.blockchain.inactivity_threshold / (24 * 3600),
+            'is_official_treasury': self.blockchain.treasury_address == DEFAULT_TREASURY_ADDRESS,
+            'malicious_peers_count': len(self.malicious_peers),
+            'balance_consistent': balance_consistent,  # PROTECTION 6
+            'suspicious_activities_count': len(self.suspicious_activities)  # PROTECTION 8
+        }
+    
+    def get_status_snapshot(self) -> Tuple[bytes, str]:
+        """Statut en cache (corps JSON et ETag), reconstruit uniquement après une modification"""
+        key = (self.blockchain.version, len(self.malicious_peers), len(self.suspicious_activities))
+        cached = self._status_cache
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+        # build_status fait avancer les curseurs de validation: reconstruction sur le fil d'écriture
+        return self.engine.execute(self._refresh_status)
+    
+    def _refresh_status(self) -> Tuple[bytes, str]:
+        key = (self.blockchain.version, len(self.malicious_peers), len(self.suspicious_activities))
+        cached = self._status_cache
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]  # Déjà reconstruit pour une requête précédente
+        
+        body = json.dumps(self.build_status(), sort_keys=True).encode()
+        etag = hashlib.sha3_256(body).hexdigest()[:32]
+        self._status_cache = (key, body, etag)
+        return body, etag
+    
+    @staticmethod
+    def parse_limit(value, default: int, maximum: int) -> int:
+        """Paramètre limit d'une requête, borné à [0, maximum]
+        
+        Lève ValueError si la valeur n'est pas un entier (la route répond 400).
+        """
+        if value is None:
+            return default
         try:
-            response = requests.get(f"{peer_url}/blockchain/status", timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                peer_treasury = data.get('treasury')
-                expected_treasury = DEFAULT_TREASURY_ADDRESS
-                
-                # Si le peer n'a pas de trésor ou a un trésor différent, il est malveillant
-                if peer_treasury is None or peer_treasury != expected_treasury:
-                    return True
-            return False
-        except:
-            # En cas d'erreur, on considère le peer comme suspect
-            return True
+            limit = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'Paramètre limit invalide: {value!r}')
+        return max(0, min(limit, maximum))
+    
+    def get_block_range(self, page_size: int, length: int) -> Tuple[int, int, bool]:
+        """Plage [from, to[ demandée (indices négatifs comptés depuis la fin)
+        
+        Retourne (début, fin, diffusion): la plage est diffusée en NDJSON si elle
+        dépasse page_size ou si ?format=ndjson est demandé (par défaut jusqu'au bout).
+        """
+        ndjson = request.args.get('format') == 'ndjson'
+        start = request.args.get('from', 0, type=int)
+        if start < 0:
+            start = max(0, length + start)
+        stop = request.args.get('to', type=int)
+        if stop is None:
+            # Un flux va jusqu'au bout de la chaîne, une page JSON s'arrête à page_size
+            stop = length if ndjson else start + page_size
+        elif stop < 0:
+            stop = length + stop
+        start, stop = min(start, length), max(min(stop, length), min(start, length))
+        return start, stop, ndjson or stop - start > page_size
+    
+    def range_response(self, key: str, snapshot: ReadSnapshot, start: int, stop: int,
+                       stream: bool, serialize):
+        """Page JSON ou flux NDJSON produit bloc par bloc par un générateur"""
+        chain = snapshot.chain
+        if stream:
+            def generate():
+                for index in range(start, stop):
+                    yield json.dumps(serialize(chain[index])) + '\n'
+            return Response(generate(), mimetype='application/x-ndjson')
+        
+        return jsonify({
+            'from': start,
+            'to': stop,
+            'height': snapshot.height,
+            key: [serialize(chain[index]) for index in range(start, stop)]
+        })
+    
+    @staticmethod
+    def serialize_header(block: Block) -> Dict:
+        header = block.get_header()
+        header['hash'] = block.hash
+        header['transactions_count'] = len(block.transactions)
+        return header
+    
+    def sync_with_peer(self, peer: str) -> Tuple[Dict, int]:
+        """Synchronisation par en-têtes depuis un peer
+        
+        1. Envoi d'un locator: le peer répond par les en-têtes qui suivent le
+           dernier ancêtre commun (par pages de HEADERS_PAGE_SIZE).
+        2. Vérification du chaînage et du hash des en-têtes.
+        3. Téléchargement des blocs correspondants par lots de BLOCKS_PAGE_SIZE,
+           appliqués un par un dans l'ordre: rattraper N blocs coûte O(N).
+        En cas de fork, la chaîne locale n'est abandonnée qu'une fois les blocs de
+        la branche du peer téléchargés et vérifiés, et seulement si elle est plus
+        longue (règle de la plus longue chaîne).
+        Les blocs sont téléchargés en parallèle auprès de ce peer et des autres
+        peers sains (voir download_blocks).
+        Retourne (résultat JSON, code HTTP).
+        """
+        peer = peer.rstrip('/')
+        body_peers = [peer] + [p for p in self.peer_manager.ranked(self.peers)
+                               if p != peer and p not in self.malicious_peers]
+        blockchain = self.blockchain
+        applied = 0
+        reorganized = False
+        
+        while True:
+            response = requests.post(f"{peer}/sync/headers",
+                                     json={'locator': blockchain.get_block_locator()},
+                                     timeout=SYNC_TIMEOUT).json()
+            
+            # Vérifier que le trésor du peer correspond à l'adresse officielle
+            if response['treasury'] != DEFAULT_TREASURY_ADDRESS:
+                print(f"\n🚨 TENTATIVE DE SYNCHRONISATION MALVEILLANTE REJETÉE")
+                print(f"   Trésor reçu: {response['treasury']}")
+                print(f"   Trésor officiel: {DEFAULT_TREASURY_ADDRESS}")
+                return {
+                    'success': False,
+                    'error': 'Blockchain malveillante rejetée',
+                    'message': 'Cette blockchain utilise une adresse de trésor différente et est exclue du consensus',
+                    'received_treasury': response['treasury'],
+                    'official_treasury': DEFAULT_TREASURY_ADDRESS
+                }, 403
+            
+            # La hauteur annoncée par le peer n'est pas utilisée: seuls comptent les
+            # en-têtes reçus puis les blocs effectivement validés
+            headers = response['headers']
+            if not headers:
+                break
+            ancestor = response['ancestor']
+            if ancestor is not None and not 0 <= ancestor < len(blockchain.chain):
+                return {'success': False, 'error': 'Ancêtre commun inconnu', 'applied': applied}, 400
+            start = 0 if ancestor is None else ancestor + 1
+            if start < len(blockchain.chain):
+                # Fork: pages suivantes de la branche, jusqu'à dépasser la chaîne locale
+                try:
+                    headers = self.fetch_branch_headers(peer, headers, start, len(blockchain.chain))
+                except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+                    return {'success': False, 'error': str(e), 'applied': applied}, 400
+                if start + len(headers) <= len(blockchain.chain):
+                    break  # Branche du peer pas plus longue: la chaîne locale est conservée
+            
+            # Les en-têtes doivent former une chaîne continue à partir de l'ancêtre commun
+            previous_hash = blockchain.chain[ancestor].hash if ancestor is not None else None
+            for offset, header in enumerate(headers):
+                if header['index'] != start + offset:
+                    return {'success': False, 'error': 'En-têtes non consécutifs', 'applied': applied}, 400
+                if previous_hash is not None and header['previous_hash'] != previous_hash:
+                    return {'success': False, 'error': 'En-têtes non chaînés', 'applied': applied}, 400
+                if header['version'] >= BLOCK_VERSION and Block.hash_header(header) != header['hash']:
+                    return {'success': False, 'error': 'Hash d\'en-tête invalide', 'applied': applied}, 400
+                previous_hash = header['hash']
+            
+            download = self.download_blocks(body_peers, headers)
+            try:
+                if start < len(blockchain.chain):
+                    # Fork: la branche du peer est entièrement téléchargée avant d'abandonner
+                    # la nôtre, puis substituée en une seule commande d'écriture
+                    blocks, valid = zip(*download)
+                    count, error = self.engine.execute(self.apply_synced_blocks, list(blocks), start, list(valid))
+                    if error is not None:
+                        return {'success': False, 'error': error, 'applied': applied}, 400
+                    applied += count
+                    reorganized = True
+                else:
+                    for block, valid in download:
+                        count, error = self.engine.execute(self.apply_synced_blocks, [block], None, [valid])
+                        applied += count
+                        if error is not None:
+                            return {'success': False, 'error': error, 'applied': applied}, 400
+            except ValueError as e:
+                return {'success': False, 'error': str(e), 'applied': applied}, 400
+            finally:
+                download.close()  # Arrête les téléchargements en cours en cas d'erreur
+        
+        if applied == 0:
+            return {'success': False, 'message': 'Blockchain locale plus longue ou à jour', 'applied': 0}, 200
+        return {
+            'success': True,
+            'message': 'Blockchain synchronisée',
+            'applied': applied,
+            'reorganized': reorganized,
+            'height': len(blockchain.chain)
+        }, 200
+    
+    def fetch_branch_headers(self, peer: str, headers: List[Dict], start: int, height: int) -> List[Dict]:
+        """Complète les en-têtes d'une branche concurrente commençant à l'index start
+        
+        Les pages suivantes sont demandées avec le dernier en-tête reçu comme
+        locator, jusqu'à la fin de la chaîne du peer ou jusqu'à dépasser height
+        (la hauteur locale): la mémoire reste bornée par la longueur du fork.
+        Lève ValueError si une page ne suit pas la précédente.
+        """
+        headers = list(headers)
+        while start + len(headers) <= height:
+            response = requests.post(f"{peer}/sync/headers",
+                                     json={'locator': [headers[-1]['hash']]},
+                                     timeout=SYNC_TIMEOUT).json()
+            page = response['headers']
+            if not page:
+                break
+            if response['ancestor'] != start + len(headers) - 1:
+                raise ValueError('Pages d\'en-têtes non consécutives')
+            headers.extend(page)
+        return headers
+    
+    def import_received_block(self, block: Block, queued: float, timings: Dict[str, float]) -> Optional[tuple]:
+        """Commande d'écriture: étapes avec état et application d'un bloc reçu"""
+        timings['queue'] = (time.perf_counter() - queued) * 1000
+        return self.blockchain.import_block(block, timings)
+    
+    def apply_synced_blocks(self, blocks: List[Block], rollback_to: int = None,
+                            valid: List[List[bool]] = None) -> Tuple[int, Optional[str]]:
+        """Commande d'écriture: réorganisation éventuelle puis application des blocs synchronisés
+        
+        valid: pour chaque bloc, résultats des contrôles sans état de ses
+        transactions (calculés au téléchargement). Retourne (blocs appliqués,
+        erreur ou None).
+        """
+        if rollback_to is not None:
+            # Toute la branche est validée avant d'abandonner la chaîne locale: en cas
+            # d'erreur, la chaîne, l'état et le stockage restent intacts
+            count, error = self.blockchain.check_branch(rollback_to, blocks, valid)
+            if error is not None:
+                return 0, f'Bloc {blocks[count].index} refusé: {error}'
+            # Règle de la plus longue chaîne, sur les blocs validés (jamais sur la hauteur annoncée)
+            if rollback_to + count <= len(self.blockchain.chain):
+                return 0, 'Branche du peer pas plus longue que la chaîne locale'
+            self.blockchain.rollback(rollback_to)
+        for count, block in enumerate(blocks):
+            error = self.blockchain.apply_synced_block(block, valid[count] if valid is not None else None)
+            if error is not None:
+                return count, error
+        return len(blocks), None
+    
+    def download_blocks(self, peers: List[str], headers: List[Dict]) -> Iterator[Tuple[Block, List[bool]]]:
+        """Télécharge en parallèle les blocs décrits par headers et les rend dans l'ordre
+        
+        La plage est découpée en lots de BLOCKS_PAGE_SIZE répartis entre les peers
+        (SYNC_WORKERS requêtes simultanées au plus). Un lot en échec (peer lent,
+        injoignable, ou blocs différents des en-têtes) est redemandé aux peers
+        suivants; les peers défaillants passent en dernier pour les lots suivants
+        et l'échec est signalé au gestionnaire de peers.
+        Au plus 2 * SYNC_WORKERS lots sont téléchargés en avance sur l'application.
+        Les contrôles sans état des transactions de chaque lot sont faits dès son
+        arrivée (TransactionVerifier): chaque bloc est rendu avec leurs résultats.
+        Lève ValueError si un lot n'a pu être obtenu d'aucun peer.
+        """
+        first = headers[0]['index']
+        chunks = [(chunk_start, min(chunk_start + BLOCKS_PAGE_SIZE, first + len(headers)))
+                  for chunk_start in range(first, first + len(headers), BLOCKS_PAGE_SIZE)]
+        failed_peers = set()
+        
+        def fetch(number: int) -> List[Tuple[Block, List[bool]]]:
+            chunk_start, chunk_stop = chunks[number]
+            expected = [header['hash'] for header in headers[chunk_start - first:chunk_stop - first]]
+            # Répartition des lots entre peers, les peers défaillants en dernier
+            rotation = peers[number % len(peers):] + peers[:number % len(peers)]
+            candidates = sorted(rotation, key=lambda peer: peer in failed_peers)
+            error = None
+            for peer in candidates:
+                try:
+                    response = requests.get(f"{peer}/blocks",
+                                            params={'from': chunk_start, 'to': chunk_stop},
+                                            timeout=SYNC_BLOCKS_TIMEOUT)
+                    blocks = [Block.from_dict(data) for data in response.json()['blocks']]
+                    if [block.hash for block in blocks] != expected:
+                        error = 'blocs différents des en-têtes'
+                    else:
+                        # Signatures vérifiées seulement pour des blocs bien formés
+                        malformed = next(filter(None, map(self.blockchain.check_block_structure, blocks)), None)
+                        if malformed is None:
+                            return list(zip(blocks, self.verifier.verify_blocks(blocks)))
+                        error = malformed[0]
+                except (requests.RequestException, ValueError, KeyError) as e:
+                    error = str(e)
+                failed_peers.add(peer)
+                self.peer_manager.report_failure(peer)
+            raise ValueError(f'Blocs {chunk_start}-{chunk_stop - 1} indisponibles: {error}')
+        
+        workers = min(SYNC_WORKERS, len(chunks))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            submitted = 0
+            for number in range(len(chunks)):
+                while submitted < len(chunks) and submitted < number + 2 * workers:
+                    futures[submitted] = pool.submit(fetch, submitted)
+                    submitted += 1
+                yield from futures.pop(number).result()
+    
+    def catch_up(self) -> Tuple[Dict, int]:
+        """Rattrapage depuis le peer sain le plus haut (blocs téléchargés auprès de tous)
+        
+        Les peers sont sondés simultanément juste avant, pour partir de hauteurs fraîches.
+        """
+        candidates = [peer for peer in self.peers if peer not in self.malicious_peers]
+        self.peer_manager.probe_all(candidates)
+        best_peer = self.peer_manager.best_peer(candidates, len(self.blockchain.chain))
+        
+        if best_peer is None:
+            return {'success': False, 'message': 'Blockchain locale plus longue ou à jour', 'applied': 0}, 200
+        return self.sync_with_peer(best_peer)
+    
+    def accept_relayed_transaction(self, data: Dict, tx: Transaction = None, valid: bool = None) -> Dict:
+        """Valide et ajoute une transaction relayée par un peer; la relaie si elle est nouvelle
+        
+        tx et valid: transaction déjà décodée et résultat de tx.is_valid() déjà
+        calculé (lots vérifiés par TransactionVerifier).
+        """
+        try:
+            if tx is None:
+                tx = Transaction.from_dict(data)
+            tx_hash = tx.get_hash()
+            
+            # Les transactions système ne sont créées que localement (mint, récompenses)
+            if tx.sender in ["SYSTEM"]:
+                return {'success': False, 'hash': tx_hash, 'error': 'Transactions système refusées'}
+            
+            # Vérifier que la transaction est valide
+            if not (tx.is_valid() if valid is None else valid):
+                return {'success': False, 'hash': tx_hash, 'error': 'Transaction invalide'}
+            
+            # Ajouter la transaction à la pool si elle n'existe pas déjà
+            if tx_hash in self.blockchain.pending_transactions:
+                return {'success': True, 'hash': tx_hash, 'message': 'Transaction déjà présente'}
+            if not self.engine.command('add_transaction', tx, checked=True):
+                return {'success': False, 'hash': tx_hash,
+                        'error': 'Transaction rejetée (solde insuffisant ou invalide)'}
+            self.broadcast_transaction(tx)  # Relais aux autres peers
+            return {'success': True, 'hash': tx_hash, 'message': 'Transaction reçue et ajoutée'}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
     
     def setup_routes(self):
         
@@ -615,13 +3750,19 @@ class Node:
         
         @self.app.route('/health', methods=['GET'])
         def health():
-            return jsonify({'status': 'online', 'port': self.port})
+            # Hauteur et trésor: relevés par les sondes des peers, sans recalcul
+            return jsonify({
+                'status': 'online',
+                'port': self.port,
+                'height': self.engine.read().height,
+                'treasury': self.blockchain.treasury_address
+            })
         
         @self.app.route('/wallet/create', methods=['POST'])
         def create_wallet():
-            wallet = QuantumAddress()
+            wallet = QuantumAddress()  # Génération des clés hors du fil d'écriture
             # Enregistrer la création comme première activité
-            self.blockchain.update_activity(wallet.address)
+            self.engine.command('update_activity', wallet.address)
             return jsonify({
                 'success': True,
                 'wallet': wallet.to_dict(),
@@ -630,9 +3771,10 @@ class Node:
         
         @self.app.route('/wallet/balance/<address>', methods=['GET'])
         def get_balance(address):
-            return jsonify(self.blockchain.get_account_info(address))
+            return jsonify(self.read_accounts(self.blockchain.get_account_info, address))
         
         @self.app.route('/wallet/activity/<address>', methods=['POST'])
+        @self.serialized
         def update_activity(address):
             """Permet de mettre à jour manuellement l'activité d'une adresse"""
             self.blockchain.update_activity(address)
@@ -650,16 +3792,18 @@ class Node:
             if not all(k in data for k in required):
                 return jsonify({'success': False, 'error': 'Champs manquants'}), 400
             
-            wallet = QuantumAddress()
-            wallet.private_key = data['private_key']
-            wallet.public_key = hashlib.sha3_512(wallet.private_key.encode()).hexdigest()
-            addr_hash = hashlib.sha3_256(wallet.public_key.encode()).hexdigest()
-            checksum = hashlib.sha3_256(addr_hash.encode()).hexdigest()[:6]
-            wallet.address = f"Q{addr_hash[:40]}{checksum}"
+            # Clés (et arbres de signature) reconstruites hors du fil d'écriture
+            try:
+                wallet = QuantumAddress.from_private_key(data['private_key'])
+            except (TypeError, ValueError):
+                wallet = None
             
-            if wallet.address != data['sender']:
+            if wallet is None or wallet.address != data['sender']:
                 return jsonify({'success': False, 'error': 'Clé privée invalide'}), 400
             
+            return self.engine.execute(copy_current_request_context(submit_transaction), data, wallet)
+        
+        def submit_transaction(data: Dict, wallet: QuantumAddress):
             # PROTECTION 1: Calculer le nonce attendu si non fourni
             if 'nonce' not in data or data.get('nonce') is None:
                 expected_nonce = self.blockchain.get_next_expected_nonce(data['sender'])
@@ -672,7 +3816,10 @@ class Node:
                 float(data.get('fee', 0.01)),
                 int(data['nonce'])
             )
-            tx.sign(wallet)
+            try:
+                tx.sign(wallet)
+            except ValueError as e:  # Nonce au-delà des clés de signature de l'adresse
+                return jsonify({'success': False, 'error': str(e)}), 400
             
             # PROTECTION 2: Vérifier la signature avant d'ajouter
             if not tx.is_valid():
@@ -693,8 +3840,8 @@ class Node:
                     'error': 'Transaction invalide: signature ou montants invalides'
                 }), 400
             
-            if self.blockchain.add_transaction(tx):
-                self.broadcast_transaction(tx.to_dict())
+            if self.blockchain.add_transaction(tx, checked=True):
+                self.broadcast_transaction(tx)
                 return jsonify({
                     'success': True,
                     'transaction': tx.to_dict(),
@@ -704,7 +3851,7 @@ class Node:
             else:
                 # Fournir plus de détails sur l'erreur
                 expected_nonce = self.blockchain.get_next_expected_nonce(data['sender'])
-                pending_count = sum(1 for t in self.blockchain.pending_transactions if t.sender == data['sender'])
+                pending_count = self.blockchain.pending_transactions.count_for(data['sender'])
                 
                 error_msg = 'Transaction rejetée'
                 if tx.nonce < expected_nonce:
@@ -731,6 +3878,7 @@ class Node:
                 }), 400
         
         @self.app.route('/validator/register', methods=['POST'])
+        @self.serialized
         def register_validator():
             data = request.get_json()
             
@@ -746,10 +3894,11 @@ class Node:
                 return jsonify({'success': False, 'error': 'Enregistrement échoué'}), 400
         
         @self.app.route('/block/mine', methods=['POST'])
+        @self.serialized
         def mine_block():
             block = self.blockchain.create_block()
             if block:
-                self.broadcast_block(block.to_dict())
+                self.broadcast_block(block)
                 return jsonify({
                     'success': True,
                     'block': block.to_dict(),
@@ -760,185 +3909,303 @@ class Node:
         
         @self.app.route('/block/receive', methods=['POST'])
         def receive_block():
-            """Reçoit un bloc d'un autre nœud (PROTECTION 4: Validation stricte)"""
-            data = request.get_json()
+            """Reçoit un bloc d'un autre nœud (PROTECTION 4: Validation stricte)
+            
+            Import par étapes: décodage et contrôles sans état (hash, Merkle,
+            taille, format des transactions) dans le thread de la requête, puis
+            contrôles avec état (position, validateur, rejeux, nonces, soldes
+            cumulés) et application en une seule commande d'écriture.
+            """
+            timings: Dict[str, float] = {}
+            started = time.perf_counter()
             try:
-                block_data = data
-                block = Block.from_dict(block_data)
-                
-                # PROTECTION 4: Validation stricte du bloc
-                # 1. Vérifier le hash du bloc
-                if block.hash != block.calculate_hash():
-                    return jsonify({'success': False, 'error': 'Hash du bloc invalide'}), 400
-                
-                # 2. Vérifier l'index
-                if block.index != len(self.blockchain.chain):
-                    return jsonify({'success': False, 'error': 'Index du bloc incorrect'}), 400
-                
-                # 3. Vérifier le previous_hash
-                if block.previous_hash != self.blockchain.get_latest_block().hash:
-                    return jsonify({'success': False, 'error': 'Previous hash incorrect'}), 400
-                
-                # 4. PROTECTION 4: Valider TOUTES les transactions dans le bloc
-                for tx in block.transactions:
-                    if not tx.is_valid():
-                        # PROTECTION 8: Logger le bloc malveillant
-                        self.log_suspicious_activity('invalid_block_transaction', {
-                            'block_index': block.index,
-                            'tx_hash': tx.get_hash()[:16]
-                        })
-                        return jsonify({
-                            'success': False,
-                            'error': f'Transaction invalide dans le bloc: {tx.get_hash()[:16]}...'
-                        }), 400
-                    
-                    # PROTECTION 6: Vérifier que la transaction n'a pas déjà été traitée
-                    tx_hash = tx.get_hash()
-                    if tx_hash in self.blockchain.transaction_history:
-                        self.log_suspicious_activity('replay_attack_attempt', {
-                            'block_index': block.index,
-                            'tx_hash': tx_hash[:16]
-                        })
-                        return jsonify({
-                            'success': False,
-                            'error': f'Transaction déjà traitée (attaque de rejeu): {tx_hash[:16]}...'
-                        }), 400
-                    
-                    # Vérifier les nonces pour les transactions non-SYSTEM
-                    if tx.sender not in ["SYSTEM"]:
-                        expected_nonce = self.blockchain.get_next_expected_nonce(tx.sender)
-                        if tx.nonce < expected_nonce:
-                            self.log_suspicious_activity('invalid_nonce_in_block', {
-                                'block_index': block.index,
-                                'sender': tx.sender,
-                                'expected_nonce': expected_nonce,
-                                'received_nonce': tx.nonce
-                            })
-                            return jsonify({
-                                'success': False,
-                                'error': f'Nonce invalide dans la transaction: {tx.get_hash()[:16]}...'
-                            }), 400
-                        
-                        # Vérifier le solde avant d'appliquer la transaction
-                        sender_balance = self.blockchain.get_balance(tx.sender)
-                        if sender_balance < (tx.amount + tx.fee):
-                            return jsonify({
-                                'success': False,
-                                'error': f'Solde insuffisant dans la transaction: {tx.get_hash()[:16]}...'
-                            }), 400
-                
-                # 5. Vérifier que le validator existe et a un stake suffisant
-                if block.validator not in ["SYSTEM"]:
-                    if block.validator not in self.blockchain.validators:
-                        return jsonify({'success': False, 'error': 'Validator inconnu'}), 400
-                    if self.blockchain.validators[block.validator] != block.stake:
-                        return jsonify({'success': False, 'error': 'Stake du validator incorrect'}), 400
-                
-                # 6. PROTECTION 3: Vérifier la taille du bloc
-                if len(block.transactions) > self.blockchain.max_block_size:
-                    return jsonify({
-                        'success': False,
-                        'error': f'Bloc trop grand: {len(block.transactions)} transactions (max: {self.blockchain.max_block_size})'
-                    }), 400
-                
-                # Toutes les validations passées - ajouter le bloc
-                self.blockchain.chain.append(block)
-                
-                # Traiter les transactions du bloc
-                for tx in block.transactions:
-                    if tx.sender not in ["SYSTEM"]:
-                        self.blockchain.balances[tx.sender] = self.blockchain.get_balance(tx.sender) - (tx.amount + tx.fee)
-                    self.blockchain.balances[tx.recipient] = self.blockchain.get_balance(tx.recipient) + tx.amount
-                
-                # Récompense du validateur
-                validator = block.validator
-                if validator and validator != "SYSTEM":
-                    # Calculer les frais de transaction du bloc
-                    block_fees = sum(tx.fee for tx in block.transactions if tx.sender not in ["SYSTEM"])
-                    reward = self.blockchain.block_reward + block_fees
-                    self.blockchain.balances[validator] = self.blockchain.get_balance(validator) + reward
-                    self.blockchain.update_activity(validator)
-                
-                # Retirer les transactions du bloc de la pool en attente
-                block_tx_hashes = {tx.get_hash() for tx in block.transactions}
-                self.blockchain.pending_transactions = [
-                    tx for tx in self.blockchain.pending_transactions 
-                    if tx.get_hash() not in block_tx_hashes
-                ]
-                
-                return jsonify({'success': True, 'message': f'Bloc #{block.index} reçu et validé'})
+                block = Block.from_dict(request.get_json())
+                decoded = time.perf_counter()
+                timings['decode'] = (decoded - started) * 1000
                 
+                # Contrôles sans état (signatures après la structure): une erreur sur un
+                # champ mal formé reste un refus (400)
+                rejection = self.blockchain.check_block_contents(block, verifier=self.verifier)
             except Exception as e:
                 return jsonify({'success': False, 'error': str(e)}), 400
+            queued = time.perf_counter()
+            timings['contents'] = (queued - decoded) * 1000
+            if rejection is None:
+                rejection = self.engine.execute(self.import_received_block, block, queued, timings)
+            timings['total'] = (time.perf_counter() - started) * 1000
+            self.import_timings.record(timings, accepted=rejection is None)
+            
+            if rejection is not None:
+                error, activity, details = rejection
+                if activity is not None:
+                    # PROTECTION 8: Logger le bloc malveillant
+                    self.log_suspicious_activity(activity, details)
+                return jsonify({'success': False, 'error': error}), 400
+            
+            self.broadcast_block(block)  # Relais aux autres peers
+            return jsonify({'success': True, 'message': f'Bloc #{block.index} reçu et validé'})
+        
+        @self.app.route('/blockchain/import_stats', methods=['GET'])
+        def get_import_stats():
+            """Blocs reçus acceptés/refusés, latence de chaque étape de l'import et
+            cache des signatures vérifiées"""
+            return jsonify(dict(self.import_timings.summary(), signature_cache=SIGNATURE_CACHE.stats()))
+        
+        @self.app.route('/inv', methods=['POST'])
+        def receive_inventory():
+            """Annonce de hash par un peer; la réponse liste les objets à envoyer (getdata)
+            
+            Une annonce mal formée est refusée (400). Seule l'origine d'un peer
+            connu est retenue: une origine quelconque ferait grossir known_inventory
+            et pourrait empêcher le relais d'objets vers un vrai peer.
+            """
+            data = request.get_json(silent=True)
+            inventory = data.get('inventory', []) if isinstance(data, dict) else None
+            origin = data.get('origin') if isinstance(data, dict) else None
+            if not isinstance(inventory, list) or not isinstance(origin, (str, type(None))) or any(
+                    not isinstance(item, dict) or not isinstance(item.get('type'), str)
+                    or not isinstance(item.get('hash'), str) for item in inventory):
+                return jsonify({'success': False, 'error': 'Annonce mal formée'}), 400
+            if len(inventory) > INV_BATCH_SIZE:
+                return jsonify({'success': False,
+                                'error': f'Annonce trop grande (maximum {INV_BATCH_SIZE} hash)'}), 400
+            origin = origin.rstrip('/') if origin else None
+            if origin in self.peers:
+                # L'émetteur connaît ces objets: inutile de les lui annoncer en retour
+                with self.inventory_lock:
+                    known = self.known_inventory.setdefault(origin, InventorySet())
+                    for item in inventory:
+                        known.add(item['hash'])
+            missing = [
+                {'type': item['type'], 'hash': item['hash']}
+                for item in inventory
+                if self.is_inventory_missing(item['type'], item['hash'])
+            ]
+            return jsonify({'missing': missing})
         
         @self.app.route('/transaction/receive', methods=['POST'])
         def receive_transaction():
             """Reçoit une transaction d'un autre nœud"""
-            data = request.get_json()
-            try:
-                tx = Transaction.from_dict(data)
-                
-                # Vérifier que la transaction est valide
-                if not tx.is_valid():
-                    return jsonify({'success': False, 'error': 'Transaction invalide'}), 400
-                
-                # Ajouter la transaction à la pool si elle n'existe pas déjà
-                tx_hash = tx.get_hash()
-                existing_hashes = [t.get_hash() for t in self.blockchain.pending_transactions]
-                
-                if tx_hash not in existing_hashes:
-                    if self.blockchain.add_transaction(tx):
-                        return jsonify({'success': True, 'message': 'Transaction reçue et ajoutée'})
-                    else:
-                        return jsonify({'success': False, 'error': 'Transaction rejetée (solde insuffisant ou invalide)'}), 400
+            result = self.accept_relayed_transaction(request.get_json())
+            if result['success']:
+                return jsonify(result)
+            return jsonify(result), 400
+        
+        @self.app.route('/transactions/send_batch', methods=['POST'])
+        def send_transaction_batch():
+            """Soumet un lot de transactions déjà signées par le client: un résultat par transaction"""
+            data = request.get_json() or {}
+            items = data.get('transactions')
+            if not isinstance(items, list):
+                return jsonify({'success': False, 'error': 'Liste de transactions manquante'}), 400
+            if len(items) > SEND_BATCH_SIZE:
+                return jsonify({
+                    'success': False,
+                    'error': f'Lot trop grand (maximum {SEND_BATCH_SIZE} transactions)'
+                }), 400
+            
+            # Décoder chaque transaction; les erreurs de format restent propres à l'élément
+            results: List[Dict] = [None] * len(items)
+            transactions, positions = [], []
+            for position, item in enumerate(items):
+                try:
+                    tx = Transaction.from_dict(item)
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    results[position] = {'success': False, 'error': 'Transaction mal formée'}
+                    continue
+                if tx.sender in ["SYSTEM"]:
+                    results[position] = {'success': False, 'hash': tx.get_hash(),
+                                         'error': 'Transactions système refusées'}
+                    continue
+                transactions.append(tx)
+                positions.append(position)
+            
+            # Contrôles sans état hors du fil d'écriture, répartis sur des processus
+            valid = self.verifier.verify(transactions)
+            errors = self.engine.command('add_transactions', transactions, valid)
+            for position, tx, error in zip(positions, transactions, errors):
+                if error is None:
+                    self.broadcast_transaction(tx)
+                    results[position] = {'success': True, 'hash': tx.get_hash()}
                 else:
-                    return jsonify({'success': True, 'message': 'Transaction déjà présente'})
-            except Exception as e:
-                return jsonify({'success': False, 'error': str(e)}), 400
+                    # PROTECTION 8: Logger l'activité suspecte
+                    if error.startswith('Transaction invalide'):
+                        self.log_suspicious_activity('invalid_transaction', {
+                            'sender': tx.sender,
+                            'reason': 'signature_or_amounts_invalid'
+                        })
+                    results[position] = {'success': False, 'hash': tx.get_hash(), 'error': error}
+            
+            accepted = sum(1 for result in results if result['success'])
+            return jsonify({
+                'success': True,
+                'accepted': accepted,
+                'rejected': len(results) - accepted,
+                'results': results
+            })
+        
+        @self.app.route('/transactions/receive_batch', methods=['POST'])
+        def receive_transaction_batch():
+            """Reçoit un lot de transactions d'un autre nœud: un résultat par transaction
+            
+            Un lot répond à une annonce /inv: au plus INV_BATCH_SIZE transactions.
+            """
+            data = request.get_json() or {}
+            transactions = data.get('transactions')
+            if not isinstance(transactions, list):
+                return jsonify({'success': False, 'error': 'Liste de transactions manquante'}), 400
+            if len(transactions) > INV_BATCH_SIZE:
+                return jsonify({
+                    'success': False,
+                    'error': f'Lot trop grand (maximum {INV_BATCH_SIZE} transactions)'
+                }), 400
+            # Contrôles sans état du lot hors du fil d'écriture
+            decoded = []
+            for tx_data in transactions:
+                try:
+                    decoded.append(Transaction.from_dict(tx_data))
+                except Exception:
+                    decoded.append(None)  # L'erreur est rendue par accept_relayed_transaction
+            checks = iter(self.verifier.verify([tx for tx in decoded if tx is not None]))
+            valid = [next(checks) if tx is not None else None for tx in decoded]
+            results = self.engine.execute(lambda: [self.accept_relayed_transaction(tx_data, tx, tx_valid)
+                                                for tx_data, tx, tx_valid in zip(transactions, decoded, valid)])
+            return jsonify({
+                'success': True,
+                'accepted': sum(1 for result in results if result['success']),
+                'results': results
+            })
         
         @self.app.route('/blockchain', methods=['GET'])
         def get_blockchain():
+            snapshot = self.engine.read()
             return jsonify({
-                'length': len(self.blockchain.chain),
-                'chain': [block.to_dict() for block in self.blockchain.chain],
+                'length': snapshot.height,
+                'chain': [snapshot.chain[index].to_dict() for index in range(snapshot.height)],
                 'pending_transactions': len(self.blockchain.pending_transactions),
                 'validators': len(self.blockchain.validators),
-                'valid': self.blockchain.is_valid(),
+                'valid': self.engine.command('is_valid'),  # Fait avancer les curseurs de validation
                 'treasury': self.blockchain.treasury_address
             })
         
+        @self.app.route('/blocks', methods=['GET'])
+        def get_blocks():
+            """Blocs d'une plage: /blocks?from=<début>&to=<fin exclue>"""
+            snapshot = self.engine.read()
+            start, stop, stream = self.get_block_range(BLOCKS_PAGE_SIZE, snapshot.height)
+            return self.range_response('blocks', snapshot, start, stop, stream, Block.to_dict)
+        
+        @self.app.route('/headers', methods=['GET'])
+        def get_headers():
+            """En-têtes seuls (sans les transactions): /headers?from=<début>&to=<fin exclue>"""
+            snapshot = self.engine.read()
+            start, stop, stream = self.get_block_range(HEADERS_PAGE_SIZE, snapshot.height)
+            return self.range_response('headers', snapshot, start, stop, stream, self.serialize_header)
+        
+        @self.app.route('/block/<block_id>', methods=['GET'])
+        def get_block(block_id):
+            """Un bloc par son index ou par son hash"""
+            snapshot = self.engine.read()
+            index = int(block_id) if block_id.isdigit() else self.blockchain.get_block_index(block_id)
+            block = snapshot.chain[index] if index is not None and index < snapshot.height else None
+            if block is None or (not block_id.isdigit() and block.hash != block_id):
+                return jsonify({'success': False, 'error': 'Bloc introuvable'}), 404
+            return jsonify(block.to_dict())
+        
+        @self.app.route('/block/<int:index>/proof/<tx_hash>', methods=['GET'])
+        def get_merkle_proof(index, tx_hash):
+            """Preuve d'inclusion de Merkle d'une transaction dans un bloc"""
+            snapshot = self.engine.read()
+            if index < 0 or index >= snapshot.height:
+                return jsonify({'success': False, 'error': 'Bloc introuvable'}), 404
+            block = snapshot.chain[index]
+            proof = block.get_merkle_proof(tx_hash)
+            if proof is None:
+                return jsonify({'success': False, 'error': 'Transaction absente du bloc ou bloc sans racine de Merkle'}), 404
+            tx = next(tx for tx in block.transactions if tx.get_hash() == tx_hash)
+            return jsonify({
+                'success': True,
+                'block_index': block.index,
+                'block_hash': block.hash,
+                'merkle_root': block.merkle_root,
+                'leaf_hash': tx.get_leaf_hash(),
+                'proof': proof
+            })
+        
         @self.app.route('/blockchain/status', methods=['GET'])
         def get_status():
-            # PROTECTION 6: Vérifier la cohérence des balances
-            balance_consistent = self.blockchain.verify_balance_consistency()
-            
+            # Recalculé seulement si la chaîne, les validateurs ou la mempool ont changé
+            body, etag = self.get_status_snapshot()
+            response = self.app.response_class(body, mimetype='application/json')
+            response.set_etag(etag)
+            # 304 Not Modified si l'ETag envoyé (If-None-Match) est toujours valide
+            return response.make_conditional(request)
+        
+        @self.app.route('/blockchain/audit', methods=['GET'])
+        @self.serialized
+        def audit_blockchain():
+            """Audit complet: revérifie tous les blocs et recalcule les balances depuis le genesis"""
+            start = time.time()
+            valid = self.blockchain.is_valid(deep=True)
             return jsonify({
                 'blocks': len(self.blockchain.chain),
-                'pending_transactions': len(self.blockchain.pending_transactions),
-                'validators': len(self.blockchain.validators),
-                'validator_list': list(self.blockchain.validators.keys()),
-                'min_stake': self.blockchain.min_stake,
-                'block_reward': self.blockchain.block_reward,
-                'valid': self.blockchain.is_valid(),
-                'treasury': self.blockchain.treasury_address,
-                'treasury_balance': self.blockchain.get_balance(self.blockchain.treasury_address) if self.blockchain.treasury_address else 0,
+                'valid': valid,
+                'balance_consistent': self.blockchain.verify_balance_consistency(),
+                'duration': time.time() - start
+            })
+
+        @self.app.route('/accounts/top', methods=['GET'])
+        def get_top_accounts():
+            """Comptes avec les plus gros soldes"""
+            try:
+                limit = self.parse_limit(request.args.get('limit'), 10, LIST_PAGE_SIZE)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            return jsonify({'accounts': self.read_accounts(self.blockchain.get_top_balances, limit)})
+        
+        @self.app.route('/accounts/inactive', methods=['GET'])
+        def get_inactive_accounts():
+            """Comptes inactifs depuis plus que le seuil d'inactivité"""
+            try:
+                limit = self.parse_limit(request.args.get('limit'), 100, LIST_PAGE_SIZE)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            return jsonify({
                 'inactivity_threshold_days': self.blockchain.inactivity_threshold / (24 * 3600),
-                'is_official_treasury': self.blockchain.treasury_address == DEFAULT_TREASURY_ADDRESS,
-                'malicious_peers_count': len(self.malicious_peers),
-                'balance_consistent': balance_consistent,  # PROTECTION 6
-                'suspicious_activities_count': len(self.suspicious_activities)  # PROTECTION 8
+                'accounts': self.read_accounts(self.blockchain.get_inactive_accounts, limit)
             })
         
+        @self.app.route('/validators', methods=['GET'])
+        def get_validators():
+            """Validateurs classés par stake décroissant"""
+            try:
+                limit = self.parse_limit(request.args.get('limit'), 10, LIST_PAGE_SIZE)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            accounts = self.engine.read().accounts
+            if accounts is None:
+                total, validators = self.engine.execute(
+                    lambda: (len(self.blockchain.validators), self.blockchain.get_validators_by_stake(limit)))
+            else:
+                total = accounts.count_validators()
+                validators = self.blockchain.get_validators_by_stake(limit, accounts=accounts)
+            return jsonify({'total': total, 'validators': validators})
+        
         @self.app.route('/security/suspicious', methods=['GET'])
         def get_suspicious_activities():
             """PROTECTION 8: Endpoint pour consulter les activités suspectes"""
-            limit = int(request.args.get('limit', 100))
+            try:
+                limit = self.parse_limit(request.args.get('limit'), 100, LIST_PAGE_SIZE)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            activities = self.suspicious_activities
             return jsonify({
-                'total': len(self.suspicious_activities),
-                'activities': self.suspicious_activities[-limit:]  # Les plus récentes
+                'total': len(activities),
+                'activities': activities[max(0, len(activities) - limit):]  # Les plus récentes
             })
         
         @self.app.route('/treasury/distribute', methods=['POST'])
+        @self.serialized
         def distribute_from_treasury():
             """Distribuer des coins du trésor (requiert la clé privée du trésor)"""
             data = request.get_json()
@@ -951,21 +4218,20 @@ class Node:
                 return jsonify({'success': False, 'error': 'Champs manquants'}), 400
             
             # Vérifier la clé privée du trésor
-            wallet = QuantumAddress()
-            wallet.private_key = data['private_key']
-            wallet.public_key = hashlib.sha3_512(wallet.private_key.encode()).hexdigest()
-            addr_hash = hashlib.sha3_256(wallet.public_key.encode()).hexdigest()
-            checksum = hashlib.sha3_256(addr_hash.encode()).hexdigest()[:6]
-            wallet.address = f"Q{addr_hash[:40]}{checksum}"
+            try:
+                wallet = QuantumAddress.from_private_key(data['private_key'])
+            except (TypeError, ValueError):
+                wallet = None
             
-            if wallet.address != self.blockchain.treasury_address:
+            if wallet is None or wallet.address != self.blockchain.treasury_address:
                 return jsonify({'success': False, 'error': 'Clé privée du trésor invalide'}), 401
             
             recipients = data['recipients']
             amount = float(data['amount'])
             
-            transactions_created = []
-            
+            # Un ancien trésor (Q...) ne signe plus que sa migration vers son successeur
+            # (LEGACY_MIGRATIONS): toute autre distribution serait refusée par le réseau
+            transactions = []
             for recipient in recipients:
                 tx = Transaction(
                     self.blockchain.treasury_address,
@@ -975,9 +4241,23 @@ class Node:
                     tx_type="DISTRIBUTION"
                 )
                 tx.sign(wallet)
-                
+                if not tx.is_valid():
+                    error = f'Distribution vers {recipient} refusée: signature du trésor invalide'
+                    if QuantumAddress.is_legacy_address(self.blockchain.treasury_address):
+                        successor = LEGACY_MIGRATIONS.get(self.blockchain.treasury_address)
+                        error = (f'Ancienne adresse de trésor: seule la migration vers {successor} est acceptée'
+                                 if successor else
+                                 'Ancienne adresse de trésor sans successeur publié (LEGACY_MIGRATIONS)')
+                    return jsonify({'success': False, 'error': error}), 409
+                transactions.append(tx)
+            
+            transactions_created = []
+            for tx in transactions:
                 if self.blockchain.add_transaction(tx):
                     transactions_created.append(tx.to_dict())
+            if transactions and not transactions_created:
+                return jsonify({'success': False,
+                                'error': 'Aucune distribution créée (solde du trésor insuffisant ?)'}), 400
             
             return jsonify({
                 'success': True,
@@ -986,6 +4266,7 @@ class Node:
             })
         
         @self.app.route('/treasury/init', methods=['POST'])
+        @self.serialized
         def init_treasury():
             """Initialiser le trésor avec des tokens (une seule fois)"""
             if not self.blockchain.treasury_address:
@@ -1022,7 +4303,9 @@ class Node:
                 'peers': self.peers,
                 'malicious_peers': self.malicious_peers,
                 'total_peers': len(self.peers),
-                'total_malicious': len(self.malicious_peers)
+                'total_malicious': len(self.malicious_peers),
+                'gossip': dict(self.gossip.stats),  # Messages envoyés, en échec, perdus (file pleine)
+                'health': self.peer_manager.snapshot()  # État, latence, hauteur et score par peer
             })
         
         @self.app.route('/peers/add', methods=['POST'])
@@ -1048,18 +4331,10 @@ class Node:
             if peer in self.peers:
                 return jsonify({'success': False, 'error': 'Peer déjà connecté'}), 400
             
-            # Vérifier que le peer a le bon trésor
-            if self.is_peer_malicious(peer):
-                # Ajouter à la liste des malveillants
-                self.malicious_peers.append(peer)
-                print(f"\n{'='*70}")
-                print("🚨 NOEUD MALVEILLANT DÉTECTÉ")
-                print(f"{'='*70}")
-                print(f"Peer rejeté: {peer}")
-                print(f"Raison: Adresse de trésor différente de l'adresse officielle")
-                print(f"Adresse officielle: {DEFAULT_TREASURY_ADDRESS}")
-                print(f"Ce nœud est exclu du consensus et ne sera pas connecté.")
-                print(f"{'='*70}\n")
+            # Sonde rapide (GET /health): le trésor du peer doit être l'adresse officielle
+            # Un peer injoignable est tout de même ajouté; les sondes périodiques le réévaluent
+            info = self.peer_manager.probe(peer)
+            if info['state'] == 'malicious':
                 return jsonify({
                     'success': False,
                     'error': 'Nœud malveillant détecté',
@@ -1068,61 +4343,121 @@ class Node:
                 }), 403
             
             # Le peer est valide, l'ajouter
-            self.peers.append(peer)
-            print(f"✅ Peer valide ajouté: {peer}")
-            return jsonify({'success': True, 'peers': self.peers})
+            self.peers = self.peers + [peer]
+            print(f"✅ Peer ajouté: {peer} ({info['state']})")
+            return jsonify({'success': True, 'peers': self.peers, 'status': info['state']})
+        
+        @self.app.route('/sync/headers', methods=['POST'])
+        def get_sync_headers():
+            """Côté peer: en-têtes qui suivent le dernier ancêtre commun du locator reçu"""
+            data = request.get_json(silent=True) or {}
+            locator = data.get('locator', []) if isinstance(data, dict) else None
+            if not isinstance(locator, list) or not all(isinstance(item, str) for item in locator):
+                return jsonify({'success': False, 'error': 'Locator mal formé'}), 400
+            try:
+                limit = self.parse_limit(data.get('limit'), HEADERS_PAGE_SIZE, HEADERS_PAGE_SIZE)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            snapshot = self.engine.read()
+            chain = snapshot.chain
+            ancestor = self.blockchain.find_common_ancestor(locator)
+            if ancestor is not None and (ancestor >= snapshot.height or chain[ancestor].hash not in locator):
+                # Index plus récent que la vue de lecture: recherche limitée à la vue
+                ancestor = next((index for index in map(self.blockchain.get_block_index, locator)
+                                 if index is not None and index < snapshot.height
+                                 and chain[index].hash in locator), None)
+            start = 0 if ancestor is None else ancestor + 1
+            stop = min(snapshot.height, start + limit)
+            return jsonify({
+                'height': snapshot.height,
+                'ancestor': ancestor,
+                'treasury': self.blockchain.treasury_address,
+                'headers': [self.serialize_header(chain[index]) for index in range(start, stop)]
+            })
         
         @self.app.route('/sync', methods=['POST'])
         def sync_blockchain():
-            data = request.get_json()
+            """Synchronise la chaîne locale depuis un peer (en-têtes puis blocs manquants)
+            
+            Sans peer précisé, rattrapage depuis le plus haut des peers connus.
+            Le peer précisé doit avoir été ajouté par /peers/add et ne pas être
+            malveillant: le nœud ne télécharge pas depuis une URL quelconque.
+            """
+            data = request.get_json(silent=True) or {}
+            peer = data.get('peer')
+            if peer:
+                if not isinstance(peer, str) or peer.rstrip('/') not in self.peers:
+                    return jsonify({'success': False, 'error': 'Peer inconnu: ajoutez-le d\'abord via /peers/add'}), 403
+                if peer.rstrip('/') in self.malicious_peers:
+                    return jsonify({'success': False, 'error': 'Peer malveillant exclu du consensus'}), 403
             try:
-                blockchain_data = data.get('blockchain')
-                new_blockchain = SimplePoSBlockchain.from_dict(blockchain_data)
-                
-                # Vérifier que le trésor de la blockchain reçue correspond à l'adresse officielle
-                if new_blockchain.treasury_address != DEFAULT_TREASURY_ADDRESS:
-                    print(f"\n🚨 TENTATIVE DE SYNCHRONISATION MALVEILLANTE REJETÉE")
-                    print(f"   Trésor reçu: {new_blockchain.treasury_address}")
-                    print(f"   Trésor officiel: {DEFAULT_TREASURY_ADDRESS}")
-                    return jsonify({
-                        'success': False,
-                        'error': 'Blockchain malveillante rejetée',
-                        'message': 'Cette blockchain utilise une adresse de trésor différente et est exclue du consensus',
-                        'received_treasury': new_blockchain.treasury_address,
-                        'official_treasury': DEFAULT_TREASURY_ADDRESS
-                    }), 403
-                
-                if len(new_blockchain.chain) > len(self.blockchain.chain) and new_blockchain.is_valid():
-                    self.blockchain = new_blockchain
-                    return jsonify({'success': True, 'message': 'Blockchain synchronisée'})
-                
-                return jsonify({'success': False, 'message': 'Blockchain locale plus longue ou invalide'})
+                result, status_code = self.sync_with_peer(peer) if peer else self.catch_up()
+                return jsonify(result), status_code
             except Exception as e:
                 return jsonify({'success': False, 'error': str(e)}), 400
     
-    def broadcast_transaction(self, tx_dict: Dict):
-        """Diffuse une transaction uniquement aux peers valides (non malveillants)"""
-        for peer in self.peers:
-            # Ne pas envoyer aux peers malveillants
-            if peer in self.malicious_peers:
-                continue
-            try:
-                requests.post(f"{peer}/transaction/receive", json=tx_dict, timeout=2)
-            except:
-                pass
+    def broadcast_transaction(self, tx: Transaction):
+        """Annonce une transaction aux peers valides (non malveillants), sans attendre"""
+        self.announce('tx', tx.get_hash())
     
-    def broadcast_block(self, block_dict: Dict):
-        """Diffuse un bloc uniquement aux peers valides (non malveillants)"""
-        for peer in self.peers:
+    def broadcast_block(self, block: Block):
+        """Annonce un bloc aux peers valides (non malveillants), sans attendre"""
+        self.announce('block', block.hash)
+    
+    def announce(self, item_type: str, item_hash: str):
+        """Annonce un hash aux peers qui ne le connaissent pas encore, les mieux notés en premier"""
+        for peer in self.peer_manager.ranked(self.peers):
             # Ne pas envoyer aux peers malveillants
             if peer in self.malicious_peers:
                 continue
-            try:
-                requests.post(f"{peer}/block/receive", json=block_dict, timeout=2)
-            except:
-                pass
+            with self.inventory_lock:
+                known = self.known_inventory.setdefault(peer, InventorySet())
+                if item_hash in known:
+                    continue
+                known.add(item_hash)
+            self.gossip.announce(peer, item_type, item_hash)
+    
+    def get_inventory_body(self, item_type: str, item_hash: str) -> Optional[Tuple[str, Dict]]:
+        """getdata: route de réception et corps d'un objet annoncé"""
+        if item_type == 'tx':
+            tx = self.blockchain.pending_transactions.get(item_hash)
+            return ('/transaction/receive', tx.to_dict()) if tx is not None else None
+        if item_type == 'block':
+            block = self.blockchain.get_block_by_hash(item_hash)
+            return ('/block/receive', block.to_dict()) if block is not None else None
+        return None
+    
+    def is_inventory_missing(self, item_type: str, item_hash: str) -> bool:
+        """Objet ni connu localement, ni déjà demandé à un autre peer il y a peu"""
+        if item_type == 'tx':
+            known = (item_hash in self.blockchain.pending_transactions
+                     or item_hash in self.blockchain.transaction_history)
+        elif item_type == 'block':
+            known = self.blockchain.get_block_index(item_hash) is not None
+        else:
+            return False
+        if known:
+            return False
+        with self.inventory_lock:
+            requested_at = self.requested_inventory.added_at(item_hash)
+            if requested_at is not None and time.time() - requested_at < GETDATA_TIMEOUT:
+                return False
+            self.requested_inventory.add(item_hash)
+        return True
+    
+    def create_server(self, host: str = '0.0.0.0', port: int = None, threads: int = SERVER_THREADS):
+        """Serveur de production: waitress (pool de threads) s'il est installé,
+        sinon serveur WSGI multi-thread de werkzeug (un thread par requête)
+        
+        Les requêtes sont traitées en parallèle: les lectures se servent de la
+        instantané publié par le moteur, les modifications passent par son fil d'écriture.
+        """
+        port = self.port if port is None else port
+        if waitress is not None:
+            return WaitressServer(self.app, host, port, threads)
+        return make_server(host, port, self.app, threaded=True)
     
-    def run(self):
+    def run(self, server: str = 'development', threads: int = SERVER_THREADS):
         print(f"\n{'='*70}")
         print(f"NOEUD BLOCKCHAIN")
         print(f"{'='*70}")
@@ -1130,9 +4465,28 @@ class Node:
         print(f"URL: http://localhost:{self.port}")
         if self.blockchain.treasury_address:
             print(f"Trésor: {self.blockchain.treasury_address[:30]}...")
+        if self.blockchain.store is not None:
+            print(f"Données: {self.blockchain.store.directory} ({len(self.blockchain.chain)} blocs)")
+        if server == 'production':
+            backend = f"waitress, {threads} threads" if waitress is not None else "werkzeug multi-thread (waitress non installé)"
+            print(f"Serveur: production ({backend})")
         print(f"{'='*70}\n")
         
-        self.app.run(host='0.0.0.0', port=self.port, debug=False)
+        self.peer_manager.start()
+        try:
+            if server == 'production':
+                self.create_server(threads=threads).serve_forever()
+            else:
+                self.app.run(host='0.0.0.0', port=self.port, debug=False)
+        finally:
+            self.peer_manager.stop()
+            self.gossip.close()
+            self.verifier.close()
+            # Sauvegarder l'état pour un redémarrage rapide
+            if self.blockchain.store is not None:
+                self.engine.command('save_snapshot')
+                self.blockchain.store.close()
+            self.engine.close()
 
 def main():
     parser = argparse.ArgumentParser(description='Blockchain Node avec mécanisme d\'inactivité')
@@ -1142,12 +4496,37 @@ def main():
     parser.add_argument('--treasury', type=str, help='Adresse du trésor')
     parser.add_argument('--init', action='store_true', help='Initialiser avec des données de test')
     parser.add_argument('--inactivity-days', type=int, default=30, help='Jours avant inactivité (défaut: 30)')
+    parser.add_argument('--data-dir', type=str, default=os.environ.get('DATA_DIR'),
+                        help='Répertoire de stockage persistant de la chaîne (défaut: en mémoire)')
+    parser.add_argument('--snapshot-interval', type=int, default=1000,
+                        help='Nombre de blocs entre deux snapshots de l\'état (défaut: 1000)')
+    parser.add_argument('--state-backend', choices=['memory', 'sqlite'], default='memory',
+                        help='Stockage de l\'état des comptes (défaut: memory)')
+    parser.add_argument('--state-db', type=str,
+                        help='Fichier SQLite de l\'état (défaut: <data-dir>/state.sqlite3, sinon en mémoire)')
+    parser.add_argument('--public-url', type=str, default=os.environ.get('PUBLIC_URL'),
+                        help='URL publique du nœud, jointe aux annonces d\'inventaire (variable PUBLIC_URL)')
+    parser.add_argument('--server', choices=['development', 'production'],
+                        default=os.environ.get('SERVER_MODE', 'development'),
+                        help='Serveur HTTP: development (serveur Flask) ou production '
+                             '(waitress si installé, sinon werkzeug multi-thread) (variable SERVER_MODE)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('THREADS', SERVER_THREADS)),
+                        help=f'Threads de traitement des requêtes en production (défaut: {SERVER_THREADS})')
+    parser.add_argument('--signing-counters', type=str,
+                        help='Fichier des compteurs de clés de signature à usage unique '
+                             '(défaut: <data-dir>/signing_counters.json, ou signing_counters_<port>.json)')
     args = parser.parse_args()
     
     # Configuration de l'inactivité
-    global INACTIVITY_THRESHOLD
+    global INACTIVITY_THRESHOLD, SIGNING_COUNTERS
     INACTIVITY_THRESHOLD = args.inactivity_days * 24 * 3600
     
+    # Compteurs des clés de signature à usage unique: conservés entre les redémarrages
+    counters_path = args.signing_counters or (
+        os.path.join(args.data_dir, 'signing_counters.json') if args.data_dir
+        else f"signing_counters_{args.port}.json")
+    SIGNING_COUNTERS = SigningCounters(counters_path)
+    
     # Configuration du trésor
     # L'adresse du trésor est définie par défaut dans le code pour garantir la cohérence du réseau
     # Elle peut être surchargée via --treasury ou TREASURY_ADDRESS, mais ce n'est PAS recommandé
@@ -1188,7 +4567,16 @@ def main():
         print(f"⚠️  Pour rejoindre le réseau officiel, ne pas utiliser --init.")
         print(f"{'='*70}\n")
     
-    node = Node(args.port, treasury_address)
+    store = None
+    if args.data_dir:
+        store = ChainStore(args.data_dir, snapshot_interval=args.snapshot_interval)
+    
+    state = None
+    if args.state_backend == 'sqlite':
+        state_db = args.state_db or (os.path.join(args.data_dir, 'state.sqlite3') if args.data_dir else ':memory:')
+        state = SQLiteState(state_db)
+    
+    node = Node(args.port, treasury_address, store, state, public_url=args.public_url)
     
     # Afficher l'adresse du trésor utilisée
     if treasury_address == DEFAULT_TREASURY_ADDRESS:
@@ -1218,6 +4606,7 @@ def main():
             initial_amount = float(os.environ.get('TREASURY_INITIAL_AMOUNT', 1000000))
             node.blockchain.mint_tokens(treasury_address, initial_amount)
             node.blockchain.create_block()
+            node.blockchain.save_snapshot()  # Ne pas ré-initialiser au prochain démarrage
             print(f"\n🏛️  Trésor initialisé automatiquement avec {initial_amount} tokens")
             print(f"Adresse: {treasury_address}\n")
     
@@ -1254,7 +4643,7 @@ def main():
             }, f, indent=2)
         print(f"\nWallets sauvegardés dans {wallets_file}")
     
-    node.run()
+    node.run(server=args.server, threads=args.threads)
 
 if __name__ == '__main__':
     main()
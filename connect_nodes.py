@@ -138,30 +138,30 @@ def connect_nodes(node1_url: str, node2_url: str):
         
         if blocks1 > blocks2:
             print(f"\nSynchronisation du nœud 2 avec le nœud 1...")
-            blockchain = requests.get(f"{node1_url}/blockchain", timeout=30).json()
+            # Le nœud en retard télécharge lui-même les en-têtes puis les blocs manquants
             response = requests.post(
                 f"{node2_url}/sync",
-                json={"blockchain": blockchain},
-                timeout=30
+                json={"peer": node1_url},
+                timeout=300
             )
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success'):
-                    print(f"✓ Blockchain synchronisée")
+                    print(f"✓ Blockchain synchronisée ({data.get('applied', 0)} blocs ajoutés)")
                 else:
                     print(f"✗ Échec de la synchronisation: {data.get('message', 'Erreur inconnue')}")
         elif blocks2 > blocks1:
             print(f"\nSynchronisation du nœud 1 avec le nœud 2...")
-            blockchain = requests.get(f"{node2_url}/blockchain", timeout=30).json()
+            # Le nœud en retard télécharge lui-même les en-têtes puis les blocs manquants
             response = requests.post(
                 f"{node1_url}/sync",
-                json={"blockchain": blockchain},
-                timeout=30
+                json={"peer": node2_url},
+                timeout=300
             )
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success'):
-                    print(f"✓ Blockchain synchronisée")
+                    print(f"✓ Blockchain synchronisée ({data.get('applied', 0)} blocs ajoutés)")
                 else:
                     print(f"✗ Échec de la synchronisation: {data.get('message', 'Erreur inconnue')}")
         else:
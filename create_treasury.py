@@ -4,31 +4,20 @@ Script pour créer une adresse trésor (Treasury Address)
 Cette adresse vous donnera un accès illimité aux tokens de la blockchain.
 """
 
-import hashlib
 import json
-import time
-import random
-import os
 from datetime import datetime
 
-class QuantumAddress:
-    def __init__(self):
-        seed = str(time.time()) + str(random.random())
-        self.private_key = hashlib.sha3_512(seed.encode()).hexdigest()
-        self.public_key = hashlib.sha3_512(self.private_key.encode()).hexdigest()
-        
-        addr_hash = hashlib.sha3_256(self.public_key.encode()).hexdigest()
-        checksum = hashlib.sha3_256(addr_hash.encode()).hexdigest()[:6]
-        self.address = f"Q{addr_hash[:40]}{checksum}"
+from blockchain_node import QuantumAddress as Wallet
+
+class QuantumAddress(Wallet):
+    """Wallet trésor Qx (signatures hash-based): les signatures des anciennes
+    adresses Q... sont refusées par défaut par les nœuds"""
     
     def to_dict(self):
-        return {
-            'address': self.address,
-            'public_key': self.public_key,
-            'private_key': self.private_key,
-            'created_at': datetime.now().isoformat(),
-            'type': 'treasury'
-        }
+        data = super().to_dict()
+        data['created_at'] = datetime.now().isoformat()
+        data['type'] = 'treasury'
+        return data
 
 def main():
     print("=" * 70)
@@ -82,6 +71,11 @@ def main():
     print("  Nom de la variable : TREASURY_ADDRESS")
     print(f"  Valeur : {treasury_wallet.address}")
     print()
+    print("Pour migrer un ancien trésor Q..., publiez plutôt cette adresse comme successeur")
+    print("dans LEGACY_MIGRATIONS (blockchain_node.py), puis déployez cette version sur tous les nœuds :")
+    print()
+    print(f"  LEGACY_MIGRATIONS = {{DEFAULT_TREASURY_ADDRESS: \"{treasury_wallet.address}\"}}")
+    print()
     print("=" * 70)
     print()
     print("✅ Votre adresse trésor est prête à être utilisée !")
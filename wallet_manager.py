@@ -276,12 +276,13 @@ def list_wallets():
 def explorer():
     """Mini explorateur de blocs"""
     try:
-        response = requests.get(f"{BASE_URL}/blockchain")
-        data = response.json()
+        data = requests.get(f"{BASE_URL}/blockchain/status").json()
+        # Seuls les 5 derniers blocs sont téléchargés
+        blocks = requests.get(f"{BASE_URL}/blocks", params={'from': -5}).json()['blocks']
         
         print(f"\n{Colors.BOLD}🔍 EXPLORATEUR DE BLOCS{Colors.END}")
         print("="*60)
-        print(f"Nombre de blocs: {data['length']}")
+        print(f"Nombre de blocs: {data['blocks']}")
         print(f"Transactions en attente: {data['pending_transactions']}")
         print(f"Chaîne valide: {Colors.GREEN if data['valid'] else Colors.RED}{data['valid']}{Colors.END}")
         print("="*60)
@@ -289,7 +290,7 @@ def explorer():
         # Afficher les derniers blocs
         print(f"\n{Colors.BOLD}Derniers blocs:{Colors.END}\n")
         
-        for block in reversed(data['chain'][-5:]):  # 5 derniers blocs
+        for block in reversed(blocks):  # 5 derniers blocs
             print(f"{Colors.BOLD}Bloc #{block['index']}{Colors.END}")
             print(f"  Hash: {block['hash'][:50]}...")
             print(f"  Validateur: {block['validator'][:30]}...")